@@ -3,6 +3,22 @@ from django.db.models import Count
 from apps.users.models import User
 from apps.thumbnails.models import Thumbnail
 from apps.content.models import AIContent
+from core.clients.image_provider import image_providers, provider_routing_stats
+from core.clients.youtube import youtube_cache_stats
+from core.utils.api_key_manager import api_key_manager
+from core.utils.async_http import async_http_stats
+from core.utils.cache_serializer import serializer_snapshot
+from core.utils.circuit_breaker import breaker_snapshot, breaker_stats
+from core.utils.client_pool import client_pool_stats
+from core.utils.concurrency import fan_out_stats, race_latencies, race_stats
+from core.utils.hedge import hedge_snapshot, hedge_stats
+from core.utils.http import connection_stats
+from core.utils.negative_cache import negative_cache_stats
+from core.utils.quota import youtube_quota
+from core.utils.rate_limit import rate_limit_stats
+from core.utils.retry import retry_budget, retry_stats
+from core.utils.singleflight import single_flight_stats
+from core.utils.swr import swr_stats
 
 class AdminService:
     def authenticate(self, username: str, password: str) -> bool:
@@ -27,3 +43,29 @@ class AdminService:
             'most_active_users': [{'email': u.email, 'thumbnails': u.thumbnail_count, 'content': u.content_count} for u in most_active],
             'recent_registrations': [{'email': u.email, 'created_at': u.created_at.isoformat()} for u in recent_users]
         }
+    
+    def get_upstream_stats(self) -> dict:
+        """Upstream client health for the worker serving this request."""
+        return {
+            'http_connections': connection_stats.snapshot(),
+            'sdk_clients': client_pool_stats.snapshot(),
+            'async_http': async_http_stats.snapshot(),
+            'youtube_cache': youtube_cache_stats.snapshot(),
+            'single_flight': single_flight_stats.snapshot(),
+            'stale_while_revalidate': swr_stats.snapshot(),
+            'negative_cache': negative_cache_stats.snapshot(),
+            'cache_serialization': serializer_snapshot(),
+            'rate_limits': rate_limit_stats.snapshot(),
+            'retries': {'budget': retry_budget.snapshot(), 'by_function': retry_stats.snapshot()},
+            'circuit_breakers': {'state': breaker_snapshot(), 'transitions': breaker_stats.snapshot()},
+            'hedging': {'delays': hedge_snapshot(), 'outcomes': hedge_stats.snapshot()},
+            'fan_out': fan_out_stats.snapshot(),
+            'races': {'outcomes': race_stats.snapshot(), 'latencies': race_latencies.snapshot()},
+            'image_providers': {'shared': image_providers.snapshot(), 'routing': provider_routing_stats.snapshot()},
+        }
+    
+    def get_quota_stats(self) -> dict:
+        return {
+            'youtube': youtube_quota.snapshot(api_key_manager.keys.get('youtube', [])),
+            'key_pools': {service: api_key_manager.snapshot(service) for service in api_key_manager.keys},
+        }
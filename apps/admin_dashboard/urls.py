@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import AdminLoginView, AdminStatsView
+from .views import AdminLoginView, AdminStatsView, AdminUpstreamView, AdminQuotaView
 
 urlpatterns = [
     path('login/', AdminLoginView.as_view(), name='admin_login'),
     path('stats/', AdminStatsView.as_view(), name='admin_stats'),
+    path('upstream/', AdminUpstreamView.as_view(), name='admin_upstream'),
+    path('quota/', AdminQuotaView.as_view(), name='admin_quota'),
 ]
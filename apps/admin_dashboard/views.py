@@ -60,3 +60,45 @@ class AdminStatsView(APIView):
                 {'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+class AdminUpstreamView(APIView):
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        try:
+            if not request.session.get('is_admin'):
+                return Response(
+                    {'error': {'code': 'FORBIDDEN', 'message': 'Admin access required'}},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            
+            service = AdminService()
+            stats = service.get_upstream_stats()
+            return Response(stats, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f'Admin upstream stats error: {str(e)}')
+            return Response(
+                {'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class AdminQuotaView(APIView):
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        try:
+            if not request.session.get('is_admin'):
+                return Response(
+                    {'error': {'code': 'FORBIDDEN', 'message': 'Admin access required'}},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            
+            service = AdminService()
+            stats = service.get_quota_stats()
+            return Response(stats, status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f'Admin quota stats error: {str(e)}')
+            return Response(
+                {'error': {'code': 'INTERNAL_ERROR', 'message': str(e)}},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
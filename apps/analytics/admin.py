@@ -0,0 +1,21 @@
+from django.contrib import admin
+from .models import ChannelIdentity
+from .services import channel_identity_service
+
+@admin.register(ChannelIdentity)
+class ChannelIdentityAdmin(admin.ModelAdmin):
+    list_display = ['lookup_key', 'channel_id', 'uploads_playlist_id', 'resolved_at']
+    search_fields = ['lookup_key', 'channel_id']
+    ordering = ['-resolved_at']
+    actions = ['invalidate_identities']
+    
+    @admin.action(description='Invalidate selected identities (re-resolve on next lookup)')
+    def invalidate_identities(self, request, queryset):
+        count = channel_identity_service.invalidate_queryset(queryset)
+        self.message_user(request, f'Invalidated {count} channel identities')
+    
+    def delete_model(self, request, obj):
+        channel_identity_service.invalidate_queryset(ChannelIdentity.objects.filter(pk=obj.pk))
+    
+    def delete_queryset(self, request, queryset):
+        channel_identity_service.invalidate_queryset(queryset)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lookup_key', models.CharField(max_length=255, unique=True)),
+                ('channel_id', models.CharField(db_index=True, max_length=64)),
+                ('uploads_playlist_id', models.CharField(max_length=64)),
+                ('resolved_at', models.DateTimeField(auto_now=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'channel identities',
+                'ordering': ['-resolved_at'],
+            },
+        ),
+    ]
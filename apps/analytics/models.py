@@ -0,0 +1,16 @@
+from django.db import models
+
+class ChannelIdentity(models.Model):
+    """Resolved mapping from a channel handle/URL/username to its UC id and uploads playlist."""
+    lookup_key = models.CharField(max_length=255, unique=True)
+    channel_id = models.CharField(max_length=64, db_index=True)
+    uploads_playlist_id = models.CharField(max_length=64)
+    resolved_at = models.DateTimeField(auto_now=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-resolved_at']
+        verbose_name_plural = 'channel identities'
+    
+    def __str__(self):
+        return f"{self.lookup_key} -> {self.channel_id}"
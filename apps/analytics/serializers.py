@@ -1,10 +1,14 @@
 from rest_framework import serializers
 
 class OutlierSerializer(serializers.Serializer):
-    channel_id = serializers.CharField(max_length=100)
+    channel_id = serializers.CharField(max_length=255)
+    max_videos = serializers.IntegerField(required=False, min_value=1)
+    published_after = serializers.DateTimeField(required=False)
 
 class UploadStreakSerializer(serializers.Serializer):
-    channel_id = serializers.CharField(max_length=100)
+    channel_id = serializers.CharField(max_length=255)
+    max_videos = serializers.IntegerField(required=False, min_value=1)
+    published_after = serializers.DateTimeField(required=False)
 
 class ThumbnailSearchSerializer(serializers.Serializer):
     query = serializers.CharField(max_length=200, required=False)
@@ -1,128 +1,168 @@
+import asyncio
 import statistics
 import logging
-from datetime import datetime, timezone
-from core.clients.youtube import youtube_client
-from core.clients.gemini import gemini_client
-from core.exceptions import YouTubeAPIError, AIServiceUnavailable
+from datetime import datetime, timezone, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone as dj_timezone
+from .models import ChannelIdentity
+from core.clients.youtube import youtube_client, async_youtube_client
+from core.utils.cache_keys import make_key
+from core.clients.gemini import gemini_client, async_gemini_client
+from core.utils import deadline
+from core.utils.concurrency import fan_out, afan_out
+from core.exceptions import YouTubeAPIError, AIServiceUnavailable, RateLimitExceeded, DeadlineExceeded
 
 logger = logging.getLogger(__name__)
 
+class ChannelIdentityService:
+    """
+    Persistent handle/URL -> channel ID -> uploads playlist mapping.
+    
+    Lookups go cache -> database -> YouTube API. Resolving an @handle costs a
+    100-unit search plus a channels call, and the mapping almost never changes,
+    so rows are trusted for CHANNEL_IDENTITY_TTL_DAYS.
+    """
+    CACHE_NAMESPACE = 'channel_identity'
+    
+    def _cache_key(self, lookup_key: str) -> str:
+        return make_key(self.CACHE_NAMESPACE, lookup_key, fold_case=False)
+    
+    def resolve(self, identifier: str) -> dict:
+        """Return {'channel_id', 'uploads_playlist_id'} for any channel reference."""
+        lookup_key = youtube_client.channel_lookup_key(identifier)
+        cached = cache.get(self._cache_key(lookup_key))
+        if cached is not None:
+            logger.info(f"[ChannelIdentity] Cache hit: {lookup_key}")
+            return cached
+        
+        max_age = dj_timezone.now() - timedelta(days=settings.CHANNEL_IDENTITY_TTL_DAYS)
+        row = ChannelIdentity.objects.filter(lookup_key=lookup_key, resolved_at__gte=max_age).first()
+        if row:
+            logger.info(f"[ChannelIdentity] DB hit: {lookup_key}")
+            identity = {'channel_id': row.channel_id, 'uploads_playlist_id': row.uploads_playlist_id}
+        else:
+            logger.info(f"[ChannelIdentity] Resolving via YouTube API: {lookup_key}")
+            identity = youtube_client.resolve_channel(identifier)
+            self._store(lookup_key, identity)
+        
+        # Warm the canonical ID entry too, in the same round-trip
+        cache.set_many({
+            self._cache_key(key): identity
+            for key in {lookup_key, f"id:{identity['channel_id']}"}
+        }, settings.CHANNEL_IDENTITY_CACHE_TTL)
+        return identity
+    
+    async def aresolve(self, identifier: str) -> dict:
+        """resolve() on the async YouTube client and async ORM."""
+        lookup_key = youtube_client.channel_lookup_key(identifier)
+        cached = await asyncio.to_thread(cache.get, self._cache_key(lookup_key))
+        if cached is not None:
+            logger.info(f"[ChannelIdentity] Cache hit: {lookup_key}")
+            return cached
+        
+        max_age = dj_timezone.now() - timedelta(days=settings.CHANNEL_IDENTITY_TTL_DAYS)
+        row = await ChannelIdentity.objects.filter(lookup_key=lookup_key, resolved_at__gte=max_age).afirst()
+        if row:
+            logger.info(f"[ChannelIdentity] DB hit: {lookup_key}")
+            identity = {'channel_id': row.channel_id, 'uploads_playlist_id': row.uploads_playlist_id}
+        else:
+            logger.info(f"[ChannelIdentity] Resolving via YouTube API: {lookup_key}")
+            identity = await async_youtube_client.resolve_channel(identifier)
+            await self._astore(lookup_key, identity)
+        
+        await asyncio.to_thread(cache.set_many, {
+            self._cache_key(key): identity
+            for key in {lookup_key, f"id:{identity['channel_id']}"}
+        }, settings.CHANNEL_IDENTITY_CACHE_TTL)
+        return identity
+    
+    def _store(self, lookup_key: str, identity: dict) -> None:
+        # Also index by the canonical channel ID so direct UC... lookups hit
+        for key in {lookup_key, f"id:{identity['channel_id']}"}:
+            ChannelIdentity.objects.update_or_create(
+                lookup_key=key,
+                defaults={
+                    'channel_id': identity['channel_id'],
+                    'uploads_playlist_id': identity['uploads_playlist_id'],
+                }
+            )
+    
+    async def _astore(self, lookup_key: str, identity: dict) -> None:
+        for key in {lookup_key, f"id:{identity['channel_id']}"}:
+            await ChannelIdentity.objects.aupdate_or_create(
+                lookup_key=key,
+                defaults={
+                    'channel_id': identity['channel_id'],
+                    'uploads_playlist_id': identity['uploads_playlist_id'],
+                }
+            )
+    
+    def invalidate(self, identifier: str) -> int:
+        """Forget a single channel reference so the next lookup re-resolves it."""
+        lookup_key = youtube_client.channel_lookup_key(identifier)
+        return self.invalidate_queryset(ChannelIdentity.objects.filter(lookup_key=lookup_key))
+    
+    def invalidate_queryset(self, queryset) -> int:
+        lookup_keys = list(queryset.values_list('lookup_key', flat=True))
+        cache.delete_many([self._cache_key(key) for key in lookup_keys])
+        queryset.delete()
+        logger.info(f"[ChannelIdentity] Invalidated {len(lookup_keys)} identities")
+        return len(lookup_keys)
+
+channel_identity_service = ChannelIdentityService()
+
 class AnalyticsService:
+    ANALYTICS_FIELDS = ('id', 'title', 'thumbnail_url', 'views', 'likes', 'comments', 'publish_date', 'duration')
+    
     def calculate_smart_score(self, views: float, velocity: float, engagement: float, max_views: float, max_velocity: float, max_engagement: float) -> float:
         norm_views = views / max_views if max_views > 0 else 0
         norm_velocity = velocity / max_velocity if max_velocity > 0 else 0
         norm_engagement = engagement / max_engagement if max_engagement > 0 else 0
         return (0.5 * norm_views) + (0.3 * norm_velocity) + (0.2 * norm_engagement)
     
-    def detect_outliers(self, channel_id: str) -> dict:
+    def _load_channel_videos(self, channel_id: str, max_videos: int = None, published_after: datetime = None) -> list:
+        """
+        Stream a channel's uploads and keep only the fields analytics needs.
+        
+        Defaults come from ANALYTICS_MAX_VIDEOS / ANALYTICS_LOOKBACK_DAYS; 0 means
+        the full channel history.
+        """
+        max_videos, published_after = self._video_window(max_videos, published_after)
+        deadline.check('channel analytics')
+        identity = channel_identity_service.resolve(channel_id)
+        videos = youtube_client.iter_playlist_videos(
+            identity['uploads_playlist_id'], limit=max_videos, published_after=published_after
+        )
+        return [{field: video.get(field) for field in self.ANALYTICS_FIELDS} for video in videos]
+    
+    async def _aload_channel_videos(self, channel_id: str, max_videos: int = None, published_after: datetime = None) -> list:
+        max_videos, published_after = self._video_window(max_videos, published_after)
+        deadline.check('channel analytics')
+        identity = await channel_identity_service.aresolve(channel_id)
+        videos = async_youtube_client.iter_playlist_videos(
+            identity['uploads_playlist_id'], limit=max_videos, published_after=published_after
+        )
+        return [{field: video.get(field) for field in self.ANALYTICS_FIELDS} async for video in videos]
+    
+    def _video_window(self, max_videos: int = None, published_after: datetime = None) -> tuple:
+        if max_videos is None:
+            max_videos = settings.ANALYTICS_MAX_VIDEOS or None
+        if published_after is None and settings.ANALYTICS_LOOKBACK_DAYS:
+            published_after = datetime.now(timezone.utc) - timedelta(days=settings.ANALYTICS_LOOKBACK_DAYS)
+        return max_videos, published_after
+    
+    def detect_outliers(self, channel_id: str, max_videos: int = None, published_after: datetime = None) -> dict:
         """Detect outlier videos using IQR method and SmartScore."""
         try:
             logger.info(f"[AnalyticsService] ===== OUTLIER DETECTION START =====")
             logger.info(f"[AnalyticsService] Channel ID: {channel_id}")
             
             # Get channel videos
-            videos = youtube_client.get_channel_videos(channel_id, max_results=50)
-            logger.info(f"[AnalyticsService] Retrieved {len(videos)} videos")
-            
-            if len(videos) < 4:
-                logger.warning(f"[AnalyticsService] Not enough videos: {len(videos)} (need 4+)")
-                return {
-                    'channel_id': channel_id,
-                    'error': 'Not enough videos for outlier detection (minimum 4 required)',
-                    'high_outliers': [],
-                    'low_outliers': []
-                }
-            
-            # Calculate SmartScores for all videos
-            video_scores = []
-            for video in videos:
-                # Calculate velocity (views per day)
-                publish_date = datetime.fromisoformat(video['publish_date'].replace('Z', '+00:00'))
-                days_old = (datetime.now(timezone.utc) - publish_date).days
-                days_old = max(1, days_old)
-                velocity = video['views'] / days_old
-                
-                # Calculate engagement rate
-                total_engagement = video['likes'] + video['comments']
-                engagement = (total_engagement / video['views']) if video['views'] > 0 else 0
-                
-                video_scores.append({
-                    'video': video,
-                    'views': video['views'],
-                    'velocity': velocity,
-                    'engagement': engagement
-                })
-            
-            # Find max values for normalization
-            max_views = max(v['views'] for v in video_scores)
-            max_velocity = max(v['velocity'] for v in video_scores)
-            max_engagement = max(v['engagement'] for v in video_scores)
-            
-            # Calculate SmartScore for each video
-            for item in video_scores:
-                smart_score = self.calculate_smart_score(
-                    item['views'], item['velocity'], item['engagement'],
-                    max_views, max_velocity, max_engagement
-                )
-                item['smart_score'] = smart_score
-            
-            # Calculate IQR
-            scores = [item['smart_score'] for item in video_scores]
-            scores.sort()
-            
-            q1 = statistics.quantiles(scores, n=4)[0]
-            q3 = statistics.quantiles(scores, n=4)[2]
-            iqr = q3 - q1
-            
-            lower_bound = q1 - (1.5 * iqr)
-            upper_bound = q3 + (1.5 * iqr)
-            
-            # Identify outliers
-            high_outliers = []
-            low_outliers = []
-            
-            for item in video_scores:
-                video = item['video']
-                score = item['smart_score']
-                
-                outlier_data = {
-                    'video_id': video['id'],
-                    'title': video['title'],
-                    'thumbnail_url': video['thumbnail_url'],
-                    'views': video['views'],
-                    'likes': video['likes'],
-                    'comments': video['comments'],
-                    'publish_date': video['publish_date'],
-                    'views_per_day': round(item['velocity'], 2),
-                    'engagement_rate': round(item['engagement'] * 100, 2),
-                    'smart_score': round(score, 4)
-                }
-                
-                if score > upper_bound:
-                    high_outliers.append(outlier_data)
-                elif score < lower_bound:
-                    low_outliers.append(outlier_data)
-            
-            # Sort by smart_score
-            high_outliers.sort(key=lambda x: x['smart_score'], reverse=True)
-            low_outliers.sort(key=lambda x: x['smart_score'])
-            
-            logger.info(f"[AnalyticsService] Found {len(high_outliers)} high outliers, {len(low_outliers)} low outliers")
-            logger.info(f"[AnalyticsService] ===== OUTLIER DETECTION COMPLETE =====")
-            
-            return {
-                'channel_id': channel_id,
-                'total_videos': len(videos),
-                'high_outliers': high_outliers,
-                'low_outliers': low_outliers,
-                'statistics': {
-                    'q1': round(q1, 4),
-                    'q3': round(q3, 4),
-                    'iqr': round(iqr, 4),
-                    'lower_bound': round(lower_bound, 4),
-                    'upper_bound': round(upper_bound, 4)
-                }
-            }
+            videos = self._load_channel_videos(channel_id, max_videos, published_after)
+            return self._outlier_report(channel_id, videos)
+        except DeadlineExceeded:
+            raise
         except YouTubeAPIError as e:
             logger.error(f"[AnalyticsService] YouTube API error: {str(e)}", exc_info=True)
             return {'channel_id': channel_id, 'error': str(e), 'high_outliers': [], 'low_outliers': []}
@@ -130,125 +170,171 @@ class AnalyticsService:
             logger.error(f"[AnalyticsService] Unexpected error: {str(e)}", exc_info=True)
             return {'channel_id': channel_id, 'error': str(e), 'high_outliers': [], 'low_outliers': []}
     
-    def analyze_upload_streak(self, channel_id: str) -> dict:
+    async def adetect_outliers(self, channel_id: str, max_videos: int = None, published_after: datetime = None) -> dict:
+        """detect_outliers() on the async YouTube client and async ORM, for async views."""
+        try:
+            logger.info(f"[AnalyticsService] ===== OUTLIER DETECTION START =====")
+            logger.info(f"[AnalyticsService] Channel ID: {channel_id}")
+            videos = await self._aload_channel_videos(channel_id, max_videos, published_after)
+            return self._outlier_report(channel_id, videos)
+        except DeadlineExceeded:
+            raise
+        except YouTubeAPIError as e:
+            logger.error(f"[AnalyticsService] YouTube API error: {str(e)}", exc_info=True)
+            return {'channel_id': channel_id, 'error': str(e), 'high_outliers': [], 'low_outliers': []}
+        except Exception as e:
+            logger.error(f"[AnalyticsService] Unexpected error: {str(e)}", exc_info=True)
+            return {'channel_id': channel_id, 'error': str(e), 'high_outliers': [], 'low_outliers': []}
+    
+    def _outlier_report(self, channel_id: str, videos: list) -> dict:
+        logger.info(f"[AnalyticsService] Retrieved {len(videos)} videos")
+        
+        if len(videos) < 4:
+            logger.warning(f"[AnalyticsService] Not enough videos: {len(videos)} (need 4+)")
+            return {
+                'channel_id': channel_id,
+                'error': 'Not enough videos for outlier detection (minimum 4 required)',
+                'high_outliers': [],
+                'low_outliers': []
+            }
+        
+        # Calculate SmartScores for all videos
+        video_scores = []
+        for video in videos:
+            # Calculate velocity (views per day)
+            publish_date = datetime.fromisoformat(video['publish_date'].replace('Z', '+00:00'))
+            days_old = (datetime.now(timezone.utc) - publish_date).days
+            days_old = max(1, days_old)
+            velocity = video['views'] / days_old
+        
+            # Calculate engagement rate
+            total_engagement = video['likes'] + video['comments']
+            engagement = (total_engagement / video['views']) if video['views'] > 0 else 0
+        
+            video_scores.append({
+                'video': video,
+                'views': video['views'],
+                'velocity': velocity,
+                'engagement': engagement
+            })
+        
+        # Find max values for normalization
+        max_views = max(v['views'] for v in video_scores)
+        max_velocity = max(v['velocity'] for v in video_scores)
+        max_engagement = max(v['engagement'] for v in video_scores)
+        
+        # Calculate SmartScore for each video
+        for item in video_scores:
+            smart_score = self.calculate_smart_score(
+                item['views'], item['velocity'], item['engagement'],
+                max_views, max_velocity, max_engagement
+            )
+            item['smart_score'] = smart_score
+        
+        # Calculate IQR
+        scores = [item['smart_score'] for item in video_scores]
+        scores.sort()
+        
+        q1 = statistics.quantiles(scores, n=4)[0]
+        q3 = statistics.quantiles(scores, n=4)[2]
+        iqr = q3 - q1
+        
+        lower_bound = q1 - (1.5 * iqr)
+        upper_bound = q3 + (1.5 * iqr)
+        
+        # Identify outliers
+        high_outliers = []
+        low_outliers = []
+        
+        for item in video_scores:
+            video = item['video']
+            score = item['smart_score']
+        
+            outlier_data = {
+                'video_id': video['id'],
+                'title': video['title'],
+                'thumbnail_url': video['thumbnail_url'],
+                'views': video['views'],
+                'likes': video['likes'],
+                'comments': video['comments'],
+                'publish_date': video['publish_date'],
+                'views_per_day': round(item['velocity'], 2),
+                'engagement_rate': round(item['engagement'] * 100, 2),
+                'smart_score': round(score, 4)
+            }
+        
+            if score > upper_bound:
+                high_outliers.append(outlier_data)
+            elif score < lower_bound:
+                low_outliers.append(outlier_data)
+        
+        # Sort by smart_score
+        high_outliers.sort(key=lambda x: x['smart_score'], reverse=True)
+        low_outliers.sort(key=lambda x: x['smart_score'])
+        
+        logger.info(f"[AnalyticsService] Found {len(high_outliers)} high outliers, {len(low_outliers)} low outliers")
+        logger.info(f"[AnalyticsService] ===== OUTLIER DETECTION COMPLETE =====")
+        
+        return {
+            'channel_id': channel_id,
+            'total_videos': len(videos),
+            'high_outliers': high_outliers,
+            'low_outliers': low_outliers,
+            'statistics': {
+                'q1': round(q1, 4),
+                'q3': round(q3, 4),
+                'iqr': round(iqr, 4),
+                'lower_bound': round(lower_bound, 4),
+                'upper_bound': round(upper_bound, 4)
+            }
+        }
+    
+    def analyze_upload_streak(self, channel_id: str, max_videos: int = None, published_after: datetime = None) -> dict:
         """Analyze upload consistency and calculate algorithm score."""
         try:
             logger.info(f"[AnalyticsService] ===== UPLOAD STREAK ANALYSIS START =====")
             logger.info(f"[AnalyticsService] Channel ID: {channel_id}")
             
-            # Get last 50 videos
-            videos = youtube_client.get_channel_videos(channel_id, max_results=50)
+            # Get channel upload history
+            videos = self._load_channel_videos(channel_id, max_videos, published_after)
             logger.info(f"[AnalyticsService] Retrieved {len(videos)} videos")
-            
             if not videos:
-                logger.warning(f"[AnalyticsService] No videos found for channel")
-                return {
-                    'channel_id': channel_id,
-                    'error': 'No videos found for channel',
-                    'algorithm_score': 0
-                }
-            
-            # Separate Shorts and regular videos
-            shorts = []
-            regular = []
-            
-            for video in videos:
-                duration = video.get('duration', '')
-                # Parse ISO 8601 duration (e.g., PT1M30S)
-                is_short = self._is_short_video(duration)
-                
-                if is_short:
-                    shorts.append(video)
-                else:
-                    regular.append(video)
-            
-            # Calculate upload consistency
-            upload_dates = []
-            for video in videos:
-                publish_date = datetime.fromisoformat(video['publish_date'].replace('Z', '+00:00'))
-                upload_dates.append(publish_date)
-            
-            upload_dates.sort()
-            
-            # Calculate gaps between uploads
-            gaps = []
-            for i in range(1, len(upload_dates)):
-                gap = (upload_dates[i] - upload_dates[i-1]).days
-                gaps.append(gap)
-            
-            # Calculate consistency metrics
-            avg_gap = statistics.mean(gaps) if gaps else 0
-            consistency = 100 - min(statistics.stdev(gaps) if len(gaps) > 1 else 0, 100)
-            
-            # Calculate view performance
-            avg_views = statistics.mean([v['views'] for v in videos]) if videos else 0
-            
-            # Calculate engagement
-            total_engagement = sum(v['likes'] + v['comments'] for v in videos)
-            total_views = sum(v['views'] for v in videos)
-            engagement_rate = (total_engagement / total_views * 100) if total_views > 0 else 0
-            
-            # Calculate algorithm score (0-100)
-            # 40% consistency, 30% frequency, 30% engagement
-            frequency_score = min(100, (30 / max(avg_gap, 1)) * 100)
-            consistency_score = consistency
-            engagement_score = min(100, engagement_rate * 10)
-            
-            algorithm_score = int(
-                (0.4 * consistency_score) +
-                (0.3 * frequency_score) +
-                (0.3 * engagement_score)
-            )
-            
-            # Generate recommendations
-            recommended_days = self._recommend_upload_days(upload_dates)
-            view_prediction = int(avg_views * 1.1)  # Predict 10% growth
-            
-            # Generate AI growth suggestions
-            channel_data = {
-                'total_videos': len(videos),
-                'avg_gap_days': round(avg_gap, 1),
-                'consistency_score': round(consistency, 1),
-                'engagement_rate': round(engagement_rate, 2),
-                'algorithm_score': algorithm_score
-            }
-            
-            try:
-                growth_suggestions = gemini_client.generate_growth_suggestions(channel_data)
-            except AIServiceUnavailable:
-                logger.warning(f"[AnalyticsService] Gemini unavailable, using fallback suggestions")
-                growth_suggestions = self._fallback_suggestions(algorithm_score, avg_gap)
-            
-            logger.info(f"[AnalyticsService] Algorithm Score: {algorithm_score}")
-            logger.info(f"[AnalyticsService] ===== UPLOAD STREAK ANALYSIS COMPLETE =====")
-            
-            return {
-                'channel_id': channel_id,
-                'algorithm_score': algorithm_score,
-                'total_videos': len(videos),
-                'shorts_count': len(shorts),
-                'regular_count': len(regular),
-                'consistency_metrics': {
-                    'avg_gap_days': round(avg_gap, 1),
-                    'consistency_score': round(consistency, 1),
-                    'frequency_score': round(frequency_score, 1),
-                    'engagement_score': round(engagement_score, 1)
-                },
-                'performance': {
-                    'avg_views': int(avg_views),
-                    'total_views': total_views,
-                    'engagement_rate': round(engagement_rate, 2)
-                },
-                'upload_schedule': {
-                    'recommended_days': recommended_days,
-                    'current_avg_gap': round(avg_gap, 1)
-                },
-                'view_predictions': {
-                    'next_video': view_prediction,
-                    'based_on_avg': int(avg_views)
-                },
-                'growth_suggestions': growth_suggestions
-            }
+                return self._no_videos_report(channel_id)
+            
+            report, channel_data, avg_gap = self._streak_report(channel_id, videos)
+            
+            # Suggestions are optional: a slow Gemini gets ANALYTICS_SUGGESTIONS_TIMEOUT,
+            # not the rest of the request budget
+            results = fan_out('analytics', {
+                'suggestions': lambda: gemini_client.generate_growth_suggestions(channel_data),
+            }, timeouts={'suggestions': settings.ANALYTICS_SUGGESTIONS_TIMEOUT})
+            return self._with_suggestions(report, results, avg_gap)
+        except DeadlineExceeded:
+            raise
+        except YouTubeAPIError as e:
+            logger.error(f"[AnalyticsService] YouTube API error: {str(e)}", exc_info=True)
+            return {'channel_id': channel_id, 'error': str(e), 'algorithm_score': 0}
+        except Exception as e:
+            logger.error(f"[AnalyticsService] Unexpected error: {str(e)}", exc_info=True)
+            return {'channel_id': channel_id, 'error': str(e), 'algorithm_score': 0}
+    
+    async def aanalyze_upload_streak(self, channel_id: str, max_videos: int = None, published_after: datetime = None) -> dict:
+        """analyze_upload_streak() on the async YouTube and Gemini clients and async ORM, for async views."""
+        try:
+            logger.info(f"[AnalyticsService] ===== UPLOAD STREAK ANALYSIS START =====")
+            logger.info(f"[AnalyticsService] Channel ID: {channel_id}")
+            videos = await self._aload_channel_videos(channel_id, max_videos, published_after)
+            logger.info(f"[AnalyticsService] Retrieved {len(videos)} videos")
+            if not videos:
+                return self._no_videos_report(channel_id)
+            
+            report, channel_data, avg_gap = self._streak_report(channel_id, videos)
+            results = await afan_out('analytics', {
+                'suggestions': lambda: async_gemini_client.generate_growth_suggestions(channel_data),
+            }, timeouts={'suggestions': settings.ANALYTICS_SUGGESTIONS_TIMEOUT})
+            return self._with_suggestions(report, results, avg_gap)
+        except DeadlineExceeded:
+            raise
         except YouTubeAPIError as e:
             logger.error(f"[AnalyticsService] YouTube API error: {str(e)}", exc_info=True)
             return {'channel_id': channel_id, 'error': str(e), 'algorithm_score': 0}
@@ -256,6 +342,120 @@ class AnalyticsService:
             logger.error(f"[AnalyticsService] Unexpected error: {str(e)}", exc_info=True)
             return {'channel_id': channel_id, 'error': str(e), 'algorithm_score': 0}
     
+    def _no_videos_report(self, channel_id: str) -> dict:
+        logger.warning(f"[AnalyticsService] No videos found for channel")
+        return {
+            'channel_id': channel_id,
+            'error': 'No videos found for channel',
+            'algorithm_score': 0
+        }
+    
+    def _streak_report(self, channel_id: str, videos: list) -> tuple:
+        """(report without growth suggestions, data to base the suggestions on, average gap in days)."""
+        # Separate Shorts and regular videos
+        shorts = []
+        regular = []
+        
+        for video in videos:
+            duration = video.get('duration', '')
+            # Parse ISO 8601 duration (e.g., PT1M30S)
+            is_short = self._is_short_video(duration)
+        
+            if is_short:
+                shorts.append(video)
+            else:
+                regular.append(video)
+        
+        # Calculate upload consistency
+        upload_dates = []
+        for video in videos:
+            publish_date = datetime.fromisoformat(video['publish_date'].replace('Z', '+00:00'))
+            upload_dates.append(publish_date)
+        
+        upload_dates.sort()
+        
+        # Calculate gaps between uploads
+        gaps = []
+        for i in range(1, len(upload_dates)):
+            gap = (upload_dates[i] - upload_dates[i-1]).days
+            gaps.append(gap)
+        
+        # Calculate consistency metrics
+        avg_gap = statistics.mean(gaps) if gaps else 0
+        consistency = 100 - min(statistics.stdev(gaps) if len(gaps) > 1 else 0, 100)
+        
+        # Calculate view performance
+        avg_views = statistics.mean([v['views'] for v in videos]) if videos else 0
+        
+        # Calculate engagement
+        total_engagement = sum(v['likes'] + v['comments'] for v in videos)
+        total_views = sum(v['views'] for v in videos)
+        engagement_rate = (total_engagement / total_views * 100) if total_views > 0 else 0
+        
+        # Calculate algorithm score (0-100)
+        # 40% consistency, 30% frequency, 30% engagement
+        frequency_score = min(100, (30 / max(avg_gap, 1)) * 100)
+        consistency_score = consistency
+        engagement_score = min(100, engagement_rate * 10)
+        
+        algorithm_score = int(
+            (0.4 * consistency_score) +
+            (0.3 * frequency_score) +
+            (0.3 * engagement_score)
+        )
+        
+        # Generate recommendations
+        recommended_days = self._recommend_upload_days(upload_dates)
+        view_prediction = int(avg_views * 1.1)  # Predict 10% growth
+        
+        # Generate AI growth suggestions
+        channel_data = {
+            'total_videos': len(videos),
+            'avg_gap_days': round(avg_gap, 1),
+            'consistency_score': round(consistency, 1),
+            'engagement_rate': round(engagement_rate, 2),
+            'algorithm_score': algorithm_score
+        }
+        
+        report = {
+            'channel_id': channel_id,
+            'algorithm_score': algorithm_score,
+            'total_videos': len(videos),
+            'shorts_count': len(shorts),
+            'regular_count': len(regular),
+            'consistency_metrics': {
+                'avg_gap_days': round(avg_gap, 1),
+                'consistency_score': round(consistency, 1),
+                'frequency_score': round(frequency_score, 1),
+                'engagement_score': round(engagement_score, 1)
+            },
+            'performance': {
+                'avg_views': int(avg_views),
+                'total_views': total_views,
+                'engagement_rate': round(engagement_rate, 2)
+            },
+            'upload_schedule': {
+                'recommended_days': recommended_days,
+                'current_avg_gap': round(avg_gap, 1)
+            },
+            'view_predictions': {
+                'next_video': view_prediction,
+                'based_on_avg': int(avg_views)
+            }
+        }
+        return report, channel_data, avg_gap
+    
+    def _with_suggestions(self, report: dict, results, avg_gap: float) -> dict:
+        if results.ok('suggestions'):
+            report['growth_suggestions'] = results['suggestions']
+        else:
+            logger.warning(f"[AnalyticsService] Gemini unavailable, using fallback suggestions")
+            report['growth_suggestions'] = self._fallback_suggestions(report['algorithm_score'], avg_gap)
+        
+        logger.info(f"[AnalyticsService] Algorithm Score: {report['algorithm_score']}")
+        logger.info(f"[AnalyticsService] ===== UPLOAD STREAK ANALYSIS COMPLETE =====")
+        return report
+    
     def _is_short_video(self, duration: str) -> bool:
         """Check if video is a Short (≤60 seconds)."""
         if not duration:
@@ -316,6 +516,23 @@ class AnalyticsService:
                 return self._search_by_image(image_url)
             else:
                 return {'results': [], 'error': 'No search criteria provided'}
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f'Thumbnail search error: {str(e)}')
+            return {'results': [], 'error': str(e)}
+    
+    async def asearch_thumbnails(self, query: str = None, image_url: str = None) -> dict:
+        """search_thumbnails() on the async YouTube and Gemini clients, for async views."""
+        try:
+            if query:
+                return await self._asearch_by_text(query)
+            elif image_url:
+                return await self._asearch_by_image(image_url)
+            else:
+                return {'results': [], 'error': 'No search criteria provided'}
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f'Thumbnail search error: {str(e)}')
             return {'results': [], 'error': str(e)}
@@ -324,45 +541,28 @@ class AnalyticsService:
         """Search videos by text query."""
         try:
             videos = youtube_client.search_videos(query, max_results=20)
-            
-            results = []
-            for video in videos:
-                # Calculate days since publish
-                publish_date = datetime.fromisoformat(video['publish_date'].replace('Z', '+00:00'))
-                days_old = (datetime.now(timezone.utc) - publish_date).days
-                days_old = max(1, days_old)
-                
-                # Calculate views per day
-                views_per_day = video['views'] / days_old
-                
-                # Calculate engagement rate
-                total_engagement = video['likes'] + video['comments']
-                engagement_rate = (total_engagement / video['views'] * 100) if video['views'] > 0 else 0
-                
-                results.append({
-                    'video_id': video['id'],
-                    'title': video['title'],
-                    'thumbnail_url': video['thumbnail_url'],
-                    'channel_title': video['channel_title'],
-                    'views': video['views'],
-                    'likes': video['likes'],
-                    'comments': video['comments'],
-                    'publish_date': video['publish_date'],
-                    'views_per_day': round(views_per_day, 2),
-                    'engagement_rate': round(engagement_rate, 2),
-                    'days_old': days_old
-                })
-            
-            return {
-                'search_type': 'text',
-                'query': query,
-                'total_results': len(results),
-                'results': results
-            }
+            return self._text_results(query, videos)
         except YouTubeAPIError as e:
             logger.error(f'YouTube API error in text search: {str(e)}')
             return {'results': [], 'error': str(e)}
     
+    async def _asearch_by_text(self, query: str) -> dict:
+        try:
+            videos = await async_youtube_client.search_videos(query, max_results=20)
+            return self._text_results(query, videos)
+        except YouTubeAPIError as e:
+            logger.error(f'YouTube API error in text search: {str(e)}')
+            return {'results': [], 'error': str(e)}
+    
+    def _text_results(self, query: str, videos: list) -> dict:
+        results = self._search_rows(videos)
+        return {
+            'search_type': 'text',
+            'query': query,
+            'total_results': len(results),
+            'results': results
+        }
+    
     def _search_by_image(self, image_url: str) -> dict:
         """Search videos by image similarity using AI tags."""
         try:
@@ -375,41 +575,69 @@ class AnalyticsService:
             # Use the first few tags as search query
             search_query = ' '.join(tags[:3])
             
-            # Search videos using generated tags
-            videos = youtube_client.search_videos(search_query, max_results=15)
+            # Search videos using generated tags; when the quota budget is low,
+            # only previously cached (possibly stale) searches are served
+            videos = youtube_client.search_videos(
+                search_query, max_results=15, cache_only=youtube_client.quota_is_low()
+            )
+            return self._image_results(image_url, tags, search_query, videos)
+        except (YouTubeAPIError, AIServiceUnavailable, RateLimitExceeded) as e:
+            logger.error(f'Error in image search: {str(e)}')
+            return {'results': [], 'error': str(e)}
+    
+    async def _asearch_by_image(self, image_url: str) -> dict:
+        try:
+            tags = await async_gemini_client.analyze_thumbnail(image_url)
             
-            results = []
-            for video in videos:
-                publish_date = datetime.fromisoformat(video['publish_date'].replace('Z', '+00:00'))
-                days_old = (datetime.now(timezone.utc) - publish_date).days
-                days_old = max(1, days_old)
-                
-                views_per_day = video['views'] / days_old
-                total_engagement = video['likes'] + video['comments']
-                engagement_rate = (total_engagement / video['views'] * 100) if video['views'] > 0 else 0
-                
-                results.append({
-                    'video_id': video['id'],
-                    'title': video['title'],
-                    'thumbnail_url': video['thumbnail_url'],
-                    'channel_title': video['channel_title'],
-                    'views': video['views'],
-                    'likes': video['likes'],
-                    'comments': video['comments'],
-                    'publish_date': video['publish_date'],
-                    'views_per_day': round(views_per_day, 2),
-                    'engagement_rate': round(engagement_rate, 2),
-                    'days_old': days_old
-                })
+            if not tags:
+                return {'results': [], 'error': 'Could not generate tags for image'}
             
-            return {
-                'search_type': 'image',
-                'image_url': image_url,
-                'generated_tags': tags,
-                'search_query': search_query,
-                'total_results': len(results),
-                'results': results
-            }
-        except (YouTubeAPIError, AIServiceUnavailable) as e:
+            search_query = ' '.join(tags[:3])
+            videos = await async_youtube_client.search_videos(
+                search_query, max_results=15, cache_only=await async_youtube_client.quota_is_low()
+            )
+            return self._image_results(image_url, tags, search_query, videos)
+        except (YouTubeAPIError, AIServiceUnavailable, RateLimitExceeded) as e:
             logger.error(f'Error in image search: {str(e)}')
             return {'results': [], 'error': str(e)}
+    
+    def _image_results(self, image_url: str, tags: list, search_query: str, videos: list) -> dict:
+        results = self._search_rows(videos)
+        return {
+            'search_type': 'image',
+            'image_url': image_url,
+            'generated_tags': tags,
+            'search_query': search_query,
+            'total_results': len(results),
+            'results': results
+        }
+    
+    def _search_rows(self, videos: list) -> list:
+        results = []
+        for video in videos:
+            # Calculate days since publish
+            publish_date = datetime.fromisoformat(video['publish_date'].replace('Z', '+00:00'))
+            days_old = (datetime.now(timezone.utc) - publish_date).days
+            days_old = max(1, days_old)
+            
+            # Calculate views per day
+            views_per_day = video['views'] / days_old
+            
+            # Calculate engagement rate
+            total_engagement = video['likes'] + video['comments']
+            engagement_rate = (total_engagement / video['views'] * 100) if video['views'] > 0 else 0
+            
+            results.append({
+                'video_id': video['id'],
+                'title': video['title'],
+                'thumbnail_url': video['thumbnail_url'],
+                'channel_title': video['channel_title'],
+                'views': video['views'],
+                'likes': video['likes'],
+                'comments': video['comments'],
+                'publish_date': video['publish_date'],
+                'views_per_day': round(views_per_day, 2),
+                'engagement_rate': round(engagement_rate, 2),
+                'days_old': days_old
+            })
+        return results
@@ -1,8 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from .views import OutlierView, UploadStreakView, ThumbnailSearchView
+from .views import OutlierView, UploadStreakView, ThumbnailSearchView, OutlierAsyncView, UploadStreakAsyncView, ThumbnailSearchAsyncView
 
 urlpatterns = [
-    path('outlier/', OutlierView.as_view(), name='outlier'),
-    path('upload-streak/', UploadStreakView.as_view(), name='upload_streak'),
-    path('thumbnail-search/', ThumbnailSearchView.as_view(), name='thumbnail_search'),
+    path('outlier/', (OutlierAsyncView if settings.ASYNC_VIEWS else OutlierView).as_view(), name='outlier'),
+    path('upload-streak/', (UploadStreakAsyncView if settings.ASYNC_VIEWS else UploadStreakView).as_view(), name='upload_streak'),
+    path('thumbnail-search/', (ThumbnailSearchAsyncView if settings.ASYNC_VIEWS else ThumbnailSearchView).as_view(), name='thumbnail_search'),
 ]
@@ -3,8 +3,10 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from adrf.views import APIView as AsyncAPIView
 from .serializers import OutlierSerializer, UploadStreakSerializer, ThumbnailSearchSerializer
 from .services import AnalyticsService
+from core.exceptions import DeadlineExceeded
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +25,28 @@ class OutlierView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            serializer = OutlierSerializer(data=request.query_params)
+            if not serializer.is_valid():
+                logger.warning(f"[OutlierView] Invalid params: {serializer.errors}")
+                return Response(
+                    {'error': {'code': 'VALIDATION_ERROR', 'message': 'Invalid parameters', 'details': serializer.errors}},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
             service = AnalyticsService()
-            result = service.detect_outliers(channel_id=channel_id)
+            result = service.detect_outliers(
+                channel_id=channel_id,
+                max_videos=serializer.validated_data.get('max_videos'),
+                published_after=serializer.validated_data.get('published_after')
+            )
             logger.info(f"[OutlierView] Success: {len(result.get('high_outliers', []))} high, {len(result.get('low_outliers', []))} low")
             return Response(result, status=status.HTTP_200_OK)
+        except DeadlineExceeded as e:
+            logger.warning(f"[OutlierView] {e.message}")
+            return Response(
+                {'error': {'code': e.code, 'message': e.message, 'details': {}}},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
         except Exception as e:
             logger.error(f"[OutlierView] Error: {str(e)}", exc_info=True)
             return Response(
@@ -49,10 +69,28 @@ class UploadStreakView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            serializer = UploadStreakSerializer(data=request.query_params)
+            if not serializer.is_valid():
+                logger.warning(f"[UploadStreakView] Invalid params: {serializer.errors}")
+                return Response(
+                    {'error': {'code': 'VALIDATION_ERROR', 'message': 'Invalid parameters', 'details': serializer.errors}},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
             service = AnalyticsService()
-            result = service.analyze_upload_streak(channel_id=channel_id)
+            result = service.analyze_upload_streak(
+                channel_id=channel_id,
+                max_videos=serializer.validated_data.get('max_videos'),
+                published_after=serializer.validated_data.get('published_after')
+            )
             logger.info(f"[UploadStreakView] Success: Score={result.get('algorithm_score', 0)}, Videos={result.get('total_videos', 0)}")
             return Response(result, status=status.HTTP_200_OK)
+        except DeadlineExceeded as e:
+            logger.warning(f"[UploadStreakView] {e.message}")
+            return Response(
+                {'error': {'code': e.code, 'message': e.message, 'details': {}}},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
         except Exception as e:
             logger.error(f"[UploadStreakView] Error: {str(e)}", exc_info=True)
             return Response(
@@ -77,6 +115,134 @@ class ThumbnailSearchView(APIView):
             service = AnalyticsService()
             result = service.search_thumbnails(query=query, image_url=image_url)
             return Response(result, status=status.HTTP_200_OK)
+        except DeadlineExceeded as e:
+            logger.warning(f"[ThumbnailSearchView] {e.message}")
+            return Response(
+                {'error': {'code': e.code, 'message': e.message, 'details': {}}},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f'Thumbnail search error: {str(e)}')
+            return Response(
+                {'error': {'code': 'THUMBNAIL_SEARCH_ERROR', 'message': str(e)}},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# Async variants, served when ASYNC_VIEWS is on. They page through a channel's
+# uploads with the async YouTube client, so no worker thread is held per request.
+
+class OutlierAsyncView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    
+    async def get(self, request):
+        try:
+            channel_id = request.query_params.get('channel_id')
+            logger.info(f"[OutlierView] Request from {request.user.email}, channel_id: {channel_id}")
+            
+            if not channel_id:
+                logger.warning(f"[OutlierView] Missing channel_id")
+                return Response(
+                    {'error': {'code': 'VALIDATION_ERROR', 'message': 'channel_id required'}},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            serializer = OutlierSerializer(data=request.query_params)
+            if not serializer.is_valid():
+                logger.warning(f"[OutlierView] Invalid params: {serializer.errors}")
+                return Response(
+                    {'error': {'code': 'VALIDATION_ERROR', 'message': 'Invalid parameters', 'details': serializer.errors}},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            service = AnalyticsService()
+            result = await service.adetect_outliers(
+                channel_id=channel_id,
+                max_videos=serializer.validated_data.get('max_videos'),
+                published_after=serializer.validated_data.get('published_after')
+            )
+            logger.info(f"[OutlierView] Success: {len(result.get('high_outliers', []))} high, {len(result.get('low_outliers', []))} low")
+            return Response(result, status=status.HTTP_200_OK)
+        except DeadlineExceeded as e:
+            logger.warning(f"[OutlierView] {e.message}")
+            return Response(
+                {'error': {'code': e.code, 'message': e.message, 'details': {}}},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"[OutlierView] Error: {str(e)}", exc_info=True)
+            return Response(
+                {'error': {'code': 'OUTLIER_DETECTION_ERROR', 'message': str(e)}},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class UploadStreakAsyncView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    
+    async def get(self, request):
+        try:
+            channel_id = request.query_params.get('channel_id')
+            logger.info(f"[UploadStreakView] Request from {request.user.email}, channel_id: {channel_id}")
+            
+            if not channel_id:
+                logger.warning(f"[UploadStreakView] Missing channel_id")
+                return Response(
+                    {'error': {'code': 'VALIDATION_ERROR', 'message': 'channel_id required'}},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            serializer = UploadStreakSerializer(data=request.query_params)
+            if not serializer.is_valid():
+                logger.warning(f"[UploadStreakView] Invalid params: {serializer.errors}")
+                return Response(
+                    {'error': {'code': 'VALIDATION_ERROR', 'message': 'Invalid parameters', 'details': serializer.errors}},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            service = AnalyticsService()
+            result = await service.aanalyze_upload_streak(
+                channel_id=channel_id,
+                max_videos=serializer.validated_data.get('max_videos'),
+                published_after=serializer.validated_data.get('published_after')
+            )
+            logger.info(f"[UploadStreakView] Success: Score={result.get('algorithm_score', 0)}, Videos={result.get('total_videos', 0)}")
+            return Response(result, status=status.HTTP_200_OK)
+        except DeadlineExceeded as e:
+            logger.warning(f"[UploadStreakView] {e.message}")
+            return Response(
+                {'error': {'code': e.code, 'message': e.message, 'details': {}}},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"[UploadStreakView] Error: {str(e)}", exc_info=True)
+            return Response(
+                {'error': {'code': 'UPLOAD_STREAK_ERROR', 'message': str(e)}},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class ThumbnailSearchAsyncView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    
+    async def get(self, request):
+        try:
+            query = request.query_params.get('query')
+            image_url = request.query_params.get('image_url')
+            
+            if not query and not image_url:
+                return Response(
+                    {'error': {'code': 'VALIDATION_ERROR', 'message': 'query or image_url required'}},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            service = AnalyticsService()
+            result = await service.asearch_thumbnails(query=query, image_url=image_url)
+            return Response(result, status=status.HTTP_200_OK)
+        except DeadlineExceeded as e:
+            logger.warning(f"[ThumbnailSearchView] {e.message}")
+            return Response(
+                {'error': {'code': e.code, 'message': e.message, 'details': {}}},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
         except Exception as e:
             logger.error(f'Thumbnail search error: {str(e)}')
             return Response(
@@ -1,6 +1,6 @@
 import logging
 from .models import AIContent
-from core.clients.gemini import gemini_client
+from core.clients.gemini import gemini_client, async_gemini_client
 from core.exceptions import AIServiceUnavailable
 
 logger = logging.getLogger(__name__)
@@ -45,19 +45,7 @@ class ContentService:
             logger.info(f"Generating content for topic '{topic}' for user {user.email}")
             
             # Generate content using Gemini AI
-            content_data = gemini_client.generate_video_concepts(topic)
-            
-            # Validate structure
-            if not self._validate_content_structure(content_data):
-                logger.warning("AI generated invalid structure, using fallback")
-                content_data = self._get_fallback_content(topic)
-            
-            # Ensure exactly 3 concepts
-            if len(content_data.get('concepts', [])) != 3:
-                logger.warning(f"AI generated {len(content_data.get('concepts', []))} concepts, expected 3")
-                content_data = self._get_fallback_content(topic)
-            
-            logger.info(f"Successfully generated {len(content_data['concepts'])} concepts")
+            content_data = self._checked_content(topic, gemini_client.generate_video_concepts(topic))
             
         except AIServiceUnavailable as e:
             logger.error(f"AI service unavailable: {str(e)}, using fallback")
@@ -74,11 +62,49 @@ class ContentService:
         )
         
         logger.info(f"Content saved to database with ID {ai_content.id}")
+        return self._as_result(ai_content, topic)
+    
+    async def agenerate_content(self, topic: str, user) -> dict:
+        """generate_content() on the async Gemini client and async ORM, for async views."""
+        try:
+            logger.info(f"Generating content for topic '{topic}' for user {user.email}")
+            content_data = self._checked_content(topic, await async_gemini_client.generate_video_concepts(topic))
+        except AIServiceUnavailable as e:
+            logger.error(f"AI service unavailable: {str(e)}, using fallback")
+            content_data = self._get_fallback_content(topic)
+        except Exception as e:
+            logger.error(f"Unexpected error during content generation: {str(e)}, using fallback")
+            content_data = self._get_fallback_content(topic)
+        
+        ai_content = await AIContent.objects.acreate(
+            user=user,
+            user_input=topic,
+            content=content_data
+        )
+        
+        logger.info(f"Content saved to database with ID {ai_content.id}")
+        return self._as_result(ai_content, topic)
+    
+    def _checked_content(self, topic: str, content_data: dict) -> dict:
+        """The AI concepts if well-formed (exactly 3 valid concepts), else the fallback."""
+        # Validate structure
+        if not self._validate_content_structure(content_data):
+            logger.warning("AI generated invalid structure, using fallback")
+            return self._get_fallback_content(topic)
         
+        # Ensure exactly 3 concepts
+        if len(content_data.get('concepts', [])) != 3:
+            logger.warning(f"AI generated {len(content_data.get('concepts', []))} concepts, expected 3")
+            return self._get_fallback_content(topic)
+        
+        logger.info(f"Successfully generated {len(content_data['concepts'])} concepts")
+        return content_data
+    
+    def _as_result(self, ai_content: AIContent, topic: str) -> dict:
         return {
             'id': ai_content.id,
             'topic': topic,
-            'content': content_data,
+            'content': ai_content.content,
             'created_at': ai_content.created_at.isoformat()
         }
     
@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import path
-from .views import ContentGenerateView, ContentHistoryView
+from .views import ContentGenerateView, ContentHistoryView, ContentGenerateAsyncView
 
 urlpatterns = [
-    path('generate/', ContentGenerateView.as_view(), name='content_generate'),
+    path('generate/', (ContentGenerateAsyncView if settings.ASYNC_VIEWS else ContentGenerateView).as_view(), name='content_generate'),
     path('history/', ContentHistoryView.as_view(), name='content_history'),
 ]
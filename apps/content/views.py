@@ -1,10 +1,11 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from adrf.views import APIView as AsyncAPIView
 from .models import AIContent
 from .serializers import AIContentSerializer, ContentGenerateSerializer
 from .services import content_service
-from core.exceptions import AIServiceUnavailable, InsightStreamException
+from core.exceptions import AIServiceUnavailable, DeadlineExceeded, InsightStreamException
 
 class ContentGenerateView(generics.CreateAPIView):
     """
@@ -34,6 +35,72 @@ class ContentGenerateView(generics.CreateAPIView):
             )
             return Response(result, status=status.HTTP_201_CREATED)
             
+        except DeadlineExceeded as e:
+            return Response({
+                'error': {
+                    'code': e.code,
+                    'message': e.message,
+                    'details': {}
+                }
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT)
+            
+        except AIServiceUnavailable as e:
+            return Response({
+                'error': {
+                    'code': 'AI_SERVICE_UNAVAILABLE',
+                    'message': str(e.message),
+                    'details': {}
+                }
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            
+        except InsightStreamException as e:
+            return Response({
+                'error': {
+                    'code': e.code,
+                    'message': e.message,
+                    'details': {}
+                }
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+        except Exception as e:
+            return Response({
+                'error': {
+                    'code': 'INTERNAL_ERROR',
+                    'message': 'Failed to generate content',
+                    'details': {'error': str(e)}
+                }
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ContentGenerateAsyncView(AsyncAPIView):
+    """
+    ContentGenerateView on the async Gemini client and async ORM (served when
+    ASYNC_VIEWS is on).
+    
+    POST /api/content/generate/
+    Body: {"topic": "your topic"}
+    """
+    permission_classes = [IsAuthenticated]
+    
+    async def post(self, request):
+        serializer = ContentGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            result = await content_service.agenerate_content(
+                topic=serializer.validated_data['topic'],
+                user=request.user
+            )
+            return Response(result, status=status.HTTP_201_CREATED)
+            
+        except DeadlineExceeded as e:
+            return Response({
+                'error': {
+                    'code': e.code,
+                    'message': e.message,
+                    'details': {}
+                }
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT)
+            
         except AIServiceUnavailable as e:
             return Response({
                 'error': {
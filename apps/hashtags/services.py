@@ -1,9 +1,11 @@
 import re
 import logging
 from collections import Counter
-from core.clients.youtube import youtube_client
-from core.clients.gemini import gemini_client
+from django.conf import settings
+from core.clients.youtube import youtube_client, async_youtube_client
+from core.clients.gemini import gemini_client, async_gemini_client
 from core.exceptions import YouTubeAPIError, AIServiceUnavailable
+from core.utils.concurrency import fan_out, afan_out
 
 logger = logging.getLogger(__name__)
 
@@ -14,21 +16,29 @@ class HashtagService:
     
     def generate_hashtags(self, topic: str) -> dict:
         """Generate hashtags combining real YouTube data and AI suggestions."""
-        real_hashtags = []
-        ai_hashtags = []
-        
-        try:
-            # Extract real hashtags from trending videos
-            real_hashtags = self._extract_from_trending(topic)
-        except Exception as e:
-            logger.warning(f'Failed to extract real hashtags: {str(e)}')
-        
-        try:
-            # Generate AI hashtags
-            ai_hashtags = self._generate_ai_hashtags(topic)
-        except Exception as e:
-            logger.warning(f'Failed to generate AI hashtags: {str(e)}')
-        
+        # Trending extraction and AI generation are independent: run both at once
+        results = fan_out('hashtags', {
+            'trending': lambda: self._extract_from_trending(topic),
+            'ai': lambda: self._generate_ai_hashtags(topic),
+        }, timeouts={'trending': settings.HASHTAGS_TRENDING_TIMEOUT})
+        return self._from_branches(topic, results)
+    
+    async def agenerate_hashtags(self, topic: str) -> dict:
+        """generate_hashtags() on the async clients, for async views."""
+        results = await afan_out('hashtags', {
+            'trending': lambda: self._aextract_from_trending(topic),
+            'ai': lambda: self._agenerate_ai_hashtags(topic),
+        }, timeouts={'trending': settings.HASHTAGS_TRENDING_TIMEOUT})
+        return self._from_branches(topic, results)
+    
+    def _from_branches(self, topic: str, results) -> dict:
+        if not results.ok('trending'):
+            logger.warning(f'Failed to extract real hashtags: {str(results.errors["trending"])}')
+        if not results.ok('ai'):
+            logger.warning(f'Failed to generate AI hashtags: {str(results.errors["ai"])}')
+        return self._assemble(topic, results.get('trending', []), results.get('ai', []))
+    
+    def _assemble(self, topic: str, real_hashtags: list, ai_hashtags: list) -> dict:
         # If both failed, use fallback
         if not real_hashtags and not ai_hashtags:
             logger.error(f'Hashtag generation error: All methods failed')
@@ -52,60 +62,79 @@ class HashtagService:
         try:
             # Get trending videos
             videos = youtube_client.get_trending_videos(max_results=20)
-            
-            # Extract hashtags from descriptions
-            all_hashtags = []
-            for video in videos:
-                description = video.get('description', '')
-                hashtags = self.extract_hashtags(description)
-                all_hashtags.extend(hashtags)
-            
-            # Count occurrences
-            hashtag_counts = Counter(all_hashtags)
-            
-            # Format with engagement metrics
-            result = []
-            for hashtag, count in hashtag_counts.most_common(15):
-                engagement = 'high' if count >= 5 else 'medium' if count >= 3 else 'low'
-                result.append({
-                    'hashtag': hashtag,
-                    'usage_count': count,
-                    'engagement': engagement
-                })
-            
-            return result
+            return self._rank_trending_hashtags(videos)
+        except YouTubeAPIError as e:
+            logger.warning(f'YouTube API error in hashtag extraction: {str(e)}')
+            return []
+    
+    async def _aextract_from_trending(self, topic: str) -> list:
+        try:
+            videos = await async_youtube_client.get_trending_videos(max_results=20)
+            return self._rank_trending_hashtags(videos)
         except YouTubeAPIError as e:
             logger.warning(f'YouTube API error in hashtag extraction: {str(e)}')
             return []
     
+    def _rank_trending_hashtags(self, videos: list) -> list:
+        """Most used hashtags in the videos' descriptions, with engagement levels."""
+        # Extract hashtags from descriptions
+        all_hashtags = []
+        for video in videos:
+            description = video.get('description', '')
+            hashtags = self.extract_hashtags(description)
+            all_hashtags.extend(hashtags)
+        
+        # Count occurrences
+        hashtag_counts = Counter(all_hashtags)
+        
+        # Format with engagement metrics
+        result = []
+        for hashtag, count in hashtag_counts.most_common(15):
+            engagement = 'high' if count >= 5 else 'medium' if count >= 3 else 'low'
+            result.append({
+                'hashtag': hashtag,
+                'usage_count': count,
+                'engagement': engagement
+            })
+        
+        return result
+    
     def _generate_ai_hashtags(self, topic: str) -> list:
         """Generate hashtags using Gemini AI."""
         try:
-            hashtags = gemini_client.generate_hashtags(topic)
-            
-            # Format with estimated metrics
-            result = []
-            for i, hashtag in enumerate(hashtags[:10]):
-                # Ensure hashtag starts with #
-                if not hashtag.startswith('#'):
-                    hashtag = f'#{hashtag}'
-                
-                # Estimate usage based on position
-                usage = 1000 - (i * 100)
-                engagement = 'high' if i < 3 else 'medium' if i < 7 else 'low'
-                
-                result.append({
-                    'hashtag': hashtag,
-                    'usage_count': usage,
-                    'engagement': engagement
-                })
-            
-            return result
+            return self._format_ai_hashtags(gemini_client.generate_hashtags(topic))
         except Exception as e:
             logger.warning(f'AI service error in hashtag generation: {str(e)}')
             # Return basic AI hashtags as fallback
             return self._get_basic_ai_hashtags(topic)
     
+    async def _agenerate_ai_hashtags(self, topic: str) -> list:
+        try:
+            return self._format_ai_hashtags(await async_gemini_client.generate_hashtags(topic))
+        except Exception as e:
+            logger.warning(f'AI service error in hashtag generation: {str(e)}')
+            return self._get_basic_ai_hashtags(topic)
+    
+    def _format_ai_hashtags(self, hashtags: list) -> list:
+        """Attach estimated metrics to AI hashtags, by rank."""
+        result = []
+        for i, hashtag in enumerate(hashtags[:10]):
+            # Ensure hashtag starts with #
+            if not hashtag.startswith('#'):
+                hashtag = f'#{hashtag}'
+            
+            # Estimate usage based on position
+            usage = 1000 - (i * 100)
+            engagement = 'high' if i < 3 else 'medium' if i < 7 else 'low'
+            
+            result.append({
+                'hashtag': hashtag,
+                'usage_count': usage,
+                'engagement': engagement
+            })
+        
+        return result
+    
     def _combine_hashtags(self, real: list, ai: list) -> list:
         """Combine real and AI hashtags, removing duplicates."""
         seen = set()
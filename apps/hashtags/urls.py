@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path
-from .views import HashtagGenerateView
+from .views import HashtagGenerateView, HashtagGenerateAsyncView
 
 urlpatterns = [
-    path('generate/', HashtagGenerateView.as_view(), name='hashtag_generate'),
+    path('generate/', (HashtagGenerateAsyncView if settings.ASYNC_VIEWS else HashtagGenerateView).as_view(), name='hashtag_generate'),
 ]
@@ -3,8 +3,10 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from adrf.views import APIView as AsyncAPIView
 from .serializers import HashtagGenerateSerializer
 from .services import HashtagService
+from core.exceptions import DeadlineExceeded
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,38 @@ class HashtagGenerateView(APIView):
             result = service.generate_hashtags(topic=serializer.validated_data['topic'])
             
             return Response(result, status=status.HTTP_200_OK)
+        except DeadlineExceeded as e:
+            logger.warning(f'Hashtag generation deadline exceeded: {e.message}')
+            return Response(
+                {'error': {'code': e.code, 'message': e.message}},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f'Hashtag generation error: {str(e)}')
+            return Response(
+                {'error': {'code': 'HASHTAG_GENERATION_ERROR', 'message': str(e)}},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class HashtagGenerateAsyncView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    
+    async def post(self, request):
+        try:
+            serializer = HashtagGenerateSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            
+            service = HashtagService()
+            result = await service.agenerate_hashtags(topic=serializer.validated_data['topic'])
+            
+            return Response(result, status=status.HTTP_200_OK)
+        except DeadlineExceeded as e:
+            logger.warning(f'Hashtag generation deadline exceeded: {e.message}')
+            return Response(
+                {'error': {'code': e.code, 'message': e.message}},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
         except Exception as e:
             logger.error(f'Hashtag generation error: {str(e)}')
             return Response(
@@ -1,7 +1,9 @@
 import logging
-from core.clients.gemini import gemini_client
-from core.clients.youtube import youtube_client
+from django.conf import settings
+from core.clients.gemini import gemini_client, async_gemini_client
+from core.clients.youtube import youtube_client, async_youtube_client
 from core.exceptions import AIServiceUnavailable, YouTubeAPIError
+from core.utils.concurrency import fan_out, afan_out
 
 logger = logging.getLogger(__name__)
 
@@ -32,25 +34,34 @@ class KeywordService:
         try:
             logger.info(f"Researching keywords for topic: {topic}")
             
-            # Get AI-generated keywords from Gemini
-            ai_keywords = gemini_client.generate_keywords(topic)
+            # Gemini keywords and YouTube trending data are independent: fetch both at once
+            results = fan_out('keywords', {
+                'ai': lambda: gemini_client.generate_keywords(topic),
+                'trending': lambda: youtube_client.get_trending_videos(max_results=10),
+            }, timeouts={'trending': settings.KEYWORDS_TRENDING_TIMEOUT})
             
-            # Enhance with real YouTube trending data
-            try:
-                trending_videos = youtube_client.get_trending_videos(max_results=10)
-                youtube_keywords = self._extract_keywords_from_videos(trending_videos, topic)
-                
-                # Merge AI keywords with YouTube data
-                result = self._merge_keyword_data(ai_keywords, youtube_keywords, topic)
-            except (YouTubeAPIError, Exception) as e:
-                logger.warning(f"YouTube API unavailable: {str(e)}, using AI-only keywords")
-                result = ai_keywords
+            result = self._combine(topic, results)
+            logger.info(f"Successfully researched keywords for: {topic}")
+            return result
+            
+        except AIServiceUnavailable as e:
+            logger.error(f"AI service unavailable: {str(e)}, using fallback")
+            return self._get_fallback_keywords(topic)
+        except Exception as e:
+            logger.error(f"Unexpected error during keyword research: {str(e)}, using fallback")
+            return self._get_fallback_keywords(topic)
+    
+    async def aresearch_keywords(self, topic: str) -> dict:
+        """research_keywords() on the async clients, for async views."""
+        try:
+            logger.info(f"Researching keywords for topic: {topic}")
             
-            # Validate structure
-            if not self._validate_keyword_structure(result):
-                logger.warning("Invalid keyword structure, using fallback")
-                result = self._get_fallback_keywords(topic)
+            results = await afan_out('keywords', {
+                'ai': lambda: async_gemini_client.generate_keywords(topic),
+                'trending': lambda: async_youtube_client.get_trending_videos(max_results=10),
+            }, timeouts={'trending': settings.KEYWORDS_TRENDING_TIMEOUT})
             
+            result = self._combine(topic, results)
             logger.info(f"Successfully researched keywords for: {topic}")
             return result
             
@@ -61,6 +72,28 @@ class KeywordService:
             logger.error(f"Unexpected error during keyword research: {str(e)}, using fallback")
             return self._get_fallback_keywords(topic)
     
+    def _combine(self, topic: str, results) -> dict:
+        """AI keywords enhanced with the trending data, if that branch answered."""
+        # Get AI-generated keywords from Gemini (re-raises its failure)
+        ai_keywords = results['ai']
+        
+        # Enhance with real YouTube trending data
+        try:
+            youtube_keywords = self._extract_keywords_from_videos(results['trending'], topic)
+            
+            # Merge AI keywords with YouTube data
+            result = self._merge_keyword_data(ai_keywords, youtube_keywords, topic)
+        except (YouTubeAPIError, Exception) as e:
+            logger.warning(f"YouTube API unavailable: {str(e)}, using AI-only keywords")
+            result = ai_keywords
+        
+        # Validate structure
+        if not self._validate_keyword_structure(result):
+            logger.warning("Invalid keyword structure, using fallback")
+            result = self._get_fallback_keywords(topic)
+        
+        return result
+    
     def _extract_keywords_from_videos(self, videos: list, topic: str) -> dict:
         """Extract keywords from YouTube video titles and descriptions"""
         keywords = set()
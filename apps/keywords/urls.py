@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path
-from .views import KeywordResearchView
+from .views import KeywordResearchView, KeywordResearchAsyncView
 
 urlpatterns = [
-    path('research/', KeywordResearchView.as_view(), name='keyword_research'),
+    path('research/', (KeywordResearchAsyncView if settings.ASYNC_VIEWS else KeywordResearchView).as_view(), name='keyword_research'),
 ]
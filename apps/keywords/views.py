@@ -2,9 +2,10 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from adrf.views import APIView as AsyncAPIView
 from .serializers import KeywordResearchSerializer
 from .services import keyword_service
-from core.exceptions import AIServiceUnavailable, YouTubeAPIError, InsightStreamException
+from core.exceptions import AIServiceUnavailable, DeadlineExceeded, YouTubeAPIError, InsightStreamException
 
 class KeywordResearchView(APIView):
     """
@@ -32,6 +33,80 @@ class KeywordResearchView(APIView):
             )
             return Response(result, status=status.HTTP_200_OK)
             
+        except DeadlineExceeded as e:
+            return Response({
+                'error': {
+                    'code': e.code,
+                    'message': e.message,
+                    'details': {}
+                }
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT)
+            
+        except AIServiceUnavailable as e:
+            return Response({
+                'error': {
+                    'code': 'AI_SERVICE_UNAVAILABLE',
+                    'message': str(e.message),
+                    'details': {}
+                }
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            
+        except YouTubeAPIError as e:
+            return Response({
+                'error': {
+                    'code': 'YOUTUBE_API_ERROR',
+                    'message': str(e.message),
+                    'details': {}
+                }
+            }, status=status.HTTP_502_BAD_GATEWAY)
+            
+        except InsightStreamException as e:
+            return Response({
+                'error': {
+                    'code': e.code,
+                    'message': e.message,
+                    'details': {}
+                }
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+        except Exception as e:
+            return Response({
+                'error': {
+                    'code': 'INTERNAL_ERROR',
+                    'message': 'Failed to research keywords',
+                    'details': {'error': str(e)}
+                }
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class KeywordResearchAsyncView(AsyncAPIView):
+    """
+    KeywordResearchView on the async clients (served when ASYNC_VIEWS is on).
+    
+    POST /api/keywords/research/
+    Body: {"topic": "your topic"}
+    """
+    permission_classes = [IsAuthenticated]
+    
+    async def post(self, request):
+        serializer = KeywordResearchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            result = await keyword_service.aresearch_keywords(
+                topic=serializer.validated_data['topic']
+            )
+            return Response(result, status=status.HTTP_200_OK)
+            
+        except DeadlineExceeded as e:
+            return Response({
+                'error': {
+                    'code': e.code,
+                    'message': e.message,
+                    'details': {}
+                }
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT)
+            
         except AIServiceUnavailable as e:
             return Response({
                 'error': {
@@ -1,93 +1,223 @@
 import logging
+import uuid
+from contextlib import nullcontext
 from datetime import datetime
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
 from .models import Thumbnail
-from core.clients.replicate import replicate_client
-from core.clients.pollinations import pollinations_client
-from core.clients.imagekit_client import imagekit_client
-from core.exceptions import AIServiceUnavailable, InsightStreamException
+import core.clients  # noqa: F401  registers the image providers
+from core.clients.image_provider import image_providers
+from core.clients.imagekit_client import imagekit_client, async_imagekit_client
+from core.utils import deadline
+from core.utils.concurrency import race, arace
+from core.utils.cache_keys import make_key
+from core.exceptions import AIServiceUnavailable, InsightStreamException, DeadlineExceeded, RateLimitExceeded
 
 logger = logging.getLogger(__name__)
 
 class ThumbnailService:
     """
     Service for generating AI thumbnails with fallback support.
-    Primary: Replicate FLUX
-    Fallback: Pollinations AI
+    Providers: Replicate FLUX and Pollinations AI, tried in the order
+    image_providers.route() picks for each request
     CDN: ImageKit
+    
+    Every provider but the last only gets the request deadline minus
+    THUMBNAIL_FALLBACK_RESERVE, so a slow or failing one still leaves time
+    for the next; the CDN upload is skipped when less than
+    THUMBNAIL_UPLOAD_MIN_BUDGET remains. Images a provider already
+    downloaded are uploaded from those bytes, so each image crosses the
+    network once.
+    
+    With THUMBNAIL_PROVIDER_STRATEGY 'race' or 'hedge' the providers run
+    concurrently (all at once, or each THUMBNAIL_HEDGE_DELAY after the
+    previous) and the first image wins; win rates and latencies are in race_stats.
+    
+    agenerate_thumbnail() is the same flow for async views, on the
+    providers' async clients, the async ImageKit client and the async ORM.
     """
+    RACE_STRATEGIES = ('race', 'hedge')
+    
+    def _primary_budget(self):
+        left = deadline.remaining()
+        if left is None:
+            return nullcontext()
+        return deadline.deadline(max(0.0, left - settings.THUMBNAIL_FALLBACK_RESERVE))
+    
+    def _generate_image(self, prompt: str) -> tuple:
+        """(image, provider name) from the routed providers, per THUMBNAIL_PROVIDER_STRATEGY."""
+        providers = image_providers.route()
+        if not providers:
+            raise AIServiceUnavailable('No image provider available')
+        if len(providers) > 1 and settings.THUMBNAIL_PROVIDER_STRATEGY in self.RACE_STRATEGIES:
+            return self._race_providers(prompt, providers)
+        return self._fall_back(prompt, providers)
+    
+    def _fall_back(self, prompt: str, providers: list) -> tuple:
+        for index, provider in enumerate(providers):
+            last = index == len(providers) - 1
+            try:
+                logger.info(f"[ThumbnailService] Attempting {provider.name}...")
+                with nullcontext() if last else self._primary_budget():
+                    image = image_providers.generate(provider, prompt)
+            except (AIServiceUnavailable, RateLimitExceeded, DeadlineExceeded) as e:
+                if last:
+                    raise
+                logger.warning(f"[ThumbnailService] ✗ {provider.name} FAILED: {str(e)}")
+                logger.info(f"[ThumbnailService] Falling back to {providers[index + 1].name}...")
+                continue
+            logger.info(f"[ThumbnailService] ✓ {provider.name} SUCCESS: {image.url[:100]}...")
+            return image, provider.name
+    
+    def _race_providers(self, prompt: str, providers: list) -> tuple:
+        """(image, provider name) from whichever provider answers first."""
+        step = settings.THUMBNAIL_HEDGE_DELAY if settings.THUMBNAIL_PROVIDER_STRATEGY == 'hedge' else 0
+        logger.info(f"[ThumbnailService] Racing {', '.join(p.name for p in providers)} ({step:.1f}s apart)...")
+        name, image = race('thumbnails', {
+            provider.name: (lambda provider=provider: image_providers.generate(provider, prompt))
+            for provider in providers
+        }, delays={provider.name: index * step for index, provider in enumerate(providers)})
+        logger.info(f"[ThumbnailService] ✓ {name} won the race: {image.url[:100]}...")
+        return image, name
+    
+    async def _agenerate_image(self, prompt: str) -> tuple:
+        """_generate_image() on the providers' async clients."""
+        providers = await image_providers.aroute()
+        if not providers:
+            raise AIServiceUnavailable('No image provider available')
+        if len(providers) > 1 and settings.THUMBNAIL_PROVIDER_STRATEGY in self.RACE_STRATEGIES:
+            return await self._arace_providers(prompt, providers)
+        return await self._afall_back(prompt, providers)
     
-    def generate_thumbnail(self, prompt: str, user, ref_image: str = None) -> dict:
+    async def _afall_back(self, prompt: str, providers: list) -> tuple:
+        for index, provider in enumerate(providers):
+            last = index == len(providers) - 1
+            try:
+                logger.info(f"[ThumbnailService] Attempting {provider.name}...")
+                with nullcontext() if last else self._primary_budget():
+                    image = await image_providers.agenerate(provider, prompt)
+            except (AIServiceUnavailable, RateLimitExceeded, DeadlineExceeded) as e:
+                if last:
+                    raise
+                logger.warning(f"[ThumbnailService] ✗ {provider.name} FAILED: {str(e)}")
+                logger.info(f"[ThumbnailService] Falling back to {providers[index + 1].name}...")
+                continue
+            logger.info(f"[ThumbnailService] ✓ {provider.name} SUCCESS: {image.url[:100]}...")
+            return image, provider.name
+    
+    async def _arace_providers(self, prompt: str, providers: list) -> tuple:
+        step = settings.THUMBNAIL_HEDGE_DELAY if settings.THUMBNAIL_PROVIDER_STRATEGY == 'hedge' else 0
+        logger.info(f"[ThumbnailService] Racing {', '.join(p.name for p in providers)} ({step:.1f}s apart)...")
+        name, image = await arace('thumbnails', {
+            provider.name: (lambda provider=provider: image_providers.agenerate(provider, prompt))
+            for provider in providers
+        }, delays={provider.name: index * step for index, provider in enumerate(providers)})
+        logger.info(f"[ThumbnailService] ✓ {name} won the race: {image.url[:100]}...")
+        return image, name
+    
+    def _file_name(self, user) -> str:
+        return f"thumbnail_{user.id}_{int(datetime.now().timestamp())}"
+    
+    def _upload_to_cdn(self, image, user) -> str:
+        """The ImageKit URL for the image, or its provider URL when the upload is skipped or fails."""
+        if not deadline.can_afford(settings.THUMBNAIL_UPLOAD_MIN_BUDGET):
+            logger.warning(f"[ThumbnailService] Deadline too close for CDN upload, using direct URL")
+            return image.url
+        if not imagekit_client.is_available():
+            logger.info(f"[ThumbnailService] ImageKit not configured, using direct URL")
+            return image.url
+        try:
+            logger.info(f"[ThumbnailService] ImageKit available, starting upload...")
+            if image.content is not None:
+                # The provider already downloaded the image: upload those bytes
+                cdn_url = imagekit_client.upload_from_bytes(
+                    image.content, file_name=self._file_name(user), content_type=image.content_type
+                )
+            else:
+                logger.info(f"[ThumbnailService] Source URL: {image.url[:100]}...")
+                cdn_url = imagekit_client.upload_from_url(image.url, file_name=self._file_name(user))
+            logger.info(f"[ThumbnailService] ✓ ImageKit SUCCESS: {cdn_url}")
+            return cdn_url
+        except InsightStreamException as e:
+            logger.error(f"[ThumbnailService] ✗ ImageKit FAILED: {str(e)}")
+        except Exception as e:
+            logger.error(f"[ThumbnailService] ✗ ImageKit UNEXPECTED ERROR: {str(e)}", exc_info=True)
+        logger.info(f"[ThumbnailService] Using direct URL as fallback")
+        return image.url
+    
+    async def _aupload_to_cdn(self, image, user) -> str:
+        """_upload_to_cdn() on the async ImageKit client."""
+        if not deadline.can_afford(settings.THUMBNAIL_UPLOAD_MIN_BUDGET):
+            logger.warning(f"[ThumbnailService] Deadline too close for CDN upload, using direct URL")
+            return image.url
+        if not await async_imagekit_client.is_available():
+            logger.info(f"[ThumbnailService] ImageKit not configured, using direct URL")
+            return image.url
+        try:
+            if image.content is not None:
+                cdn_url = await async_imagekit_client.upload_from_bytes(
+                    image.content, file_name=self._file_name(user), content_type=image.content_type
+                )
+            else:
+                cdn_url = await async_imagekit_client.upload_from_url(image.url, file_name=self._file_name(user))
+            logger.info(f"[ThumbnailService] ✓ ImageKit SUCCESS: {cdn_url}")
+            return cdn_url
+        except InsightStreamException as e:
+            logger.error(f"[ThumbnailService] ✗ ImageKit FAILED: {str(e)}")
+        except Exception as e:
+            logger.error(f"[ThumbnailService] ✗ ImageKit UNEXPECTED ERROR: {str(e)}", exc_info=True)
+        logger.info(f"[ThumbnailService] Using direct URL as fallback")
+        return image.url
+    
+    def _check_url(self, cdn_url: str) -> None:
+        logger.info(f"[ThumbnailService] Final URL: {cdn_url}")
+        if not cdn_url or not cdn_url.startswith('http'):
+            logger.error(f"[ThumbnailService] ✗ INVALID URL: {cdn_url}")
+            raise AIServiceUnavailable('Failed to generate valid thumbnail URL')
+    
+    def _as_result(self, thumbnail, provider_used: str) -> dict:
+        result = {
+            'id': thumbnail.id,
+            'thumbnail_url': thumbnail.thumbnail_url,
+            'prompt': thumbnail.user_input,
+            'ref_image': thumbnail.ref_image,
+            'provider': provider_used,
+            'created_at': thumbnail.created_at.isoformat()
+        }
+        logger.info(f"[ThumbnailService] ===== GENERATION COMPLETE =====")
+        logger.info(f"[ThumbnailService] Result: ID={result['id']}, Provider={provider_used}")
+        return result
+    
+    def generate_thumbnail(self, prompt: str, user, ref_image: str = None, on_status=None) -> dict:
         """
         Generate thumbnail using AI with automatic fallback.
         
+        on_status, if given, is called with 'uploading' when the CDN phase starts.
+        
         Requirements:
         - 2.1: Use FLUX AI model via Replicate
         - 2.2: Fallback to Pollinations if Replicate fails
         - 2.3: Upload to ImageKit CDN and store in database
         - 2.6: 16:9 aspect ratio, PNG format
         """
-        generated_url = None
-        cdn_url = None
-        provider_used = None
-        
         try:
             logger.info(f"[ThumbnailService] ===== STARTING GENERATION =====")
             logger.info(f"[ThumbnailService] User: {user.email}, Prompt: {prompt[:100]}...")
             
-            # Try primary provider (Replicate FLUX)
-            if replicate_client.is_available():
-                try:
-                    logger.info(f"[ThumbnailService] Attempting Replicate FLUX...")
-                    generated_url = replicate_client.generate_thumbnail(prompt, aspect_ratio="16:9")
-                    provider_used = 'replicate'
-                    logger.info(f"[ThumbnailService] ✓ Replicate SUCCESS: {generated_url}")
-                except AIServiceUnavailable as e:
-                    logger.warning(f"[ThumbnailService] ✗ Replicate FAILED: {str(e)}")
-                    logger.info(f"[ThumbnailService] Falling back to Pollinations...")
-                    generated_url = None
-            else:
-                logger.info(f"[ThumbnailService] Replicate not available, using Pollinations")
-            
-            # Fallback to Pollinations if Replicate failed or unavailable
-            if not generated_url:
-                logger.info(f"[ThumbnailService] Attempting Pollinations...")
-                generated_url = pollinations_client.generate_thumbnail(prompt, width=1280, height=720)
-                provider_used = 'pollinations'
-                logger.info(f"[ThumbnailService] ✓ Pollinations SUCCESS: {generated_url[:100]}...")
+            image, provider_used = self._generate_image(prompt)
             
             # Upload to ImageKit CDN if configured
             logger.info(f"[ThumbnailService] ----- CDN UPLOAD PHASE -----")
-            if imagekit_client.is_available():
-                try:
-                    logger.info(f"[ThumbnailService] ImageKit available, starting upload...")
-                    logger.info(f"[ThumbnailService] Source URL: {generated_url[:100]}...")
-                    cdn_url = imagekit_client.upload_from_url(
-                        generated_url, 
-                        file_name=f"thumbnail_{user.id}_{int(datetime.now().timestamp())}"
-                    )
-                    logger.info(f"[ThumbnailService] ✓ ImageKit SUCCESS: {cdn_url}")
-                except InsightStreamException as e:
-                    logger.error(f"[ThumbnailService] ✗ ImageKit FAILED: {str(e)}")
-                    logger.info(f"[ThumbnailService] Using direct URL as fallback")
-                    cdn_url = generated_url
-                except Exception as e:
-                    logger.error(f"[ThumbnailService] ✗ ImageKit UNEXPECTED ERROR: {str(e)}", exc_info=True)
-                    logger.info(f"[ThumbnailService] Using direct URL as fallback")
-                    cdn_url = generated_url
-            else:
-                logger.info(f"[ThumbnailService] ImageKit not configured, using direct URL")
-                cdn_url = generated_url
+            if on_status:
+                on_status('uploading')
+            cdn_url = self._upload_to_cdn(image, user)
             
             # Validate URL before saving
             logger.info(f"[ThumbnailService] ----- VALIDATION & SAVE PHASE -----")
-            logger.info(f"[ThumbnailService] Final URL: {cdn_url}")
-            if not cdn_url or not cdn_url.startswith('http'):
-                logger.error(f"[ThumbnailService] ✗ INVALID URL: {cdn_url}")
-                raise AIServiceUnavailable('Failed to generate valid thumbnail URL')
-            logger.info(f"[ThumbnailService] ✓ URL validation passed")
-            
-            # Save to database
-            logger.info(f"[ThumbnailService] Saving to database...")
+            self._check_url(cdn_url)
             thumbnail = Thumbnail.objects.create(
                 user=user,
                 user_input=prompt,
@@ -95,19 +225,37 @@ class ThumbnailService:
                 ref_image=ref_image
             )
             logger.info(f"[ThumbnailService] ✓ Saved to DB with ID: {thumbnail.id}")
+            return self._as_result(thumbnail, provider_used)
             
-            result = {
-                'id': thumbnail.id,
-                'thumbnail_url': thumbnail.thumbnail_url,
-                'prompt': thumbnail.user_input,
-                'ref_image': thumbnail.ref_image,
-                'provider': provider_used,
-                'created_at': thumbnail.created_at.isoformat()
-            }
-            logger.info(f"[ThumbnailService] ===== GENERATION COMPLETE =====")
-            logger.info(f"[ThumbnailService] Result: ID={result['id']}, Provider={provider_used}")
-            return result
+        except DeadlineExceeded:
+            logger.error(f"[ThumbnailService] ===== DEADLINE EXCEEDED =====")
+            raise
+        except Exception as e:
+            logger.error(f"[ThumbnailService] ===== GENERATION FAILED =====")
+            logger.error(f"[ThumbnailService] Error: {str(e)}", exc_info=True)
+            raise AIServiceUnavailable(f'Failed to generate thumbnail: {str(e)}')
+    
+    async def agenerate_thumbnail(self, prompt: str, user, ref_image: str = None) -> dict:
+        """generate_thumbnail() on the async provider and ImageKit clients and async ORM, for async views."""
+        try:
+            logger.info(f"[ThumbnailService] ===== STARTING ASYNC GENERATION =====")
+            logger.info(f"[ThumbnailService] User: {user.email}, Prompt: {prompt[:100]}...")
             
+            image, provider_used = await self._agenerate_image(prompt)
+            cdn_url = await self._aupload_to_cdn(image, user)
+            self._check_url(cdn_url)
+            thumbnail = await Thumbnail.objects.acreate(
+                user=user,
+                user_input=prompt,
+                thumbnail_url=cdn_url,
+                ref_image=ref_image
+            )
+            logger.info(f"[ThumbnailService] ✓ Saved to DB with ID: {thumbnail.id}")
+            return self._as_result(thumbnail, provider_used)
+            
+        except DeadlineExceeded:
+            logger.error(f"[ThumbnailService] ===== DEADLINE EXCEEDED =====")
+            raise
         except Exception as e:
             logger.error(f"[ThumbnailService] ===== GENERATION FAILED =====")
             logger.error(f"[ThumbnailService] Error: {str(e)}", exc_info=True)
@@ -130,3 +278,90 @@ class ThumbnailService:
         ]
 
 thumbnail_service = ThumbnailService()
+
+class ThumbnailJobService:
+    """
+    Thumbnail generation as a Celery job the client polls.
+    
+    Job state lives in the shared cache under the job ID and moves through
+    queued -> generating -> uploading -> done (or failed); the status
+    endpoint is a single cache read. Entries expire after THUMBNAIL_JOB_TTL.
+    """
+    CACHE_NAMESPACE = 'thumbnail_job'
+    
+    def _cache_key(self, job_id: str) -> str:
+        return make_key(self.CACHE_NAMESPACE, job_id, fold_case=False)
+    
+    def _save(self, job: dict) -> None:
+        cache.set(self._cache_key(job['job_id']), job, settings.THUMBNAIL_JOB_TTL)
+    
+    def submit(self, prompt: str, user, ref_image: str = None):
+        """Enqueue a generation and return its job, or None if jobs are off or the broker is unreachable."""
+        if not settings.THUMBNAIL_JOBS_ENABLED:
+            return None
+        
+        now = timezone.now().isoformat()
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'user_id': user.id,
+            'status': 'queued',
+            'prompt': prompt,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self._save(job)
+        try:
+            from .tasks import generate_thumbnail_job
+            generate_thumbnail_job.apply_async(
+                args=(job['job_id'], user.id, prompt, ref_image), task_id=job['job_id']
+            )
+        except Exception as e:
+            logger.warning(f"[ThumbnailJob] Could not enqueue job, generating inline: {str(e)}")
+            cache.delete(self._cache_key(job['job_id']))
+            return None
+        
+        logger.info(f"[ThumbnailJob] Queued {job['job_id']} for user: {user.email}")
+        return self.as_response(job)
+    
+    def get(self, job_id: str, user):
+        """The job as the status endpoint returns it, or None if unknown, expired or not the user's."""
+        job = cache.get(self._cache_key(job_id))
+        if job is None or job['user_id'] != user.id:
+            return None
+        return self.as_response(job)
+    
+    def as_response(self, job: dict) -> dict:
+        response = {key: value for key, value in job.items() if key != 'user_id'}
+        response['status_url'] = reverse('thumbnail_job', args=[job['job_id']])
+        return response
+    
+    def _update(self, job_id: str, status: str, **fields) -> None:
+        job = cache.get(self._cache_key(job_id))
+        if job is None:
+            logger.warning(f"[ThumbnailJob] {job_id} expired before reaching '{status}'")
+            return
+        job.update(fields, status=status, updated_at=timezone.now().isoformat())
+        self._save(job)
+        logger.info(f"[ThumbnailJob] {job_id} -> {status}")
+    
+    def run(self, job_id: str, user_id: int, prompt: str, ref_image: str = None) -> None:
+        """Worker side: generate under THUMBNAIL_JOB_DEADLINE, recording each phase."""
+        self._update(job_id, 'generating')
+        try:
+            user = get_user_model().objects.get(id=user_id)
+            with deadline.deadline(settings.THUMBNAIL_JOB_DEADLINE):
+                result = thumbnail_service.generate_thumbnail(
+                    prompt, user, ref_image, on_status=lambda status: self._update(job_id, status)
+                )
+            self._update(job_id, 'done', result=result)
+        except InsightStreamException as e:
+            self._update(job_id, 'failed', error={'code': e.code, 'message': e.message, 'details': {}})
+        except Exception as e:
+            logger.error(f"[ThumbnailJob] {job_id} failed: {str(e)}", exc_info=True)
+            self._update(job_id, 'failed', error={
+                'code': 'INTERNAL_ERROR',
+                'message': 'Failed to generate thumbnail',
+                'details': {'error': str(e)}
+            })
+
+thumbnail_job_service = ThumbnailJobService()
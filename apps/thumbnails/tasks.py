@@ -0,0 +1,7 @@
+from celery import shared_task
+
+@shared_task(ignore_result=True)
+def generate_thumbnail_job(job_id: str, user_id: int, prompt: str, ref_image: str = None) -> None:
+    """Background thumbnail generation; progress and outcome are kept by ThumbnailJobService."""
+    from .services import thumbnail_job_service
+    thumbnail_job_service.run(job_id, user_id, prompt, ref_image)
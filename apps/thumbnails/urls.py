@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from .views import ThumbnailGenerateView, ThumbnailHistoryView
+from .views import ThumbnailGenerateView, ThumbnailHistoryView, ThumbnailJobView, ThumbnailGenerateAsyncView
 
 urlpatterns = [
-    path('generate/', ThumbnailGenerateView.as_view(), name='thumbnail_generate'),
+    path('generate/', (ThumbnailGenerateAsyncView if settings.ASYNC_VIEWS else ThumbnailGenerateView).as_view(), name='thumbnail_generate'),
+    path('jobs/<str:job_id>/', ThumbnailJobView.as_view(), name='thumbnail_job'),
     path('history/', ThumbnailHistoryView.as_view(), name='thumbnail_history'),
 ]
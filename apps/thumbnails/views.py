@@ -1,10 +1,21 @@
+import logging
+from asgiref.sync import sync_to_async
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from adrf.views import APIView as AsyncAPIView
 from .models import Thumbnail
 from .serializers import ThumbnailSerializer, ThumbnailGenerateSerializer
-from .services import thumbnail_service
-from core.exceptions import AIServiceUnavailable, InsightStreamException
+from .services import thumbnail_service, thumbnail_job_service
+from core.exceptions import AIServiceUnavailable, InsightStreamException, DeadlineExceeded
+
+def _prefers_job(request) -> bool:
+    """RFC 7240 "Prefer: respond-async": the client will poll a job rather than wait."""
+    return 'respond-async' in request.headers.get('Prefer', '').lower()
+
+def _job_accepted(job: dict) -> Response:
+    return Response(job, status=status.HTTP_202_ACCEPTED, headers={'Location': job['status_url']})
 
 class ThumbnailGenerateView(generics.CreateAPIView):
     """
@@ -13,6 +24,10 @@ class ThumbnailGenerateView(generics.CreateAPIView):
     POST /api/thumbnails/generate/
     Body: {"prompt": "your prompt", "ref_image": "optional_url"}
     
+    With "Prefer: respond-async" (and THUMBNAIL_JOBS_ENABLED) the generation
+    is queued instead: 202 with a job to poll at
+    GET /api/thumbnails/jobs/<job_id>/.
+    
     Requirements:
     - 2.1: Generate using FLUX AI model
     - 2.2: Fallback to Pollinations if FLUX fails
@@ -33,6 +48,15 @@ class ThumbnailGenerateView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         logger.info(f"[ThumbnailView] Validation passed. Prompt: {serializer.validated_data['prompt'][:50]}...")
         
+        if _prefers_job(request):
+            job = thumbnail_job_service.submit(
+                prompt=serializer.validated_data['prompt'],
+                ref_image=serializer.validated_data.get('ref_image'),
+                user=request.user
+            )
+            if job is not None:
+                return _job_accepted(job)
+        
         try:
             logger.info(f"[ThumbnailView] Calling thumbnail_service.generate_thumbnail...")
             result = thumbnail_service.generate_thumbnail(
@@ -43,6 +67,16 @@ class ThumbnailGenerateView(generics.CreateAPIView):
             logger.info(f"[ThumbnailView] Success! Thumbnail ID: {result.get('id')}, URL: {result.get('thumbnail_url')[:100]}...")
             return Response(result, status=status.HTTP_201_CREATED)
             
+        except DeadlineExceeded as e:
+            logger.error(f"[ThumbnailView] Deadline exceeded: {e.message}")
+            return Response({
+                'error': {
+                    'code': e.code,
+                    'message': e.message,
+                    'details': {}
+                }
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT)
+            
         except AIServiceUnavailable as e:
             logger.error(f"[ThumbnailView] AI Service Unavailable: {str(e.message)}")
             return Response({
@@ -73,6 +107,109 @@ class ThumbnailGenerateView(generics.CreateAPIView):
                 }
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class ThumbnailGenerateAsyncView(AsyncAPIView):
+    """
+    ThumbnailGenerateView for ASGI (served when ASYNC_VIEWS is on).
+    
+    POST /api/thumbnails/generate/
+    Body: {"prompt": "your prompt", "ref_image": "optional_url"}
+    
+    Generation, the CDN upload and the ORM write run on the event loop
+    (ThumbnailService.agenerate_thumbnail); only a queued job's submission
+    runs in a worker thread.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    async def post(self, request):
+        logger = logging.getLogger(__name__)
+        
+        logger.info(f"[ThumbnailView] Received request from user: {request.user.email}")
+        
+        serializer = ThumbnailGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        logger.info(f"[ThumbnailView] Validation passed. Prompt: {serializer.validated_data['prompt'][:50]}...")
+        
+        if _prefers_job(request):
+            job = await sync_to_async(thumbnail_job_service.submit)(
+                prompt=serializer.validated_data['prompt'],
+                ref_image=serializer.validated_data.get('ref_image'),
+                user=request.user
+            )
+            if job is not None:
+                return _job_accepted(job)
+        
+        try:
+            result = await thumbnail_service.agenerate_thumbnail(
+                prompt=serializer.validated_data['prompt'],
+                ref_image=serializer.validated_data.get('ref_image'),
+                user=request.user
+            )
+            logger.info(f"[ThumbnailView] Success! Thumbnail ID: {result.get('id')}, URL: {result.get('thumbnail_url')[:100]}...")
+            return Response(result, status=status.HTTP_201_CREATED)
+            
+        except DeadlineExceeded as e:
+            logger.error(f"[ThumbnailView] Deadline exceeded: {e.message}")
+            return Response({
+                'error': {
+                    'code': e.code,
+                    'message': e.message,
+                    'details': {}
+                }
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT)
+            
+        except AIServiceUnavailable as e:
+            logger.error(f"[ThumbnailView] AI Service Unavailable: {str(e.message)}")
+            return Response({
+                'error': {
+                    'code': 'AI_SERVICE_UNAVAILABLE',
+                    'message': str(e.message),
+                    'details': {}
+                }
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            
+        except InsightStreamException as e:
+            logger.error(f"[ThumbnailView] InsightStream Exception: {e.code} - {e.message}")
+            return Response({
+                'error': {
+                    'code': e.code,
+                    'message': e.message,
+                    'details': {}
+                }
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            
+        except Exception as e:
+            logger.error(f"[ThumbnailView] Unexpected error: {str(e)}", exc_info=True)
+            return Response({
+                'error': {
+                    'code': 'INTERNAL_ERROR',
+                    'message': 'Failed to generate thumbnail',
+                    'details': {'error': str(e)}
+                }
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ThumbnailJobView(APIView):
+    """
+    Status of a queued thumbnail generation.
+    
+    GET /api/thumbnails/jobs/<job_id>/
+    
+    status is queued, generating, uploading, done (with result) or failed
+    (with error). Jobs are only visible to the user who queued them.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        job = thumbnail_job_service.get(job_id, request.user)
+        if job is None:
+            return Response({
+                'error': {
+                    'code': 'JOB_NOT_FOUND',
+                    'message': 'Thumbnail job not found or expired',
+                    'details': {}
+                }
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response(job, status=status.HTTP_200_OK)
+
 class ThumbnailHistoryView(generics.ListAPIView):
     """
     Get user's thumbnail history.
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Measure how many concurrent requests a running server sustains.
+
+Start the server in one mode, run this against it, then repeat in the other:
+
+    gunicorn insightstream.wsgi:application -w 4                                  # WSGI
+    gunicorn insightstream.asgi:application -w 4 -k uvicorn.workers.UvicornWorker  # ASGI
+
+    python benchmark_concurrency.py                                  # 200 keyword requests, 100 at a time
+    python benchmark_concurrency.py --path /api/hashtags/generate/ -n 500 -c 250
+    python benchmark_concurrency.py --method GET --path "/api/analytics/outlier/?channel_id=@mkbhd"
+
+Requests are sent as the first user (or --email) with a freshly minted JWT;
+use the same settings and warm cache for both runs.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import django
+import httpx
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'insightstream.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import RefreshToken
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+parser.add_argument('--url', default='http://127.0.0.1:8000')
+parser.add_argument('--path', default='/api/keywords/research/')
+parser.add_argument('--method', default='POST')
+parser.add_argument('--body', default='{"topic": "home espresso"}')
+parser.add_argument('--email', help='user to authenticate as (default: first user)')
+parser.add_argument('-n', '--requests', type=int, default=200)
+parser.add_argument('-c', '--concurrency', type=int, default=100)
+parser.add_argument('--timeout', type=float, default=120)
+args = parser.parse_args()
+
+User = get_user_model()
+user = User.objects.get(email=args.email) if args.email else User.objects.order_by('id').first()
+if user is None:
+    raise SystemExit("No users; create one first (python manage.py createsuperuser).")
+token = str(RefreshToken.for_user(user).access_token)
+
+
+async def main():
+    latencies, statuses, errors = [], {}, {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(
+                        args.method, args.path,
+                        content=args.body if args.method != 'GET' else None,
+                        headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+                    )
+                except httpx.HTTPError as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    return
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.method} {args.url}{args.path}: {args.requests} requests, {args.concurrency} concurrent")
+    print(f"  wall time   {elapsed:.2f}s")
+    print(f"  throughput  {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        print(f"  latency     p50 {cuts[49] * 1000:.0f}ms  p95 {cuts[94] * 1000:.0f}ms  max {max(latencies) * 1000:.0f}ms")
+    print(f"  statuses    {dict(sorted(statuses.items()))}")
+    if errors:
+        print(f"  errors      {errors}")
+
+
+asyncio.run(main())
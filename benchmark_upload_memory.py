@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Measure peak Python memory per CDN upload, legacy data-URI upload vs streamed multipart.
+
+Runs against a local stand-in for the image host and the ImageKit upload API
+(no keys or network needed), with tracemalloc tracking every allocation:
+
+    python benchmark_upload_memory.py              # 1 MB, 4 MB and 16 MB images
+    python benchmark_upload_memory.py 2 24         # custom sizes in MB
+
+"legacy" reproduces the previous ImageKit SDK path: download into memory,
+base64-encode, build a data URI and assemble the multipart body before sending.
+"""
+import json
+import os
+import sys
+import threading
+import tracemalloc
+import base64
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'insightstream.settings')
+django.setup()
+
+from django.conf import settings
+from requests_toolbelt import MultipartEncoder
+from core.clients.imagekit_client import imagekit_client, ImageKitClient
+from core.utils.http import get_session
+
+MB = 1024 * 1024
+sizes = [float(arg) for arg in sys.argv[1:]] or [1, 4, 16]
+image = {'bytes': b''}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(image['bytes'])))
+        self.end_headers()
+        view = memoryview(image['bytes'])
+        for start in range(0, len(view), 64 * 1024):
+            self.wfile.write(view[start:start + 64 * 1024])
+
+    def do_POST(self):
+        left = int(self.headers['Content-Length'])
+        while left:
+            left -= len(self.rfile.read(min(left, 64 * 1024)))
+        body = json.dumps({'url': 'https://ik.imagekit.io/demo/thumbnails/benchmark.png'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base_url = f'http://127.0.0.1:{server.server_port}'
+ImageKitClient.UPLOAD_URL = f'{base_url}/upload'
+settings.IMAGEKIT_PUBLIC_KEY = settings.IMAGEKIT_PUBLIC_KEY or 'public_benchmark'
+settings.IMAGEKIT_PRIVATE_KEY = settings.IMAGEKIT_PRIVATE_KEY or 'private_benchmark'
+settings.IMAGEKIT_URL_ENDPOINT = settings.IMAGEKIT_URL_ENDPOINT or 'https://ik.imagekit.io/demo'
+
+
+def legacy_upload(content: bytes) -> None:
+    data_uri = f"data:image/png;base64,{base64.b64encode(content).decode('utf-8')}"
+    body = MultipartEncoder(fields={'file': (None, data_uri), 'fileName': 'benchmark.png'})
+    get_session('imagekit').post(ImageKitClient.UPLOAD_URL, data=body.read(), headers={'Content-Type': body.content_type})
+
+
+def legacy_from_url() -> None:
+    legacy_upload(get_session('imagekit').get(f'{base_url}/image').content)
+
+
+def peak(fn) -> float:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    fn()
+    result = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return result / MB
+
+
+print(f"IMAGEKIT_SPOOL_MAX_BYTES = {settings.IMAGEKIT_SPOOL_MAX_BYTES / MB:.1f} MB")
+print(f"{'image':>8}  {'path':<10} {'legacy':>9} {'streamed':>9}")
+for size in sizes:
+    image['bytes'] = os.urandom(int(size * MB))
+    # Warm the pooled sessions so connection setup is not measured
+    legacy_from_url()
+    imagekit_client.upload_from_url(f'{base_url}/image', file_name='benchmark')
+    rows = [
+        ('from URL', peak(legacy_from_url),
+         peak(lambda: imagekit_client.upload_from_url(f'{base_url}/image', file_name='benchmark'))),
+        ('from bytes', peak(lambda: legacy_upload(image['bytes'])),
+         peak(lambda: imagekit_client.upload_from_bytes(image['bytes'], file_name='benchmark'))),
+    ]
+    for path, legacy, streamed in rows:
+        print(f"{size:>6.1f}MB  {path:<10} {legacy:>7.2f}MB {streamed:>7.2f}MB")
+
+server.shutdown()
@@ -1,12 +1,24 @@
 #!/usr/bin/env python
+"""
+Reset API key rate limits, and optionally invalidate cache namespaces.
+
+    python clear_cache.py                          # reset rate-limited API keys
+    python clear_cache.py swr.yt_search etag.videos  # also orphan those namespaces
+"""
 import os
+import sys
 import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'insightstream.settings')
 django.setup()
 
-from django.core.cache import cache
+from core.utils.api_key_manager import api_key_manager
+from core.utils.cache_keys import invalidate_namespace
+
+for service in api_key_manager.keys:
+    api_key_manager.reset_rate_limits(service)
+print("API keys reset.")
 
-# Clear all rate limit cache
-cache.clear()
-print("Cache cleared! API keys reset.")
+for namespace in sys.argv[1:]:
+    version = invalidate_namespace(namespace)
+    print(f"Invalidated {namespace} (now generation {version})")
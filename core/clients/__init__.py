@@ -4,6 +4,7 @@ from .replicate import replicate_client, ReplicateClient
 from .pollinations import pollinations_client, PollinationsClient
 from .youtube import youtube_client, YouTubeClient
 from .imagekit_client import imagekit_client, ImageKitClient
+from .image_provider import GeneratedImage, ImageProvider, image_providers
 
 __all__ = [
     'gemini_client', 'GeminiClient',
@@ -11,4 +12,5 @@ __all__ = [
     'pollinations_client', 'PollinationsClient',
     'youtube_client', 'YouTubeClient',
     'imagekit_client', 'ImageKitClient',
+    'GeneratedImage', 'ImageProvider', 'image_providers',
 ]
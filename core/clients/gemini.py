@@ -1,42 +1,111 @@
+import asyncio
 import json
+import time
+import httpx
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core import exceptions as google_exceptions
 from django.conf import settings
 from core.utils.api_key_manager import api_key_manager
+from core.utils.rate_limit import rate_limiter
 from core.utils.retry import retry_with_backoff
+from core.utils.singleflight import coalesce
+from core.utils.swr import stale_while_revalidate, swr_owner
+from core.utils.circuit_breaker import circuit_breaker, get_breaker
+from core.utils.client_pool import KeyedClientPool
+from core.utils.hedge import get_hedger
+from core.utils.async_http import async_http
+from core.utils import deadline
 from core.exceptions import AIServiceUnavailable, RateLimitExceeded
 
 class GeminiClient:
     def __init__(self):
         # Use stable model instead of experimental
         self.model_name = 'gemini-1.5-flash'
+        self.models = KeyedClientPool('gemini', self._build_model)
     
-    def _get_model(self):
-        api_key = api_key_manager.get_active_key('gemini')
+    def _estimate_tokens(self, prompt: str) -> int:
+        # Roughly 4 characters per token, plus the expected response
+        return len(prompt) // 4 + settings.GEMINI_OUTPUT_TOKENS_ESTIMATE
+    
+    def _get_api_key(self, prompt: str) -> str:
+        api_key = rate_limiter.acquire_key('gemini', tokens=self._estimate_tokens(prompt))
         if not api_key:
             raise AIServiceUnavailable('No Gemini API key available')
-        genai.configure(api_key=api_key)
-        return genai.GenerativeModel(self.model_name)
+        return api_key
+    
+    def _build_model(self, api_key: str):
+        # Each model gets its own key-bound transport instead of the
+        # process-global one genai.configure() would swap under other threads
+        model = genai.GenerativeModel(self.model_name)
+        model._client = glm.GenerativeServiceClient(client_options={'api_key': api_key})
+        return model
+    
+    def _get_model(self, api_key: str):
+        return self.models.get(api_key)
+    
+    @coalesce('gemini', lock_timeout=90)
+    @circuit_breaker('gemini', AIServiceUnavailable)
+    def generate_content(self, prompt: str) -> str:
+        return self._generate_with_rotation(prompt)
     
-    def generate_content(self, prompt: str, retry_count: int = 0) -> str:
+    def is_available(self) -> bool:
+        return bool(api_key_manager.get_active_key('gemini')) and not get_breaker('gemini').is_open()
+    
+    def _generate_with_rotation(self, prompt: str, retry_count: int = 0) -> str:
         max_retries = len(settings.GEMINI_API_KEYS) if settings.GEMINI_API_KEYS else 1
         
+        api_key = self._get_api_key(prompt)
         try:
-            model = self._get_model()
-            response = model.generate_content(prompt)
+            # Hedge only when someone is waiting on the answer (not in Celery or the shell)
+            if settings.GEMINI_HEDGE_ENABLED and deadline.remaining() is not None:
+                return self._generate_hedged(prompt, api_key)
+            return self._generate_once(prompt, api_key)
+        except RateLimitExceeded:
+            if retry_count < max_retries - 1 and not api_key_manager.is_exhausted('gemini'):
+                return self._generate_with_rotation(prompt, retry_count + 1)
+            raise RateLimitExceeded('All Gemini API keys exhausted')
+    
+    def _generate_hedged(self, prompt: str, api_key: str) -> str:
+        def backup():
+            # Only a different key with spare capacity right now is worth hedging on
+            try:
+                other = rate_limiter.acquire_key('gemini', tokens=self._estimate_tokens(prompt), max_wait=0, exclude=(api_key,))
+            except RateLimitExceeded:
+                return None
+            return (lambda: self._generate_once(prompt, other)) if other else None
+        
+        return get_hedger('gemini').run(lambda: self._generate_once(prompt, api_key), backup)
+    
+    def _generate_once(self, prompt: str, api_key: str) -> str:
+        """One call on one key; a throttled key is cooled down and RateLimitExceeded raised."""
+        call_timeout = deadline.timeout(settings.GEMINI_TIMEOUT, 'Gemini call')
+        started = time.monotonic()
+        try:
+            model = self._get_model(api_key)
+            response = model.generate_content(prompt, request_options={'timeout': call_timeout})
+            api_key_manager.report('gemini', api_key, True, time.monotonic() - started)
             return response.text
         except Exception as e:
-            error_msg = str(e).lower()
-            # Check if it's a rate limit or quota error
-            if ('quota' in error_msg or 'rate' in error_msg or '429' in error_msg or 'resource_exhausted' in error_msg):
-                if retry_count < max_retries - 1:
-                    api_key_manager.rotate_key('gemini')
-                    return self.generate_content(prompt, retry_count + 1)
-                else:
-                    raise RateLimitExceeded('All Gemini API keys exhausted')
+            api_key_manager.report('gemini', api_key, False, time.monotonic() - started)
+            if self._is_throttled(e):
+                api_key_manager.mark_rate_limited('gemini', api_key)
+                raise RateLimitExceeded(f'Gemini API key rate limited: {str(e)}')
             raise AIServiceUnavailable(f'Gemini error: {str(e)}')
     
+    def _is_throttled(self, exc: Exception) -> bool:
+        """
+        True for a 429 / RESOURCE_EXHAUSTED from the API (ResourceExhausted
+        subclasses TooManyRequests). Judged on the error type, not the
+        message: messages include the method name, e.g. generateContent.
+        """
+        return isinstance(exc, google_exceptions.TooManyRequests)
+    
     def generate_video_concepts(self, topic: str) -> dict:
-        prompt = f"""Generate 3 unique YouTube video concepts for the topic: "{topic}"
+        return self._parse_video_concepts(topic, self.generate_content(self._video_concepts_prompt(topic)))
+    
+    def _video_concepts_prompt(self, topic: str) -> str:
+        return f"""Generate 3 unique YouTube video concepts for the topic: "{topic}"
         
 Return ONLY valid JSON in this exact format:
 {{
@@ -55,8 +124,8 @@ Return ONLY valid JSON in this exact format:
 }}
 
 Make each concept unique and SEO-optimized. SEO score should be 0-100."""
-        
-        response = self.generate_content(prompt)
+    
+    def _parse_video_concepts(self, topic: str, response: str) -> dict:
         try:
             # Clean response and parse JSON
             text = response.strip()
@@ -68,8 +137,12 @@ Make each concept unique and SEO-optimized. SEO score should be 0-100."""
         except json.JSONDecodeError:
             return self._fallback_content(topic)
     
+    @stale_while_revalidate('gemini_keywords', settings.GEMINI_SWR_SOFT_TTL, settings.GEMINI_SWR_MAX_STALE, settings.GEMINI_SWR_STALE_IF_ERROR, normalize_args=False)
     def generate_keywords(self, topic: str) -> dict:
-        prompt = f"""Research keywords for YouTube topic: "{topic}"
+        return self._parse_keywords(topic, self.generate_content(self._keywords_prompt(topic)))
+    
+    def _keywords_prompt(self, topic: str) -> str:
+        return f"""Research keywords for YouTube topic: "{topic}"
 
 Return ONLY valid JSON:
 {{
@@ -78,8 +151,8 @@ Return ONLY valid JSON:
     "trending_keywords": [{{"keyword": "...", "search_volume": 8000, "competition": "high", "relevance": 0.8}}],
     "related_topics": [{{"topic": "...", "search_volume": 6000, "competition": "medium", "relevance": 0.75}}]
 }}"""
-        
-        response = self.generate_content(prompt)
+    
+    def _parse_keywords(self, topic: str, response: str) -> dict:
         try:
             text = response.strip()
             if text.startswith('```'):
@@ -90,11 +163,15 @@ Return ONLY valid JSON:
         except json.JSONDecodeError:
             return self._fallback_keywords(topic)
     
+    @stale_while_revalidate('gemini_hashtags', settings.GEMINI_SWR_SOFT_TTL, settings.GEMINI_SWR_MAX_STALE, settings.GEMINI_SWR_STALE_IF_ERROR, normalize_args=False)
     def generate_hashtags(self, topic: str) -> list:
-        prompt = f"""Generate 10 trending YouTube hashtags for: "{topic}"
+        return self._parse_hashtags(topic, self.generate_content(self._hashtags_prompt(topic)))
+    
+    def _hashtags_prompt(self, topic: str) -> str:
+        return f"""Generate 10 trending YouTube hashtags for: "{topic}"
 Return ONLY a JSON array of hashtags like: ["#hashtag1", "#hashtag2"]"""
-        
-        response = self.generate_content(prompt)
+    
+    def _parse_hashtags(self, topic: str, response: str) -> list:
         try:
             text = response.strip()
             if text.startswith('```'):
@@ -106,11 +183,14 @@ Return ONLY a JSON array of hashtags like: ["#hashtag1", "#hashtag2"]"""
             return [f'#{topic}', '#youtube', '#viral', '#trending']
     
     def analyze_thumbnail(self, image_url: str) -> list:
-        prompt = f"""Analyze this YouTube thumbnail and generate descriptive tags.
+        return self._parse_thumbnail_tags(self.generate_content(self._thumbnail_tags_prompt(image_url)))
+    
+    def _thumbnail_tags_prompt(self, image_url: str) -> str:
+        return f"""Analyze this YouTube thumbnail and generate descriptive tags.
 Image URL: {image_url}
 Return ONLY a JSON array of tags like: ["tag1", "tag2", "tag3"]"""
-        
-        response = self.generate_content(prompt)
+    
+    def _parse_thumbnail_tags(self, response: str) -> list:
         try:
             text = response.strip()
             if text.startswith('```'):
@@ -122,11 +202,14 @@ Return ONLY a JSON array of tags like: ["tag1", "tag2", "tag3"]"""
             return ['thumbnail', 'youtube', 'video']
     
     def generate_growth_suggestions(self, channel_data: dict) -> list:
-        prompt = f"""Based on this YouTube channel data, provide growth suggestions:
+        return self._parse_growth_suggestions(self.generate_content(self._growth_suggestions_prompt(channel_data)))
+    
+    def _growth_suggestions_prompt(self, channel_data: dict) -> str:
+        return f"""Based on this YouTube channel data, provide growth suggestions:
 {json.dumps(channel_data)}
 Return ONLY a JSON array of suggestions like: ["suggestion1", "suggestion2"]"""
-        
-        response = self.generate_content(prompt)
+    
+    def _parse_growth_suggestions(self, response: str) -> list:
         try:
             text = response.strip()
             if text.startswith('```'):
@@ -169,4 +252,114 @@ Return ONLY a JSON array of suggestions like: ["suggestion1", "suggestion2"]"""
             'related_topics': [{'topic': f'{topic} tutorial', 'search_volume': 6000, 'competition': 'medium', 'relevance': 0.75}]
         }
 
-gemini_client = GeminiClient()
+gemini_client = swr_owner(GeminiClient())
+
+
+class AsyncGeminiClient:
+    """
+    Coroutine counterpart of GeminiClient, for async views.
+    
+    Calls the Gemini REST API through the shared async HTTP client with the
+    same key pool, token budgets, circuit breaker, single-flight and SWR
+    entries as the sync client. Hedging is left to the sync client.
+    """
+    API_URL = 'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent'
+    
+    # Prompts, parsing and fallbacks are shared with the sync client
+    _estimate_tokens = GeminiClient._estimate_tokens
+    _video_concepts_prompt = GeminiClient._video_concepts_prompt
+    _parse_video_concepts = GeminiClient._parse_video_concepts
+    _keywords_prompt = GeminiClient._keywords_prompt
+    _parse_keywords = GeminiClient._parse_keywords
+    _hashtags_prompt = GeminiClient._hashtags_prompt
+    _parse_hashtags = GeminiClient._parse_hashtags
+    _thumbnail_tags_prompt = GeminiClient._thumbnail_tags_prompt
+    _parse_thumbnail_tags = GeminiClient._parse_thumbnail_tags
+    _growth_suggestions_prompt = GeminiClient._growth_suggestions_prompt
+    _parse_growth_suggestions = GeminiClient._parse_growth_suggestions
+    _fallback_content = GeminiClient._fallback_content
+    _fallback_keywords = GeminiClient._fallback_keywords
+    
+    def __init__(self):
+        self.model_name = gemini_client.model_name
+    
+    async def _get_api_key(self, prompt: str) -> str:
+        # The limiter may sleep briefly for a refill; keep that off the loop
+        api_key = await asyncio.to_thread(rate_limiter.acquire_key, 'gemini', tokens=self._estimate_tokens(prompt))
+        if not api_key:
+            raise AIServiceUnavailable('No Gemini API key available')
+        return api_key
+    
+    @coalesce('gemini', lock_timeout=90)
+    @circuit_breaker('gemini', AIServiceUnavailable)
+    async def generate_content(self, prompt: str) -> str:
+        return await self._generate_with_rotation(prompt)
+    
+    async def is_available(self) -> bool:
+        return await asyncio.to_thread(gemini_client.is_available)
+    
+    async def _generate_with_rotation(self, prompt: str, retry_count: int = 0) -> str:
+        max_retries = len(settings.GEMINI_API_KEYS) if settings.GEMINI_API_KEYS else 1
+        
+        api_key = await self._get_api_key(prompt)
+        try:
+            return await self._generate_once(prompt, api_key)
+        except RateLimitExceeded:
+            if retry_count < max_retries - 1 and not await asyncio.to_thread(api_key_manager.is_exhausted, 'gemini'):
+                return await self._generate_with_rotation(prompt, retry_count + 1)
+            raise RateLimitExceeded('All Gemini API keys exhausted')
+    
+    async def _generate_once(self, prompt: str, api_key: str) -> str:
+        """One call on one key; a throttled key is cooled down and RateLimitExceeded raised."""
+        call_timeout = deadline.timeout(settings.GEMINI_TIMEOUT, 'Gemini call')
+        started = time.monotonic()
+        try:
+            response = await async_http.request(
+                'POST', self.API_URL.format(model=self.model_name),
+                headers={'x-goog-api-key': api_key},
+                json={'contents': [{'parts': [{'text': prompt}]}]},
+                timeout=httpx.Timeout(call_timeout, connect=min(call_timeout, settings.HTTP_CONNECT_TIMEOUT)),
+            )
+            response.raise_for_status()
+            parts = response.json()['candidates'][0]['content']['parts']
+            await asyncio.to_thread(api_key_manager.report, 'gemini', api_key, True, time.monotonic() - started)
+            return ''.join(part.get('text', '') for part in parts)
+        except Exception as e:
+            await asyncio.to_thread(api_key_manager.report, 'gemini', api_key, False, time.monotonic() - started)
+            if self._is_throttled(e):
+                await asyncio.to_thread(api_key_manager.mark_rate_limited, 'gemini', api_key)
+                raise RateLimitExceeded(f'Gemini API key rate limited: {str(e)}')
+            raise AIServiceUnavailable(f'Gemini error: {str(e)}')
+    
+    def _is_throttled(self, exc: Exception) -> bool:
+        """
+        True for a 429 or a RESOURCE_EXHAUSTED error body. Judged on the
+        response, not the message: httpx messages include the request URL.
+        """
+        if not isinstance(exc, httpx.HTTPStatusError):
+            return False
+        if exc.response.status_code == 429:
+            return True
+        try:
+            return exc.response.json().get('error', {}).get('status') == 'RESOURCE_EXHAUSTED'
+        except (ValueError, AttributeError):
+            return False
+    
+    async def generate_video_concepts(self, topic: str) -> dict:
+        return self._parse_video_concepts(topic, await self.generate_content(self._video_concepts_prompt(topic)))
+    
+    @stale_while_revalidate('gemini_keywords', settings.GEMINI_SWR_SOFT_TTL, settings.GEMINI_SWR_MAX_STALE, settings.GEMINI_SWR_STALE_IF_ERROR, normalize_args=False)
+    async def generate_keywords(self, topic: str) -> dict:
+        return self._parse_keywords(topic, await self.generate_content(self._keywords_prompt(topic)))
+    
+    @stale_while_revalidate('gemini_hashtags', settings.GEMINI_SWR_SOFT_TTL, settings.GEMINI_SWR_MAX_STALE, settings.GEMINI_SWR_STALE_IF_ERROR, normalize_args=False)
+    async def generate_hashtags(self, topic: str) -> list:
+        return self._parse_hashtags(topic, await self.generate_content(self._hashtags_prompt(topic)))
+    
+    async def analyze_thumbnail(self, image_url: str) -> list:
+        return self._parse_thumbnail_tags(await self.generate_content(self._thumbnail_tags_prompt(image_url)))
+    
+    async def generate_growth_suggestions(self, channel_data: dict) -> list:
+        return self._parse_growth_suggestions(await self.generate_content(self._growth_suggestions_prompt(channel_data)))
+
+async_gemini_client = AsyncGeminiClient()
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import random
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from core.exceptions import DeadlineExceeded
+from core.utils import deadline
+from core.utils.cache_keys import make_key
+from core.utils.metrics import MetricCounters
+from core.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Per-worker routing decisions: how often each provider went first, and by exploration
+provider_routing_stats = MetricCounters()
+
+# A provider with no recent attempts is treated as unknown again after a day
+SAMPLES_TTL = 86400
+# Stand-in for an attempt's outcome in the sample window when it failed
+FAILED = 'x'
+# Exploration weighs a provider as if it took at most this long, so one whose
+# recent attempts all failed is still probed now and then
+EXPLORE_MAX_SECONDS = 600
+
+
+class GeneratedImage:
+    """
+    An image returned by a generation provider.
+
+    `url` is where the provider serves it. `content` holds the bytes when the
+    provider already downloaded them (e.g. to verify the response), so the CDN
+    upload can reuse them instead of fetching the URL a second time.
+    """
+
+    def __init__(self, url: str, content: bytes = None, content_type: str = 'image/png'):
+        self.url = url
+        self.content = content
+        self.content_type = content_type
+
+    def __repr__(self) -> str:
+        size = 'url only' if self.content is None else f'{len(self.content)} bytes'
+        return f'<GeneratedImage {self.content_type}, {size}>'
+
+
+class ImageProvider(ABC):
+    """
+    What a thumbnail generation backend implements to be routed to.
+
+    Subclasses set `name` (as listed in THUMBNAIL_PROVIDERS), implement
+    generate_image() and return the price of one image from
+    `cost_per_image`, then register their singleton with
+    image_providers.register(). Those with an async client also override
+    agenerate_image(); otherwise async callers run generate_image() in a
+    worker thread.
+    """
+    name = None
+
+    @property
+    def cost_per_image(self) -> float:
+        return 0.0
+
+    def is_available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def generate_image(self, prompt: str) -> GeneratedImage:
+        """A 16:9, 1280x720 thumbnail for the prompt; raises AIServiceUnavailable on failure."""
+
+    async def agenerate_image(self, prompt: str) -> GeneratedImage:
+        """generate_image() for async callers. Providers with an async client override this."""
+        return await asyncio.to_thread(self.generate_image, prompt)
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class _LocalStatsStore:
+    """Provider samples and totals for a single process, used when the cache is not Redis."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = {}
+
+    def record(self, key: str, sample: str, totals: dict) -> None:
+        with self._lock:
+            window = self._samples.setdefault(key, deque(maxlen=settings.THUMBNAIL_ROUTING_WINDOW))
+            window.appendleft(sample)
+            counts = self._totals.setdefault(key, {})
+            for field, amount in totals.items():
+                counts[field] = counts.get(field, 0) + amount
+
+    def read(self, keys: list) -> list:
+        with self._lock:
+            return [(list(self._samples.get(key, ())), dict(self._totals.get(key, {}))) for key in keys]
+
+
+class _RedisStatsStore:
+    """Provider samples in a capped Redis list per provider, totals in a hash beside it."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def record(self, key: str, sample: str, totals: dict) -> None:
+        with self.client.pipeline() as pipe:
+            pipe.lpush(f'{key}:samples', sample)
+            pipe.ltrim(f'{key}:samples', 0, settings.THUMBNAIL_ROUTING_WINDOW - 1)
+            pipe.expire(f'{key}:samples', SAMPLES_TTL)
+            for field, amount in totals.items():
+                pipe.hincrbyfloat(f'{key}:totals', field, amount)
+            pipe.execute()
+
+    def read(self, keys: list) -> list:
+        with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.lrange(f'{key}:samples', 0, -1)
+                pipe.hgetall(f'{key}:totals')
+            replies = pipe.execute()
+        return [
+            ([_decode(s) for s in samples], {_decode(k): float(v) for k, v in totals.items()})
+            for samples, totals in zip(replies[::2], replies[1::2])
+        ]
+
+
+class ProviderStats:
+    """One provider's recent attempts, as read from the shared store."""
+
+    def __init__(self, provider: ImageProvider, samples: list, totals: dict):
+        self.provider = provider
+        self.attempts = len(samples)
+        latencies = sorted(float(s) / 1000 for s in samples if s != FAILED)
+        self.error_rate = (self.attempts - len(latencies)) / self.attempts if self.attempts else 0.0
+        self.p50 = latencies[int(len(latencies) * 0.5)] if latencies else None
+        self.p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+        self.totals = totals
+
+    @property
+    def cold(self) -> bool:
+        return self.attempts < settings.THUMBNAIL_ROUTING_MIN_SAMPLES
+
+    @property
+    def expected_seconds(self) -> float:
+        """
+        Expected time to an image when this provider goes first, plus its price.
+
+        An attempt takes about the midpoint of p50 and p95 (latencies are
+        right-skewed, so the mean sits above the median) and succeeds with
+        probability 1 - error rate; cost is converted at THUMBNAIL_COST_WEIGHT
+        seconds per dollar.
+        """
+        if self.p50 is None:
+            return float('inf')
+        attempt = (self.p50 + self.p95) / 2
+        success = max(1 - self.error_rate, 0.05)
+        return attempt / success + self.provider.cost_per_image * settings.THUMBNAIL_COST_WEIGHT
+
+    def snapshot(self) -> dict:
+        expected = self.expected_seconds
+        return {
+            'attempts': self.attempts,
+            'p50_ms': None if self.p50 is None else int(self.p50 * 1000),
+            'p95_ms': None if self.p95 is None else int(self.p95 * 1000),
+            'error_rate': round(self.error_rate, 3),
+            'cost_per_image': self.provider.cost_per_image,
+            'expected_seconds': None if expected == float('inf') else round(expected, 2),
+            'images': int(self.totals.get('images', 0)),
+            'errors': int(self.totals.get('errors', 0)),
+            'spent': round(self.totals.get('spent', 0.0), 4),
+        }
+
+
+class ImageProviderRegistry:
+    """
+    Thumbnail providers and the order to try them in, per request.
+
+    Every attempt's outcome (latency or failure) goes into a window of the
+    last THUMBNAIL_ROUTING_WINDOW attempts per provider, shared by all
+    workers through Redis (in-process for locmem), along with image, error
+    and spend totals. route() puts the provider with the best expected
+    completion time first. Providers with fewer than
+    THUMBNAIL_ROUTING_MIN_SAMPLES attempts go first until they have them,
+    and THUMBNAIL_EXPLORE_RATE of requests start on another provider, picked
+    with weight 1 / expected time, so the others' statistics stay current.
+    """
+
+    def __init__(self):
+        self._providers = {}
+        self._local_store = _LocalStatsStore()
+
+    def register(self, provider: ImageProvider) -> ImageProvider:
+        if not provider.name:
+            raise TypeError(f'{type(provider).__name__} must set a provider name')
+        self._providers[provider.name] = provider
+        return provider
+
+    def _store(self):
+        client = get_redis()
+        return _RedisStatsStore(client) if client is not None else self._local_store
+
+    def _stats_key(self, name: str) -> str:
+        return make_key('image_provider', name)
+
+    def _configured(self) -> list:
+        providers = []
+        for name in settings.THUMBNAIL_PROVIDERS:
+            if name in self._providers:
+                providers.append(self._providers[name])
+            else:
+                logger.warning(f"[ImageProviders] '{name}' is in THUMBNAIL_PROVIDERS but not registered")
+        return providers
+
+    def stats(self, providers: list) -> list:
+        rows = self._store().read([self._stats_key(p.name) for p in providers])
+        return [ProviderStats(p, samples, totals) for p, (samples, totals) in zip(providers, rows)]
+
+    def route(self) -> list:
+        """Available providers, the one to try first at the front."""
+        stats = self.stats([p for p in self._configured() if p.is_available()])
+        if not stats:
+            return []
+
+        cold = [s for s in stats if s.cold]
+        ranked = cold + sorted((s for s in stats if not s.cold), key=lambda s: s.expected_seconds)
+        if not cold and len(ranked) > 1 and random.random() < settings.THUMBNAIL_EXPLORE_RATE:
+            others = ranked[1:]
+            weights = [1 / min(max(s.expected_seconds, 0.001), EXPLORE_MAX_SECONDS) for s in others]
+            pick = random.choices(others, weights=weights)[0]
+            ranked.remove(pick)
+            ranked.insert(0, pick)
+            provider_routing_stats.incr(pick.provider.name, 'explored')
+
+        provider_routing_stats.incr(ranked[0].provider.name, 'first')
+        order = [s.provider for s in ranked]
+        logger.info(f"[ImageProviders] Route: {' -> '.join(p.name for p in order)}")
+        return order
+
+    async def aroute(self) -> list:
+        # The stats read is a cache round-trip; keep it off the event loop
+        return await asyncio.to_thread(self.route)
+
+    def generate(self, provider: ImageProvider, prompt: str) -> GeneratedImage:
+        """provider.generate_image(), with its outcome recorded for routing."""
+        started = time.monotonic()
+        try:
+            image = provider.generate_image(prompt)
+        except Exception as e:
+            self._record_failure(provider, e)
+            raise
+        self._record(provider, time.monotonic() - started)
+        return image
+
+    async def agenerate(self, provider: ImageProvider, prompt: str) -> GeneratedImage:
+        """
+        provider.agenerate_image(), with its outcome recorded for routing. A
+        task cancelled because another provider won is not recorded.
+        """
+        started = time.monotonic()
+        try:
+            image = await provider.agenerate_image(prompt)
+        except Exception as e:
+            await asyncio.to_thread(self._record_failure, provider, e)
+            raise
+        await asyncio.to_thread(self._record, provider, time.monotonic() - started)
+        return image
+
+    def _record_failure(self, provider: ImageProvider, error: Exception) -> None:
+        # Cancelled because another provider won: says nothing about this one
+        if isinstance(error, DeadlineExceeded) and deadline.cancelled():
+            return
+        # A rejection by an open circuit breaker was not an attempt
+        if getattr(error, 'circuit_open', False):
+            return
+        self._record(provider, None)
+
+    def _record(self, provider: ImageProvider, seconds) -> None:
+        if seconds is None:
+            sample, totals = FAILED, {'errors': 1}
+        else:
+            sample, totals = f'{seconds * 1000:.0f}', {'images': 1, 'spent': provider.cost_per_image}
+        try:
+            self._store().record(self._stats_key(provider.name), sample, totals)
+        except Exception as e:
+            logger.warning(f"[ImageProviders] Could not record {provider.name} outcome: {str(e)}")
+
+    def snapshot(self) -> dict:
+        return {s.provider.name: s.snapshot() for s in self.stats(self._configured())}
+
+
+image_providers = ImageProviderRegistry()
@@ -1,131 +1,209 @@
-import base64
+import asyncio
+import io
+import logging
+import os
+from tempfile import SpooledTemporaryFile
+import httpx
 import requests
 from django.conf import settings
-from imagekitio import ImageKit
+from requests_toolbelt import MultipartEncoder
 from core.utils.retry import retry_with_backoff
+from core.utils.http import get_session, get_timeout
+from core.utils.async_http import async_http, get_async_timeout
+from core.utils import deadline
+from core.utils.circuit_breaker import circuit_breaker, get_breaker
 from core.exceptions import InsightStreamException
 
+logger = logging.getLogger(__name__)
+
+class _UploadReader:
+    """
+    Read-only view of an upload buffer without fileno().
+    
+    Multipart encoders size file objects via fileno() when they have one,
+    which rolls a SpooledTemporaryFile over to disk; `len` (requests-toolbelt)
+    and tell()/seek() (httpx) give them the size without it.
+    """
+    
+    def __init__(self, fileobj):
+        self._file = fileobj
+        self._size = fileobj.seek(0, os.SEEK_END)
+        fileobj.seek(0)
+    
+    @property
+    def len(self) -> int:
+        return self._size - self._file.tell()
+    
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+    
+    def tell(self) -> int:
+        return self._file.tell()
+    
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+
+def _check_configured() -> None:
+    if not all([settings.IMAGEKIT_PUBLIC_KEY, settings.IMAGEKIT_PRIVATE_KEY, settings.IMAGEKIT_URL_ENDPOINT]):
+        raise InsightStreamException('ImageKit not configured', 'CONFIG_ERROR')
+
+
 class ImageKitClient:
-    def __init__(self):
-        self._client = None
+    """
+    Uploads thumbnails to ImageKit.
     
-    def _get_client(self) -> ImageKit:
-        if not self._client:
-            if not all([settings.IMAGEKIT_PUBLIC_KEY, settings.IMAGEKIT_PRIVATE_KEY, settings.IMAGEKIT_URL_ENDPOINT]):
-                raise InsightStreamException('ImageKit not configured', 'CONFIG_ERROR')
-            
-            self._client = ImageKit(
-                public_key=settings.IMAGEKIT_PUBLIC_KEY,
-                private_key=settings.IMAGEKIT_PRIVATE_KEY,
-                url_endpoint=settings.IMAGEKIT_URL_ENDPOINT
-            )
-        return self._client
+    Talks to the upload API directly over the pooled 'imagekit' session. The
+    image is sent as a streamed multipart body read in chunks from a buffer
+    or SpooledTemporaryFile (downloads spill to disk above
+    IMAGEKIT_SPOOL_MAX_BYTES), so an upload never holds a base64 copy or a
+    fully assembled request body, as the SDK's data-URI upload did.
+    """
+    UPLOAD_URL = 'https://upload.imagekit.io/api/v1/files/upload'
+    CHUNK_SIZE = 64 * 1024
     
-    @retry_with_backoff(max_retries=2, base_delay=1.0)
+    @retry_with_backoff(max_retries=2, base_delay=0.5)
+    @circuit_breaker('imagekit', InsightStreamException)
     def upload_from_url(self, image_url: str, file_name: str = 'thumbnail') -> str:
         """Download image from URL and upload to ImageKit. Returns CDN URL."""
         import logging
         logger = logging.getLogger(__name__)
         
+        _check_configured()
+        with SpooledTemporaryFile(max_size=settings.IMAGEKIT_SPOOL_MAX_BYTES) as buffer:
+            try:
+                logger.info(f"[ImageKit] Starting download from URL: {image_url[:100]}...")
+                with get_session('imagekit').get(
+                    image_url,
+                    timeout=get_timeout(60),
+                    headers={'User-Agent': 'Mozilla/5.0'},
+                    stream=True
+                ) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get('content-type', '')
+                    if not content_type.startswith('image/'):
+                        logger.error(f"[ImageKit] Invalid content type: {content_type}")
+                        raise InsightStreamException(f'Invalid content type: {content_type}', 'INVALID_IMAGE')
+                    for chunk in response.iter_content(self.CHUNK_SIZE):
+                        buffer.write(chunk)
+            except requests.RequestException as e:
+                logger.error(f"[ImageKit] Download failed: {str(e)}")
+                raise InsightStreamException(f'Failed to download image: {str(e)}', 'DOWNLOAD_ERROR')
+            
+            logger.info(f"[ImageKit] Downloaded {buffer.tell()} bytes, content-type: {content_type}")
+            return self._upload(buffer, content_type, file_name)
+    
+    @retry_with_backoff(max_retries=2, base_delay=0.5)
+    @circuit_breaker('imagekit', InsightStreamException)
+    def upload_from_bytes(self, image_bytes: bytes, file_name: str = 'thumbnail', content_type: str = 'image/png') -> str:
+        """Upload image bytes to ImageKit. Returns CDN URL."""
+        _check_configured()
+        logger.info(f"[ImageKit] Uploading {len(image_bytes)} bytes ({content_type}) as {file_name}.png")
+        # BytesIO shares the bytes' buffer until written to: no copy
+        return self._upload(io.BytesIO(image_bytes), content_type, file_name)
+    
+    def _upload(self, fileobj, content_type: str, file_name: str) -> str:
+        deadline.check('ImageKit upload')
+        body = MultipartEncoder(fields={
+            'file': (f'{file_name}.png', _UploadReader(fileobj), content_type),
+            'fileName': f'{file_name}.png',
+            'folder': '/thumbnails/',
+            'useUniqueFileName': 'true',
+        })
         try:
-            logger.info(f"[ImageKit] Starting download from URL: {image_url[:100]}...")
-            response = requests.get(
-                image_url, 
-                timeout=60,
-                headers={'User-Agent': 'Mozilla/5.0'}
+            response = get_session('imagekit').post(
+                self.UPLOAD_URL,
+                data=body,
+                headers={'Content-Type': body.content_type},
+                auth=(settings.IMAGEKIT_PRIVATE_KEY, ''),
+                timeout=get_timeout(60)
             )
             response.raise_for_status()
-            logger.info(f"[ImageKit] Downloaded {len(response.content)} bytes, content-type: {response.headers.get('content-type')}")
-            
-            content_type = response.headers.get('content-type', '')
-            if not content_type.startswith('image/'):
-                logger.error(f"[ImageKit] Invalid content type: {content_type}")
-                raise InsightStreamException(f'Invalid content type: {content_type}', 'INVALID_IMAGE')
-            
-            logger.info(f"[ImageKit] Converting to base64 with data URI...")
-            image_base64 = base64.b64encode(response.content).decode('utf-8')
-            data_uri = f"data:{content_type};base64,{image_base64}"
-            logger.info(f"[ImageKit] Data URI length: {len(data_uri)}")
-            
-            logger.info(f"[ImageKit] Uploading to ImageKit with filename: {file_name}.png")
-            client = self._get_client()
-            from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
-            options = UploadFileRequestOptions(
-                folder="/thumbnails/",
-                use_unique_file_name=True,
-            )
-            result = client.upload_file(
-                file=data_uri,
-                file_name=f"{file_name}.png",
-                options=options
-            )
-            logger.info(f"[ImageKit] Upload result type: {type(result)}, has url attr: {hasattr(result, 'url')}")
-            
-            if hasattr(result, 'url') and result.url:
-                logger.info(f"[ImageKit] Success! URL from result.url: {result.url}")
-                return result.url
-            elif isinstance(result, dict) and 'url' in result:
-                logger.info(f"[ImageKit] Success! URL from dict: {result['url']}")
-                return result['url']
-            elif hasattr(result, 'response_metadata'):
-                logger.info(f"[ImageKit] Checking response_metadata...")
-                if hasattr(result.response_metadata, 'url'):
-                    logger.info(f"[ImageKit] Success! URL from metadata.url: {result.response_metadata.url}")
-                    return result.response_metadata.url
-                if hasattr(result.response_metadata, 'raw') and isinstance(result.response_metadata.raw, dict):
-                    url = result.response_metadata.raw.get('url')
-                    if url:
-                        logger.info(f"[ImageKit] Success! URL from metadata.raw: {url}")
-                        return url
-            
-            logger.error(f"[ImageKit] No URL found in result. Type: {type(result)}, Dir: {dir(result)[:5]}")
-            raise InsightStreamException(f'ImageKit upload failed: No URL in response. Result type: {type(result)}', 'UPLOAD_ERROR')
-            
+            url = response.json().get('url')
         except requests.RequestException as e:
-            logger.error(f"[ImageKit] Download failed: {str(e)}")
-            raise InsightStreamException(f'Failed to download image: {str(e)}', 'DOWNLOAD_ERROR')
-        except InsightStreamException:
-            raise
-        except Exception as e:
-            logger.error(f"[ImageKit] Unexpected error: {str(e)}", exc_info=True)
+            logger.error(f"[ImageKit] Upload failed: {str(e)}")
             raise InsightStreamException(f'ImageKit error: {str(e)}', 'IMAGEKIT_ERROR')
+        except ValueError:
+            raise InsightStreamException('ImageKit upload failed: invalid JSON response', 'UPLOAD_ERROR')
+        
+        if not url:
+            raise InsightStreamException('ImageKit upload failed: No URL in response', 'UPLOAD_ERROR')
+        logger.info(f"[ImageKit] Success! URL: {url}")
+        return url
+    
+    def is_available(self) -> bool:
+        configured = all([settings.IMAGEKIT_PUBLIC_KEY, settings.IMAGEKIT_PRIVATE_KEY, settings.IMAGEKIT_URL_ENDPOINT])
+        return configured and not get_breaker('imagekit').is_open()
+
+imagekit_client = ImageKitClient()
+
+
+class AsyncImageKitClient:
+    """
+    Coroutine counterpart of ImageKitClient, on the shared async HTTP client.
+    
+    Downloads are streamed into a SpooledTemporaryFile and uploaded from it in
+    chunks; bytes already in memory are sent as they are.
+    """
+    UPLOAD_URL = ImageKitClient.UPLOAD_URL
+    CHUNK_SIZE = ImageKitClient.CHUNK_SIZE
+    
+    @retry_with_backoff(max_retries=2, base_delay=0.5)
+    @circuit_breaker('imagekit', InsightStreamException)
+    async def upload_from_url(self, image_url: str, file_name: str = 'thumbnail') -> str:
+        """Download image from URL and upload to ImageKit. Returns CDN URL."""
+        _check_configured()
+        with SpooledTemporaryFile(max_size=settings.IMAGEKIT_SPOOL_MAX_BYTES) as buffer:
+            try:
+                async with async_http.stream(
+                    'GET', image_url, timeout=get_async_timeout(60), headers={'User-Agent': 'Mozilla/5.0'}, follow_redirects=True
+                ) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get('content-type', '')
+                    if not content_type.startswith('image/'):
+                        logger.error(f"[ImageKit] Invalid content type: {content_type}")
+                        raise InsightStreamException(f'Invalid content type: {content_type}', 'INVALID_IMAGE')
+                    async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                        buffer.write(chunk)
+            except httpx.HTTPError as e:
+                logger.error(f"[ImageKit] Download failed: {str(e)}")
+                raise InsightStreamException(f'Failed to download image: {str(e)}', 'DOWNLOAD_ERROR')
+            
+            logger.info(f"[ImageKit] Downloaded {buffer.tell()} bytes, uploading")
+            return await self._upload(_UploadReader(buffer), content_type, file_name)
     
-    @retry_with_backoff(max_retries=2, base_delay=1.0)
-    def upload_from_bytes(self, image_bytes: bytes, file_name: str = 'thumbnail') -> str:
+    @retry_with_backoff(max_retries=2, base_delay=0.5)
+    @circuit_breaker('imagekit', InsightStreamException)
+    async def upload_from_bytes(self, image_bytes: bytes, file_name: str = 'thumbnail', content_type: str = 'image/png') -> str:
         """Upload image bytes to ImageKit. Returns CDN URL."""
+        _check_configured()
+        return await self._upload(image_bytes, content_type, file_name)
+    
+    async def _upload(self, content, content_type: str, file_name: str) -> str:
+        """Upload `content` (bytes, or a reader httpx streams in chunks)."""
+        deadline.check('ImageKit upload')
         try:
-            image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-            data_uri = f"data:image/png;base64,{image_base64}"
-            
-            client = self._get_client()
-            from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
-            options = UploadFileRequestOptions(
-                folder="/thumbnails/",
-                use_unique_file_name=True,
-            )
-            result = client.upload_file(
-                file=data_uri,
-                file_name=f"{file_name}.png",
-                options=options
+            response = await async_http.request(
+                'POST', self.UPLOAD_URL,
+                auth=(settings.IMAGEKIT_PRIVATE_KEY, ''),
+                data={'fileName': f'{file_name}.png', 'folder': '/thumbnails/', 'useUniqueFileName': 'true'},
+                files={'file': (f'{file_name}.png', content, content_type)},
+                timeout=get_async_timeout(60),
             )
-            
-            if hasattr(result, 'url') and result.url:
-                return result.url
-            elif isinstance(result, dict) and 'url' in result:
-                return result['url']
-            elif hasattr(result, 'response_metadata'):
-                if hasattr(result.response_metadata, 'url'):
-                    return result.response_metadata.url
-                if hasattr(result.response_metadata, 'raw') and isinstance(result.response_metadata.raw, dict):
-                    url = result.response_metadata.raw.get('url')
-                    if url:
-                        return url
-            raise InsightStreamException(f'ImageKit upload failed: No URL. Result type: {type(result)}', 'UPLOAD_ERROR')
-            
-        except Exception as e:
+            response.raise_for_status()
+            url = response.json().get('url')
+        except httpx.HTTPError as e:
+            logger.error(f"[ImageKit] Upload failed: {str(e)}")
             raise InsightStreamException(f'ImageKit error: {str(e)}', 'IMAGEKIT_ERROR')
+        except ValueError:
+            raise InsightStreamException('ImageKit upload failed: invalid JSON response', 'UPLOAD_ERROR')
+        
+        if not url:
+            raise InsightStreamException('ImageKit upload failed: No URL in response', 'UPLOAD_ERROR')
+        logger.info(f"[ImageKit] Success! URL: {url}")
+        return url
     
-    def is_available(self) -> bool:
-        return all([settings.IMAGEKIT_PUBLIC_KEY, settings.IMAGEKIT_PRIVATE_KEY, settings.IMAGEKIT_URL_ENDPOINT])
+    async def is_available(self) -> bool:
+        return await asyncio.to_thread(imagekit_client.is_available)
 
-imagekit_client = ImageKitClient()
+async_imagekit_client = AsyncImageKitClient()
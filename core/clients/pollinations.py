@@ -1,15 +1,42 @@
+import asyncio
+import logging
 import time
+import httpx
 import requests
 from urllib.parse import quote
+from django.conf import settings
 from core.utils.retry import retry_with_backoff
+from core.utils.circuit_breaker import circuit_breaker, get_breaker
+from core.utils.http import get_session, get_timeout
+from core.utils.async_http import async_http, get_async_timeout
+from core.clients.image_provider import GeneratedImage, ImageProvider, image_providers
 from core.exceptions import AIServiceUnavailable
 
-class PollinationsClient:
+logger = logging.getLogger(__name__)
+
+class PollinationsClient(ImageProvider):
+    name = 'pollinations'
     BASE_URL = "https://image.pollinations.ai/prompt"
     
-    @retry_with_backoff(max_retries=3, base_delay=1.0)
-    def generate_thumbnail(self, prompt: str, width: int = 1280, height: int = 720) -> str:
-        """Generate thumbnail using Pollinations AI (free, no API key needed). Returns image URL."""
+    @property
+    def cost_per_image(self) -> float:
+        return settings.POLLINATIONS_COST_PER_IMAGE
+    
+    def generate_image(self, prompt: str) -> GeneratedImage:
+        return self.generate_thumbnail(prompt, width=1280, height=720)
+    
+    async def agenerate_image(self, prompt: str) -> GeneratedImage:
+        return await async_pollinations_client.generate_thumbnail(prompt, width=1280, height=720)
+    
+    @retry_with_backoff(max_retries=3, base_delay=0.5)
+    @circuit_breaker('pollinations', AIServiceUnavailable)
+    def generate_thumbnail(self, prompt: str, width: int = 1280, height: int = 720) -> GeneratedImage:
+        """
+        Generate thumbnail using Pollinations AI (free, no API key needed).
+        
+        The image is generated on fetch, so it is downloaded here; the bytes
+        are returned with the URL for the CDN upload to reuse.
+        """
         import logging
         logger = logging.getLogger(__name__)
         
@@ -24,13 +51,13 @@ class PollinationsClient:
             logger.info(f"[Pollinations] Generated URL (first 150 chars): {image_url[:150]}...")
             logger.info(f"[Pollinations] Full URL length: {len(image_url)}, seed: {seed}")
             
-            logger.info(f"[Pollinations] Fetching image to verify...")
-            response = requests.get(image_url, timeout=60, headers={'User-Agent': 'Mozilla/5.0'}, allow_redirects=True)
+            logger.info(f"[Pollinations] Fetching image...")
+            response = get_session('pollinations').get(image_url, timeout=get_timeout(60), headers={'User-Agent': 'Mozilla/5.0'}, allow_redirects=True)
             logger.info(f"[Pollinations] Response: status={response.status_code}, content-type={response.headers.get('content-type')}, size={len(response.content)}")
             
             if response.status_code == 200 and response.headers.get('content-type', '').startswith('image/'):
                 logger.info(f"[Pollinations] Success! Image generated and verified")
-                return image_url
+                return GeneratedImage(image_url, response.content, response.headers['content-type'])
             
             logger.error(f"[Pollinations] Failed: status={response.status_code}, content-type={response.headers.get('content-type')}")
             raise AIServiceUnavailable(f'Pollinations failed: status={response.status_code}, content-type={response.headers.get("content-type")}')
@@ -40,10 +67,49 @@ class PollinationsClient:
             raise AIServiceUnavailable(f'Pollinations error: {str(e)}')
     
     def is_available(self) -> bool:
-        """Pollinations is always available (free service)"""
+        """Pollinations needs no key (free service); only an open circuit takes it out"""
         import logging
         logger = logging.getLogger(__name__)
-        logger.info("[Pollinations] Checking availability: Always available")
-        return True
+        available = not get_breaker('pollinations').is_open()
+        logger.info(f"[Pollinations] Checking availability: {available}")
+        return available
+
+pollinations_client = image_providers.register(PollinationsClient())
+
+
+class AsyncPollinationsClient:
+    """
+    Coroutine counterpart of PollinationsClient, on the shared async HTTP
+    client. Async callers reach it through image_providers.agenerate().
+    """
+    BASE_URL = PollinationsClient.BASE_URL
+    
+    @retry_with_backoff(max_retries=3, base_delay=0.5)
+    @circuit_breaker('pollinations', AIServiceUnavailable)
+    async def generate_thumbnail(self, prompt: str, width: int = 1280, height: int = 720) -> GeneratedImage:
+        """Generate thumbnail using Pollinations AI (free, no API key needed), with its bytes."""
+        enhanced_prompt = f"Professional YouTube thumbnail: {prompt.strip()}. High quality, eye-catching, vibrant colors."
+        seed = int(time.time() * 1000)
+        image_url = f"{self.BASE_URL}/{quote(enhanced_prompt, safe='')}?width={width}&height={height}&nologo=true&seed={seed}&model=flux"
+        logger.info(f"[Pollinations] Async generation, seed: {seed}")
+        
+        try:
+            response = await async_http.request(
+                'GET', image_url, timeout=get_async_timeout(60), headers={'User-Agent': 'Mozilla/5.0'}, follow_redirects=True
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"[Pollinations] Request error: {str(e)}")
+            raise AIServiceUnavailable(f'Pollinations error: {str(e)}')
+        
+        content_type = response.headers.get('content-type', '')
+        if response.status_code == 200 and content_type.startswith('image/'):
+            logger.info(f"[Pollinations] Success! Image generated and verified")
+            return GeneratedImage(image_url, response.content, content_type)
+        
+        logger.error(f"[Pollinations] Failed: status={response.status_code}, content-type={content_type}")
+        raise AIServiceUnavailable(f'Pollinations failed: status={response.status_code}, content-type={content_type}')
+    
+    async def is_available(self) -> bool:
+        return await asyncio.to_thread(pollinations_client.is_available)
 
-pollinations_client = PollinationsClient()
+async_pollinations_client = AsyncPollinationsClient()
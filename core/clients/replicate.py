@@ -1,67 +1,211 @@
+import asyncio
+import logging
+import time
 import replicate
+from replicate.exceptions import ReplicateError
 from django.conf import settings
 from core.utils.api_key_manager import api_key_manager
+from core.utils.rate_limit import rate_limiter
 from core.utils.retry import retry_with_backoff
-from core.exceptions import AIServiceUnavailable
+from core.utils.circuit_breaker import circuit_breaker, get_breaker
+from core.utils.client_pool import KeyedClientPool
+from core.utils import deadline
+from core.clients.image_provider import GeneratedImage, ImageProvider, image_providers
+from core.exceptions import AIServiceUnavailable, DeadlineExceeded, RateLimitExceeded
 
-class ReplicateClient:
+logger = logging.getLogger(__name__)
+
+class ReplicateClient(ImageProvider):
+    name = 'replicate'
     FLUX_MODEL = "black-forest-labs/flux-schnell"
+    POLL_INTERVAL = 0.5
+    FINISHED = ('succeeded', 'failed', 'canceled')
     
     def __init__(self):
-        self.client = None
+        # replicate.Client keeps an httpx connection pool; one per key, reused
+        self.clients = KeyedClientPool('replicate', lambda api_key: replicate.Client(api_token=api_key))
+    
+    @property
+    def cost_per_image(self) -> float:
+        return settings.REPLICATE_COST_PER_IMAGE
+    
+    def generate_image(self, prompt: str) -> GeneratedImage:
+        return self.generate_thumbnail(prompt, aspect_ratio="16:9")
+    
+    async def agenerate_image(self, prompt: str) -> GeneratedImage:
+        return await async_replicate_client.generate_thumbnail(prompt, aspect_ratio="16:9")
     
-    def _get_client(self):
-        api_key = api_key_manager.get_active_key('replicate')
+    def _get_api_key(self) -> str:
+        try:
+            api_key = rate_limiter.acquire_key('replicate')
+        except RateLimitExceeded as e:
+            # Chained, so retries still honour the Retry-After it carries
+            raise AIServiceUnavailable(f'Replicate rate limit: {e.message}') from e
         if not api_key:
             raise AIServiceUnavailable('No Replicate API key available')
-        return replicate.Client(api_token=api_key)
+        return api_key
+    
+    def _get_client(self, api_key: str):
+        return self.clients.get(api_key)
+    
+    def _prediction_input(self, prompt: str, aspect_ratio: str) -> dict:
+        enhanced_prompt = f"Professional YouTube thumbnail: {prompt}. High quality, eye-catching, vibrant colors, clear text if any."
+        logger.info(f"[Replicate] Enhanced prompt length: {len(enhanced_prompt)}")
+        return {
+            "prompt": enhanced_prompt,
+            "aspect_ratio": aspect_ratio,
+            "output_format": "png",
+            "num_outputs": 1
+        }
+    
+    def _is_throttled(self, exc: Exception) -> bool:
+        return isinstance(exc, ReplicateError) and exc.status == 429
     
-    @retry_with_backoff(max_retries=3, base_delay=1.0)
-    def generate_thumbnail(self, prompt: str, aspect_ratio: str = "16:9") -> str:
-        """Generate thumbnail using FLUX model. Returns image URL."""
+    @retry_with_backoff(max_retries=3, base_delay=0.5)
+    @circuit_breaker('replicate', AIServiceUnavailable)
+    def generate_thumbnail(self, prompt: str, aspect_ratio: str = "16:9") -> GeneratedImage:
+        """
+        Generate thumbnail using FLUX model.
+        
+        Only the output URL is returned: the bytes are fetched once, by the
+        CDN upload, and not at all when there is no CDN.
+        """
         import logging
         logger = logging.getLogger(__name__)
         
+        api_key = self._get_api_key()
+        started = time.monotonic()
         try:
             logger.info(f"[Replicate] Starting generation for prompt: {prompt[:50]}...")
-            client = self._get_client()
+            client = self._get_client(api_key)
             logger.info(f"[Replicate] Client initialized, using model: {self.FLUX_MODEL}")
             
-            enhanced_prompt = f"Professional YouTube thumbnail: {prompt}. High quality, eye-catching, vibrant colors, clear text if any."
-            logger.info(f"[Replicate] Enhanced prompt length: {len(enhanced_prompt)}")
-            
             logger.info(f"[Replicate] Calling API with aspect_ratio={aspect_ratio}...")
-            output = client.run(
-                self.FLUX_MODEL,
-                input={
-                    "prompt": enhanced_prompt,
-                    "aspect_ratio": aspect_ratio,
-                    "output_format": "png",
-                    "num_outputs": 1
-                }
+            prediction = client.models.predictions.create(
+                model=self.FLUX_MODEL, input=self._prediction_input(prompt, aspect_ratio)
             )
+            output = self._wait_for_output(prediction)
             logger.info(f"[Replicate] API response type: {type(output)}, length: {len(output) if output else 0}")
             
             if output and len(output) > 0:
+                api_key_manager.report('replicate', api_key, True, time.monotonic() - started)
                 url = str(output[0])
                 logger.info(f"[Replicate] Success! Generated URL: {url}")
-                return url
+                return GeneratedImage(url)
             
             logger.error(f"[Replicate] No image in output: {output}")
             raise AIServiceUnavailable('No image generated')
             
+        except DeadlineExceeded:
+            logger.warning(f"[Replicate] Deadline reached, prediction cancelled")
+            raise
         except Exception as e:
             logger.error(f"[Replicate] Error: {str(e)}", exc_info=True)
-            if 'rate' in str(e).lower() or 'limit' in str(e).lower():
+            api_key_manager.report('replicate', api_key, False, time.monotonic() - started)
+            if self._is_throttled(e):
                 logger.warning(f"[Replicate] Rate limit detected, rotating key...")
-                api_key_manager.rotate_key('replicate')
+                api_key_manager.mark_rate_limited('replicate', api_key)
             raise AIServiceUnavailable(f'Replicate error: {str(e)}')
     
+    def _wait_for_output(self, prediction):
+        """
+        Poll a prediction until it finishes, cancelling it if the deadline runs
+        out first or the result is no longer wanted (another provider won).
+        """
+        give_up_at = time.monotonic() + deadline.timeout(settings.REPLICATE_TIMEOUT, 'Replicate generation')
+        while prediction.status not in self.FINISHED:
+            if deadline.cancelled():
+                prediction.cancel()
+                raise DeadlineExceeded('Replicate generation no longer needed')
+            if time.monotonic() + self.POLL_INTERVAL > give_up_at:
+                prediction.cancel()
+                raise DeadlineExceeded('Replicate generation did not finish within the request deadline')
+            time.sleep(self.POLL_INTERVAL)
+            prediction.reload()
+        if prediction.status != 'succeeded':
+            raise AIServiceUnavailable(f'Replicate prediction {prediction.status}: {prediction.error}')
+        return prediction.output
+    
     def is_available(self) -> bool:
         import logging
         logger = logging.getLogger(__name__)
-        available = bool(api_key_manager.get_active_key('replicate'))
+        available = bool(api_key_manager.get_active_key('replicate')) and not get_breaker('replicate').is_open()
         logger.info(f"[Replicate] Checking availability: {available}")
         return available
 
-replicate_client = ReplicateClient()
+replicate_client = image_providers.register(ReplicateClient())
+
+
+class AsyncReplicateClient:
+    """
+    Coroutine counterpart of ReplicateClient, on the SDK's async calls.
+    
+    Shares the sync client's pooled SDK clients, key pool and circuit
+    breaker; async callers reach it through image_providers.agenerate().
+    Polling yields to the event loop, and a task cancelled because another
+    provider won the race cancels its prediction on the way out.
+    """
+    FLUX_MODEL = ReplicateClient.FLUX_MODEL
+    POLL_INTERVAL = ReplicateClient.POLL_INTERVAL
+    FINISHED = ReplicateClient.FINISHED
+    
+    async def _get_api_key(self) -> str:
+        # The limiter may sleep briefly for a refill; keep that off the loop
+        return await asyncio.to_thread(replicate_client._get_api_key)
+    
+    @retry_with_backoff(max_retries=3, base_delay=0.5)
+    @circuit_breaker('replicate', AIServiceUnavailable)
+    async def generate_thumbnail(self, prompt: str, aspect_ratio: str = "16:9") -> GeneratedImage:
+        """Generate thumbnail using FLUX model; only the output URL is returned."""
+        api_key = await self._get_api_key()
+        started = time.monotonic()
+        try:
+            logger.info(f"[Replicate] Async generation for prompt: {prompt[:50]}...")
+            client = replicate_client._get_client(api_key)
+            prediction = await client.models.predictions.async_create(
+                model=self.FLUX_MODEL, input=replicate_client._prediction_input(prompt, aspect_ratio)
+            )
+            output = await self._wait_for_output(prediction)
+            
+            if output and len(output) > 0:
+                await asyncio.to_thread(api_key_manager.report, 'replicate', api_key, True, time.monotonic() - started)
+                url = str(output[0])
+                logger.info(f"[Replicate] Success! Generated URL: {url}")
+                return GeneratedImage(url)
+            
+            logger.error(f"[Replicate] No image in output: {output}")
+            raise AIServiceUnavailable('No image generated')
+            
+        except DeadlineExceeded:
+            logger.warning(f"[Replicate] Deadline reached, prediction cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"[Replicate] Error: {str(e)}")
+            await asyncio.to_thread(api_key_manager.report, 'replicate', api_key, False, time.monotonic() - started)
+            if replicate_client._is_throttled(e):
+                logger.warning(f"[Replicate] Rate limit detected, rotating key...")
+                await asyncio.to_thread(api_key_manager.mark_rate_limited, 'replicate', api_key)
+            raise AIServiceUnavailable(f'Replicate error: {str(e)}')
+    
+    async def _wait_for_output(self, prediction):
+        """ReplicateClient._wait_for_output, cancelling the prediction if this task is cancelled."""
+        give_up_at = time.monotonic() + deadline.timeout(settings.REPLICATE_TIMEOUT, 'Replicate generation')
+        try:
+            while prediction.status not in self.FINISHED:
+                if time.monotonic() + self.POLL_INTERVAL > give_up_at:
+                    await prediction.async_cancel()
+                    raise DeadlineExceeded('Replicate generation did not finish within the request deadline')
+                await asyncio.sleep(self.POLL_INTERVAL)
+                await prediction.async_reload()
+        except asyncio.CancelledError:
+            logger.info(f"[Replicate] Result no longer needed, cancelling prediction {prediction.id}")
+            try:
+                await prediction.async_cancel()
+            except Exception as e:
+                logger.warning(f"[Replicate] Could not cancel prediction {prediction.id}: {str(e)}")
+            raise
+        if prediction.status != 'succeeded':
+            raise AIServiceUnavailable(f'Replicate prediction {prediction.status}: {prediction.error}')
+        return prediction.output
+
+async_replicate_client = AsyncReplicateClient()
@@ -1,50 +1,194 @@
+import asyncio
+import contextvars
+import logging
+import re
+import time
+import httpx
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from django.conf import settings
 from django.core.cache import cache
 from core.utils.api_key_manager import api_key_manager
+from core.utils.rate_limit import rate_limiter
 from core.utils.retry import retry_with_backoff
+from core.utils.http import get_session, get_timeout
+from core.utils.async_http import async_http, get_async_timeout
+from core.utils.quota import youtube_quota
+from core.utils.metrics import MetricCounters
+from core.utils.singleflight import coalesce
+from core.utils.swr import stale_while_revalidate, swr_owner
+from core.utils.negative_cache import get_negative, set_negative
+from core.utils.cache_keys import make_key
+from core.utils.circuit_breaker import circuit_breaker, get_breaker
 from core.exceptions import YouTubeAPIError, RateLimitExceeded
 
+logger = logging.getLogger(__name__)
+
+HASHTAG_PATTERN = re.compile(r'#[a-zA-Z0-9_]+')
+
+
+def compact_description(description: str) -> str:
+    """
+    Trim a description for caching: the leading YOUTUBE_DESCRIPTION_MAX_CHARS
+    characters plus every hashtag that appears after them. Downstream code only
+    scans descriptions for hashtags and topic mentions.
+    """
+    limit = settings.YOUTUBE_DESCRIPTION_MAX_CHARS
+    if not limit or len(description) <= limit:
+        return description
+    head, tail = description[:limit], description[limit:]
+    tags = HASHTAG_PATTERN.findall(tail)
+    return f"{head} {' '.join(tags)}" if tags else head
+
+# Per-endpoint hit / miss / revalidated / changed counts for ETag-cached calls
+youtube_cache_stats = MetricCounters()
+
+# 403 reasons that are about the key, not the resource: another key may succeed
+KEY_ERROR_REASONS = {
+    'rateLimitExceeded', 'userRateLimitExceeded', 'dailyLimitExceeded',
+    'keyInvalid', 'keyExpired', 'accessNotConfigured', 'ipRefererBlocked',
+}
+# 403 reasons that no key can get past, worth negative-caching
+RESOURCE_ERROR_REASONS = {
+    'forbidden', 'channelClosed', 'channelSuspended', 'playlistItemsNotAccessible', 'playlistForbidden',
+}
+
+
+def error_reason(response) -> str:
+    """The first error.errors[].reason in a YouTube error body, '' if there is none."""
+    try:
+        return response.json()['error']['errors'][0]['reason']
+    except (ValueError, KeyError, IndexError, TypeError):
+        return ''
+
 class YouTubeClient:
     BASE_URL = "https://www.googleapis.com/youtube/v3"
     CACHE_TIMEOUT = 300  # 5 minutes
+    ETAG_TIMEOUT = 86400  # keep bodies for revalidation long after they go stale
+    VIDEO_BATCH_SIZE = 50  # API maximum for playlistItems pages and videos?id=
+    
+    def _get_api_key(self, endpoint: str) -> str:
+        """
+        A key with capacity and daily quota budget for one call to `endpoint`,
+        charged for it. A key the ledger refuses is only skipped, not cooled
+        down: it may still have budget for cheaper calls.
+        """
+        refused = ()
+        while True:
+            key = rate_limiter.acquire_key('youtube', exclude=refused)
+            if not key:
+                if refused:
+                    raise RateLimitExceeded('YouTube API daily quota budget exhausted')
+                raise YouTubeAPIError('No YouTube API key available')
+            if youtube_quota.try_charge(key, endpoint):
+                return key
+            refused += (key,)
     
-    def _get_api_key(self) -> str:
-        key = api_key_manager.get_active_key('youtube')
-        if not key:
-            raise YouTubeAPIError('No YouTube API key available')
-        return key
+    @circuit_breaker('youtube', YouTubeAPIError)
+    def _make_request(self, endpoint: str, params: dict, etag: str = None) -> dict:
+        """Call the API. With an etag, returns None if the resource is unchanged (304)."""
+        return self._make_request_inner(endpoint, params, etag)
     
-    def _make_request(self, endpoint: str, params: dict) -> dict:
-        params['key'] = self._get_api_key()
+    def _make_request_inner(self, endpoint: str, params: dict, etag: str = None) -> dict:
+        # Key rotations retry from here, inside the one breaker call
+        # Requests that recently came back 403/404 are answered from the negative cache
+        identity = repr(sorted((k, v) for k, v in params.items() if k != 'key'))
+        negative = get_negative(f'yt_{endpoint}', identity)
+        if negative is not None:
+            raise YouTubeAPIError(negative.message, reason=negative.kind)
+        
+        api_key = self._get_api_key(endpoint)
+        
+        params['key'] = api_key
         url = f"{self.BASE_URL}/{endpoint}"
+        headers = {'If-None-Match': etag} if etag else None
         
+        started = time.monotonic()
         try:
-            response = requests.get(url, params=params, timeout=30)
+            response = get_session('youtube').get(url, params=params, headers=headers, timeout=get_timeout())
+            api_key_manager.report(
+                'youtube', api_key, response.status_code not in (403, 429) and response.status_code < 500,
+                time.monotonic() - started
+            )
+            
+            if response.status_code == 304:
+                return None
             
             if response.status_code == 403:
-                if 'quotaExceeded' in response.text:
-                    api_key_manager.rotate_key('youtube')
-                    if api_key_manager.is_exhausted('youtube'):
-                        raise RateLimitExceeded('YouTube API quota exceeded')
-                    return self._make_request(endpoint, params)
-                raise YouTubeAPIError('YouTube API access forbidden')
+                reason = error_reason(response)
+                if reason == 'quotaExceeded':
+                    youtube_quota.mark_exhausted(api_key)
+                    return self._rotate_or_raise(api_key, endpoint, params, 'YouTube API quota exceeded', etag)
+                if reason in KEY_ERROR_REASONS:
+                    return self._rotate_or_raise(api_key, endpoint, params, f'YouTube API key refused: {reason}', etag)
+                message = f'YouTube API access forbidden: {reason or "no reason given"}'
+                if reason in RESOURCE_ERROR_REASONS:
+                    set_negative(f'yt_{endpoint}', identity, 'forbidden', message)
+                    raise YouTubeAPIError(message, reason='forbidden')
+                raise YouTubeAPIError(message)
+            
+            if response.status_code == 404:
+                message = f'YouTube resource not found: {endpoint}'
+                set_negative(f'yt_{endpoint}', identity, 'not_found', message)
+                raise YouTubeAPIError(message, reason='not_found')
             
             response.raise_for_status()
             return response.json()
             
         except requests.RequestException as e:
+            api_key_manager.report('youtube', api_key, False, time.monotonic() - started)
             raise YouTubeAPIError(f'YouTube API error: {str(e)}')
     
-    @retry_with_backoff(max_retries=3, base_delay=1.0)
-    def search_videos(self, query: str, max_results: int = 10) -> list:
-        """Search for videos by query."""
-        cache_key = f'yt_search_{query}_{max_results}'
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
+    def _rotate_or_raise(self, api_key: str, endpoint: str, params: dict, message: str, etag: str = None) -> dict:
+        api_key_manager.mark_rate_limited('youtube', api_key)
+        if api_key_manager.is_exhausted('youtube'):
+            raise RateLimitExceeded(message)
+        return self._make_request_inner(endpoint, params, etag)
+    
+    def _conditional_request(self, endpoint: str, params: dict, cache_key: str, parse, timeout: int = None):
+        """
+        Fetch a resource through an ETag-aware cache.
+        
+        The parsed result is stored next to the response ETag for ETAG_TIMEOUT,
+        with a separate freshness marker for `timeout` seconds. Once the marker
+        expires the request is revalidated with If-None-Match; a 304 only
+        re-arms the marker, so the body is neither transferred nor re-parsed.
+        """
+        timeout = self.CACHE_TIMEOUT if timeout is None else timeout
+        fresh_key = f'{cache_key}:fresh'
+        etag_key = f'{cache_key}:etag'
+        
+        cached = cache.get_many([fresh_key, etag_key])
+        entry = cached.get(etag_key)
+        if entry is not None and fresh_key in cached:
+            youtube_cache_stats.incr(endpoint, 'hit')
+            return entry['value']
         
+        data = self._make_request(endpoint, params, etag=entry['etag'] if entry else None)
+        if data is None:
+            youtube_cache_stats.incr(endpoint, 'revalidated')
+            cache.set(fresh_key, True, timeout)
+            cache.touch(etag_key, self.ETAG_TIMEOUT)
+            return entry['value']
+        
+        youtube_cache_stats.incr(endpoint, 'changed' if entry else 'miss')
+        value = parse(data)
+        if data.get('etag'):
+            cache.set(etag_key, {'etag': data['etag'], 'value': value}, self.ETAG_TIMEOUT)
+            cache.set(fresh_key, True, timeout)
+        return value
+    
+    def quota_is_low(self) -> bool:
+        """True when the active key should only serve expensive calls from cache."""
+        api_key = api_key_manager.get_active_key('youtube')
+        return not api_key or youtube_quota.is_low(api_key)
+    
+    @stale_while_revalidate('yt_search', settings.YOUTUBE_SWR_SOFT_TTL, settings.YOUTUBE_SWR_MAX_STALE, settings.YOUTUBE_SWR_STALE_IF_ERROR)
+    @coalesce('yt_search')
+    @retry_with_backoff(max_retries=3, base_delay=0.5)
+    def search_videos(self, query: str, max_results: int = 10) -> list:
+        """Search for videos by query. Pass cache_only=True to never spend search quota."""
         params = {
             'part': 'snippet',
             'q': query,
@@ -59,10 +203,9 @@ class YouTubeClient:
             return []
         
         # Get statistics for videos
-        videos = self.get_video_details(video_ids)
-        cache.set(cache_key, videos, self.CACHE_TIMEOUT)
-        return videos
+        return self.get_video_details(video_ids)
     
+    @coalesce('yt_videos')
     def get_video_details(self, video_ids: list) -> list:
         """Get detailed info for videos including statistics."""
         if not video_ids:
@@ -73,7 +216,11 @@ class YouTubeClient:
             'id': ','.join(video_ids)
         }
         
-        data = self._make_request('videos', params)
+        return self._conditional_request(
+            'videos', params, make_key('etag.videos', video_ids, fold_case=False), self._parse_video_details
+        )
+    
+    def _parse_video_details(self, data: dict) -> list:
         videos = []
         
         for item in data.get('items', []):
@@ -84,7 +231,7 @@ class YouTubeClient:
             videos.append({
                 'id': item['id'],
                 'title': snippet.get('title', ''),
-                'description': snippet.get('description', ''),
+                'description': compact_description(snippet.get('description', '')),
                 'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
                 'channel_title': snippet.get('channelTitle', ''),
                 'channel_id': snippet.get('channelId', ''),
@@ -98,7 +245,16 @@ class YouTubeClient:
         return videos
     
     def get_channel_videos(self, channel_id: str, max_results: int = 50) -> list:
-        """Get videos from a channel's uploads playlist."""
+        """Get the most recent videos from a channel's uploads playlist."""
+        return list(self.iter_channel_videos(channel_id, limit=max_results))
+    
+    def iter_channel_videos(self, channel_id: str, limit: int = None, published_after: datetime = None):
+        """
+        Yield every video of a channel, newest first, following nextPageToken.
+        
+        Stops after `limit` videos or at the first upload older than
+        `published_after`, whichever comes first.
+        """
         import logging
         logger = logging.getLogger(__name__)
         
@@ -106,7 +262,108 @@ class YouTubeClient:
         channel_id = self._extract_channel_id(channel_id)
         logger.info(f"[YouTube] Getting videos for channel: {channel_id}")
         
-        # First get the uploads playlist ID
+        uploads_playlist = self._get_uploads_playlist(channel_id)
+        if not uploads_playlist:
+            logger.error(f"[YouTube] No uploads playlist found")
+            return
+        
+        yield from self.iter_playlist_videos(uploads_playlist, limit=limit, published_after=published_after)
+    
+    def resolve_channel(self, input_str: str) -> dict:
+        """Resolve a channel URL, @handle or username to its channel ID and uploads playlist ID."""
+        channel_id = self._extract_channel_id(input_str)
+        uploads_playlist = self._get_uploads_playlist(channel_id)
+        if not uploads_playlist:
+            raise YouTubeAPIError(f'No uploads playlist for channel: {channel_id}')
+        return {'channel_id': channel_id, 'uploads_playlist_id': uploads_playlist}
+    
+    def channel_lookup_key(self, input_str: str) -> str:
+        """
+        Normalize a channel reference into a stable lookup key.
+        
+        Channel IDs keep their case; handles, custom URLs and usernames are
+        case-insensitive on YouTube and are lowercased.
+        """
+        import re
+        
+        input_str = input_str.strip()
+        if input_str.startswith('UC') and len(input_str) == 24:
+            return f'id:{input_str}'
+        
+        patterns = [
+            ('id', r'youtube\.com/channel/([^/?&]+)'),
+            ('custom', r'youtube\.com/c/([^/?&]+)'),
+            ('handle', r'youtube\.com/@([^/?&]+)'),
+            ('user', r'youtube\.com/user/([^/?&]+)'),
+        ]
+        for kind, pattern in patterns:
+            match = re.search(pattern, input_str)
+            if match:
+                identifier = match.group(1)
+                return f'{kind}:{identifier if kind == "id" else identifier.lower()}'
+        
+        if input_str.startswith('@'):
+            return f'handle:{input_str[1:].lower()}'
+        return f'name:{input_str.lower()}'
+    
+    def iter_playlist_videos(self, playlist_id: str, limit: int = None, published_after: datetime = None):
+        """
+        Yield video details for a playlist in batches of VIDEO_BATCH_SIZE.
+        
+        The next playlistItems page is requested in the background while the
+        statistics for the current page are being fetched, so only one page of
+        raw API payload is held at a time.
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        # Prefetches run under the caller's context, so they honour its request deadline
+        page_future = executor.submit(contextvars.copy_context().run, self._fetch_playlist_page, playlist_id, None)
+        yielded = 0
+        pages = 0
+        
+        try:
+            while page_future is not None:
+                items, next_page_token = page_future.result()
+                pages += 1
+                
+                video_ids = []
+                reached_end = False
+                for video_id, published_at in items:
+                    if published_after and published_at and published_at < published_after:
+                        reached_end = True
+                        continue
+                    video_ids.append(video_id)
+                
+                if limit is not None and yielded + len(video_ids) >= limit:
+                    video_ids = video_ids[:limit - yielded]
+                    reached_end = True
+                
+                page_future = None
+                if next_page_token and not reached_end:
+                    page_future = executor.submit(
+                        contextvars.copy_context().run, self._fetch_playlist_page, playlist_id, next_page_token
+                    )
+                
+                for start in range(0, len(video_ids), self.VIDEO_BATCH_SIZE):
+                    for video in self.get_video_details(video_ids[start:start + self.VIDEO_BATCH_SIZE]):
+                        yielded += 1
+                        yield video
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.info(f"[YouTube] Playlist {playlist_id}: {yielded} videos from {pages} pages")
+    
+    def _get_uploads_playlist(self, channel_id: str) -> str:
+        """Look up the uploads playlist ID for a channel."""
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        negative = get_negative('yt_channel', channel_id)
+        if negative is not None:
+            logger.info(f"[YouTube] Negative cache hit for channel: {channel_id}")
+            raise YouTubeAPIError(negative.message, reason=negative.kind)
+        
         params = {
             'part': 'contentDetails',
             'id': channel_id
@@ -123,38 +380,43 @@ class YouTubeClient:
         
         if not items:
             logger.error(f"[YouTube] Channel not found: {channel_id}")
-            raise YouTubeAPIError(f'Channel not found: {channel_id}')
+            set_negative('yt_channel', channel_id, 'not_found', f'Channel not found: {channel_id}')
+            raise YouTubeAPIError(f'Channel not found: {channel_id}', reason='not_found')
         
         uploads_playlist = items[0].get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
         logger.info(f"[YouTube] Uploads playlist ID: {uploads_playlist}")
-        
-        if not uploads_playlist:
-            logger.error(f"[YouTube] No uploads playlist found")
-            return []
-        
-        # Get videos from uploads playlist
+        return uploads_playlist
+    
+    def _fetch_playlist_page(self, playlist_id: str, page_token: str = None) -> tuple:
+        """Fetch one playlistItems page. Returns ([(video_id, published_at)], next_page_token)."""
         params = {
-            'part': 'snippet',
-            'playlistId': uploads_playlist,
-            'maxResults': max_results
+            'part': 'contentDetails',
+            'playlistId': playlist_id,
+            'maxResults': self.VIDEO_BATCH_SIZE,
+            'fields': 'etag,nextPageToken,items/contentDetails(videoId,videoPublishedAt)',
         }
+        if page_token:
+            params['pageToken'] = page_token
         
-        logger.info(f"[YouTube] Fetching playlist items...")
-        data = self._make_request('playlistItems', params)
-        video_ids = [item['snippet']['resourceId']['videoId'] for item in data.get('items', [])]
-        logger.info(f"[YouTube] Found {len(video_ids)} video IDs")
+        return self._conditional_request(
+            'playlistItems', params, make_key('etag.playlist', playlist_id, page_token or '', fold_case=False),
+            self._parse_playlist_page
+        )
+    
+    def _parse_playlist_page(self, data: dict) -> tuple:
+        items = []
+        for item in data.get('items', []):
+            content = item.get('contentDetails', {})
+            published = content.get('videoPublishedAt')
+            published_at = datetime.fromisoformat(published.replace('Z', '+00:00')) if published else None
+            items.append((content['videoId'], published_at))
         
-        videos = self.get_video_details(video_ids)
-        logger.info(f"[YouTube] Retrieved details for {len(videos)} videos")
-        return videos
+        return items, data.get('nextPageToken')
     
+    @stale_while_revalidate('yt_trending', settings.YOUTUBE_SWR_SOFT_TTL, settings.YOUTUBE_SWR_MAX_STALE, settings.YOUTUBE_SWR_STALE_IF_ERROR)
+    @coalesce('yt_trending')
     def get_trending_videos(self, region_code: str = 'US', max_results: int = 20) -> list:
         """Get trending videos."""
-        cache_key = f'yt_trending_{region_code}_{max_results}'
-        cached = cache.get(cache_key)
-        if cached:
-            return cached
-        
         params = {
             'part': 'snippet,statistics',
             'chart': 'mostPopular',
@@ -162,7 +424,11 @@ class YouTubeClient:
             'maxResults': max_results
         }
         
-        data = self._make_request('videos', params)
+        return self._conditional_request(
+            'videos', params, make_key('etag.trending', region_code, max_results), self._parse_trending
+        )
+    
+    def _parse_trending(self, data: dict) -> list:
         videos = []
         
         for item in data.get('items', []):
@@ -172,14 +438,13 @@ class YouTubeClient:
             videos.append({
                 'id': item['id'],
                 'title': snippet.get('title', ''),
-                'description': snippet.get('description', ''),
+                'description': compact_description(snippet.get('description', '')),
                 'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
                 'channel_title': snippet.get('channelTitle', ''),
                 'views': int(stats.get('viewCount', 0)),
                 'likes': int(stats.get('likeCount', 0)),
             })
         
-        cache.set(cache_key, videos, self.CACHE_TIMEOUT)
         return videos
     
     def _extract_channel_id(self, input_str: str) -> str:
@@ -238,6 +503,10 @@ class YouTubeClient:
         import logging
         logger = logging.getLogger(__name__)
         
+        if get_negative('yt_resolve', username.lower()) is not None:
+            logger.info(f"[YouTube] Negative cache hit for: {username}")
+            return None
+        
         try:
             logger.info(f"[YouTube] Searching for channel: {username}")
             params = {
@@ -256,12 +525,332 @@ class YouTubeClient:
                 return channel_id
             
             logger.warning(f"[YouTube] No channel found for: {username}")
+            set_negative('yt_resolve', username.lower(), 'not_found', f'No channel found for: {username}')
+            return None
+        except YouTubeAPIError as e:
+            logger.error(f"[YouTube] Error resolving channel: {str(e)}")
+            if e.reason:
+                set_negative('yt_resolve', username.lower(), e.reason, str(e))
             return None
         except Exception as e:
             logger.error(f"[YouTube] Error resolving channel: {str(e)}")
             return None
     
     def is_available(self) -> bool:
-        return bool(api_key_manager.get_active_key('youtube'))
+        return bool(api_key_manager.get_active_key('youtube')) and not get_breaker('youtube').is_open()
+
+youtube_client = swr_owner(YouTubeClient())
+
+
+class AsyncYouTubeClient:
+    """
+    Coroutine counterpart of YouTubeClient, for async views.
+    
+    Shares the sync client's key pool, quota ledger, negative cache, ETag
+    cache and SWR entries, so the two can serve the same endpoint side by
+    side while views migrate. Requests go through the shared async HTTP
+    client; cache and ledger round-trips run off the event loop.
+    """
+    BASE_URL = YouTubeClient.BASE_URL
+    CACHE_TIMEOUT = YouTubeClient.CACHE_TIMEOUT
+    ETAG_TIMEOUT = YouTubeClient.ETAG_TIMEOUT
+    VIDEO_BATCH_SIZE = YouTubeClient.VIDEO_BATCH_SIZE
+    
+    # Parsing and key normalization are shared with the sync client
+    _parse_video_details = YouTubeClient._parse_video_details
+    _parse_trending = YouTubeClient._parse_trending
+    _parse_playlist_page = YouTubeClient._parse_playlist_page
+    channel_lookup_key = YouTubeClient.channel_lookup_key
+    
+    async def quota_is_low(self) -> bool:
+        return await asyncio.to_thread(youtube_client.quota_is_low)
+    
+    async def is_available(self) -> bool:
+        return await asyncio.to_thread(youtube_client.is_available)
+    
+    async def _get_api_key(self, endpoint: str) -> str:
+        # The limiter may sleep briefly for a refill; keep that off the loop
+        return await asyncio.to_thread(youtube_client._get_api_key, endpoint)
+    
+    @circuit_breaker('youtube', YouTubeAPIError)
+    async def _make_request(self, endpoint: str, params: dict, etag: str = None) -> dict:
+        """Call the API. With an etag, returns None if the resource is unchanged (304)."""
+        return await self._make_request_inner(endpoint, params, etag)
+    
+    async def _make_request_inner(self, endpoint: str, params: dict, etag: str = None) -> dict:
+        # Key rotations retry from here, inside the one breaker call
+        identity = repr(sorted((k, v) for k, v in params.items() if k != 'key'))
+        negative = await asyncio.to_thread(get_negative, f'yt_{endpoint}', identity)
+        if negative is not None:
+            raise YouTubeAPIError(negative.message, reason=negative.kind)
+        
+        api_key = await self._get_api_key(endpoint)
+        
+        params['key'] = api_key
+        url = f"{self.BASE_URL}/{endpoint}"
+        headers = {'If-None-Match': etag} if etag else None
+        
+        started = time.monotonic()
+        try:
+            response = await async_http.request('GET', url, params=params, headers=headers, timeout=get_async_timeout())
+            await asyncio.to_thread(
+                api_key_manager.report,
+                'youtube', api_key, response.status_code not in (403, 429) and response.status_code < 500,
+                time.monotonic() - started
+            )
+            
+            if response.status_code == 304:
+                return None
+            
+            if response.status_code == 403:
+                reason = error_reason(response)
+                if reason == 'quotaExceeded':
+                    await asyncio.to_thread(youtube_quota.mark_exhausted, api_key)
+                    return await self._rotate_or_raise(api_key, endpoint, params, 'YouTube API quota exceeded', etag)
+                if reason in KEY_ERROR_REASONS:
+                    return await self._rotate_or_raise(api_key, endpoint, params, f'YouTube API key refused: {reason}', etag)
+                message = f'YouTube API access forbidden: {reason or "no reason given"}'
+                if reason in RESOURCE_ERROR_REASONS:
+                    await asyncio.to_thread(set_negative, f'yt_{endpoint}', identity, 'forbidden', message)
+                    raise YouTubeAPIError(message, reason='forbidden')
+                raise YouTubeAPIError(message)
+            
+            if response.status_code == 404:
+                message = f'YouTube resource not found: {endpoint}'
+                await asyncio.to_thread(set_negative, f'yt_{endpoint}', identity, 'not_found', message)
+                raise YouTubeAPIError(message, reason='not_found')
+            
+            response.raise_for_status()
+            return response.json()
+            
+        except httpx.HTTPError as e:
+            await asyncio.to_thread(api_key_manager.report, 'youtube', api_key, False, time.monotonic() - started)
+            raise YouTubeAPIError(f'YouTube API error: {str(e)}')
+    
+    async def _rotate_or_raise(self, api_key: str, endpoint: str, params: dict, message: str, etag: str = None) -> dict:
+        await asyncio.to_thread(api_key_manager.mark_rate_limited, 'youtube', api_key)
+        if await asyncio.to_thread(api_key_manager.is_exhausted, 'youtube'):
+            raise RateLimitExceeded(message)
+        return await self._make_request_inner(endpoint, params, etag)
+    
+    async def _conditional_request(self, endpoint: str, params: dict, cache_key: str, parse, timeout: int = None):
+        """YouTubeClient._conditional_request, on the same cache entries."""
+        timeout = self.CACHE_TIMEOUT if timeout is None else timeout
+        fresh_key = f'{cache_key}:fresh'
+        etag_key = f'{cache_key}:etag'
+        
+        cached = await asyncio.to_thread(cache.get_many, [fresh_key, etag_key])
+        entry = cached.get(etag_key)
+        if entry is not None and fresh_key in cached:
+            youtube_cache_stats.incr(endpoint, 'hit')
+            return entry['value']
+        
+        data = await self._make_request(endpoint, params, etag=entry['etag'] if entry else None)
+        if data is None:
+            youtube_cache_stats.incr(endpoint, 'revalidated')
+            await asyncio.to_thread(cache.set, fresh_key, True, timeout)
+            await asyncio.to_thread(cache.touch, etag_key, self.ETAG_TIMEOUT)
+            return entry['value']
+        
+        youtube_cache_stats.incr(endpoint, 'changed' if entry else 'miss')
+        value = parse(data)
+        if data.get('etag'):
+            await asyncio.to_thread(cache.set, etag_key, {'etag': data['etag'], 'value': value}, self.ETAG_TIMEOUT)
+            await asyncio.to_thread(cache.set, fresh_key, True, timeout)
+        return value
+    
+    @stale_while_revalidate('yt_search', settings.YOUTUBE_SWR_SOFT_TTL, settings.YOUTUBE_SWR_MAX_STALE, settings.YOUTUBE_SWR_STALE_IF_ERROR)
+    @coalesce('yt_search')
+    @retry_with_backoff(max_retries=3, base_delay=0.5)
+    async def search_videos(self, query: str, max_results: int = 10) -> list:
+        """Search for videos by query. Pass cache_only=True to never spend search quota."""
+        params = {
+            'part': 'snippet',
+            'q': query,
+            'type': 'video',
+            'maxResults': max_results
+        }
+        
+        data = await self._make_request('search', params)
+        video_ids = [item['id']['videoId'] for item in data.get('items', [])]
+        
+        if not video_ids:
+            return []
+        
+        return await self.get_video_details(video_ids)
+    
+    @coalesce('yt_videos')
+    async def get_video_details(self, video_ids: list) -> list:
+        """Get detailed info for videos including statistics."""
+        if not video_ids:
+            return []
+        
+        params = {
+            'part': 'snippet,statistics,contentDetails',
+            'id': ','.join(video_ids)
+        }
+        
+        return await self._conditional_request(
+            'videos', params, make_key('etag.videos', video_ids, fold_case=False), self._parse_video_details
+        )
+    
+    @stale_while_revalidate('yt_trending', settings.YOUTUBE_SWR_SOFT_TTL, settings.YOUTUBE_SWR_MAX_STALE, settings.YOUTUBE_SWR_STALE_IF_ERROR)
+    @coalesce('yt_trending')
+    async def get_trending_videos(self, region_code: str = 'US', max_results: int = 20) -> list:
+        """Get trending videos."""
+        params = {
+            'part': 'snippet,statistics',
+            'chart': 'mostPopular',
+            'regionCode': region_code,
+            'maxResults': max_results
+        }
+        
+        return await self._conditional_request(
+            'videos', params, make_key('etag.trending', region_code, max_results), self._parse_trending
+        )
+    
+    async def resolve_channel(self, input_str: str) -> dict:
+        """Resolve a channel URL, @handle or username to its channel ID and uploads playlist ID."""
+        channel_id = await self._extract_channel_id(input_str)
+        uploads_playlist = await self._get_uploads_playlist(channel_id)
+        if not uploads_playlist:
+            raise YouTubeAPIError(f'No uploads playlist for channel: {channel_id}')
+        return {'channel_id': channel_id, 'uploads_playlist_id': uploads_playlist}
+    
+    async def _extract_channel_id(self, input_str: str) -> str:
+        """YouTubeClient._extract_channel_id: the same patterns, resolved in the same order."""
+        if input_str.startswith('UC') and len(input_str) == 24:
+            return input_str
+        
+        patterns = [
+            r'youtube\.com/channel/([^/?&]+)',
+            r'youtube\.com/c/([^/?&]+)',
+            r'youtube\.com/@([^/?&]+)',
+            r'youtube\.com/user/([^/?&]+)',
+        ]
+        for pattern in patterns:
+            match = re.search(pattern, input_str)
+            if match:
+                identifier = match.group(1)
+                if not identifier.startswith('UC'):
+                    resolved = await self._resolve_channel_id(identifier)
+                    if resolved:
+                        return resolved
+                return identifier
+        
+        if input_str.startswith('@'):
+            resolved = await self._resolve_channel_id(input_str[1:])
+            if resolved:
+                return resolved
+        
+        resolved = await self._resolve_channel_id(input_str)
+        if resolved:
+            return resolved
+        
+        logger.warning(f"[YouTube] Could not extract channel ID, using as-is: {input_str}")
+        return input_str
+    
+    async def _resolve_channel_id(self, username: str) -> str:
+        """Resolve username/handle to channel ID using search, through the shared negative cache."""
+        if await asyncio.to_thread(get_negative, 'yt_resolve', username.lower()) is not None:
+            logger.info(f"[YouTube] Negative cache hit for: {username}")
+            return None
+        
+        try:
+            data = await self._make_request('search', {
+                'part': 'snippet',
+                'q': username,
+                'type': 'channel',
+                'maxResults': 1
+            })
+            items = data.get('items', [])
+            if items:
+                channel_id = items[0]['snippet']['channelId']
+                logger.info(f"[YouTube] Resolved {username} to channel ID: {channel_id}")
+                return channel_id
+            
+            logger.warning(f"[YouTube] No channel found for: {username}")
+            await asyncio.to_thread(set_negative, 'yt_resolve', username.lower(), 'not_found', f'No channel found for: {username}')
+            return None
+        except YouTubeAPIError as e:
+            logger.error(f"[YouTube] Error resolving channel: {str(e)}")
+            if e.reason:
+                await asyncio.to_thread(set_negative, 'yt_resolve', username.lower(), e.reason, str(e))
+            return None
+        except Exception as e:
+            logger.error(f"[YouTube] Error resolving channel: {str(e)}")
+            return None
+    
+    async def _get_uploads_playlist(self, channel_id: str) -> str:
+        """Look up the uploads playlist ID for a channel."""
+        negative = await asyncio.to_thread(get_negative, 'yt_channel', channel_id)
+        if negative is not None:
+            logger.info(f"[YouTube] Negative cache hit for channel: {channel_id}")
+            raise YouTubeAPIError(negative.message, reason=negative.kind)
+        
+        data = await self._make_request('channels', {'part': 'contentDetails', 'id': channel_id})
+        items = data.get('items', [])
+        if not items:
+            logger.error(f"[YouTube] Channel not found: {channel_id}")
+            await asyncio.to_thread(set_negative, 'yt_channel', channel_id, 'not_found', f'Channel not found: {channel_id}')
+            raise YouTubeAPIError(f'Channel not found: {channel_id}', reason='not_found')
+        
+        return items[0].get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+    
+    async def iter_playlist_videos(self, playlist_id: str, limit: int = None, published_after: datetime = None):
+        """
+        YouTubeClient.iter_playlist_videos as an async generator: the next
+        playlistItems page is fetched in a task while the current page's
+        statistics are requested.
+        """
+        page_task = asyncio.ensure_future(self._fetch_playlist_page(playlist_id, None))
+        yielded = 0
+        pages = 0
+        
+        try:
+            while page_task is not None:
+                items, next_page_token = await page_task
+                pages += 1
+                
+                video_ids = []
+                reached_end = False
+                for video_id, published_at in items:
+                    if published_after and published_at and published_at < published_after:
+                        reached_end = True
+                        continue
+                    video_ids.append(video_id)
+                
+                if limit is not None and yielded + len(video_ids) >= limit:
+                    video_ids = video_ids[:limit - yielded]
+                    reached_end = True
+                
+                page_task = None
+                if next_page_token and not reached_end:
+                    page_task = asyncio.ensure_future(self._fetch_playlist_page(playlist_id, next_page_token))
+                
+                for start in range(0, len(video_ids), self.VIDEO_BATCH_SIZE):
+                    for video in await self.get_video_details(video_ids[start:start + self.VIDEO_BATCH_SIZE]):
+                        yielded += 1
+                        yield video
+        finally:
+            if page_task is not None:
+                page_task.cancel()
+            logger.info(f"[YouTube] Playlist {playlist_id}: {yielded} videos from {pages} pages")
+    
+    async def _fetch_playlist_page(self, playlist_id: str, page_token: str = None) -> tuple:
+        """Fetch one playlistItems page. Returns ([(video_id, published_at)], next_page_token)."""
+        params = {
+            'part': 'contentDetails',
+            'playlistId': playlist_id,
+            'maxResults': self.VIDEO_BATCH_SIZE,
+            'fields': 'etag,nextPageToken,items/contentDetails(videoId,videoPublishedAt)',
+        }
+        if page_token:
+            params['pageToken'] = page_token
+        
+        return await self._conditional_request(
+            'playlistItems', params, make_key('etag.playlist', playlist_id, page_token or '', fold_case=False),
+            self._parse_playlist_page
+        )
 
-youtube_client = YouTubeClient()
+async_youtube_client = AsyncYouTubeClient()
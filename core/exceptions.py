@@ -9,9 +9,15 @@ class AIServiceUnavailable(InsightStreamException):
         super().__init__(message, 'AI_SERVICE_UNAVAILABLE')
 
 class RateLimitExceeded(InsightStreamException):
-    def __init__(self, message: str = 'Rate limit exceeded'):
+    def __init__(self, message: str = 'Rate limit exceeded', retry_after: float = None):
+        self.retry_after = retry_after
         super().__init__(message, 'RATE_LIMITED')
 
 class YouTubeAPIError(InsightStreamException):
-    def __init__(self, message: str = 'YouTube API error'):
+    def __init__(self, message: str = 'YouTube API error', reason: str = None):
+        self.reason = reason
         super().__init__(message, 'YOUTUBE_API_ERROR')
+
+class DeadlineExceeded(InsightStreamException):
+    def __init__(self, message: str = 'Request deadline exceeded'):
+        super().__init__(message, 'DEADLINE_EXCEEDED')
@@ -0,0 +1,91 @@
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+from core.exceptions import DeadlineExceeded
+from core.utils.deadline import deadline
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineMiddleware:
+    """
+    Give every request a deadline that services and clients size their work to.
+
+    The budget comes from the X-Request-Timeout header (seconds, capped at
+    REQUEST_DEADLINE_MAX), else the longest matching REQUEST_DEADLINES path
+    prefix, else REQUEST_DEADLINE_DEFAULT. A DeadlineExceeded that escapes the
+    view is answered with 504. Runs natively under both WSGI and ASGI.
+    """
+    HEADER = 'HTTP_X_REQUEST_TIMEOUT'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _budget(self, request) -> float:
+        header = request.META.get(self.HEADER)
+        if header:
+            try:
+                return max(1.0, min(float(header), settings.REQUEST_DEADLINE_MAX))
+            except ValueError:
+                pass
+        matches = [prefix for prefix in settings.REQUEST_DEADLINES if request.path.startswith(prefix)]
+        if matches:
+            return settings.REQUEST_DEADLINES[max(matches, key=len)]
+        return settings.REQUEST_DEADLINE_DEFAULT
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with deadline(self._budget(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with deadline(self._budget(request)):
+            return await self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DeadlineExceeded):
+            logger.warning(f"[Deadline] {request.path}: {exception.message}")
+            return JsonResponse({
+                'error': {
+                    'code': exception.code,
+                    'message': exception.message,
+                    'details': {}
+                }
+            }, status=504)
+        return None
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, usable natively under ASGI.
+
+    WhiteNoiseMiddleware is sync-only, so under ASGI Django would run every
+    request (static or not) through a worker thread that waits for the async
+    view. File lookup is an in-memory dict hit, so it is done inline and only
+    non-static requests are awaited.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self.find_file(request.path_info) if self.autorefresh else self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+@shared_task(ignore_result=True)
+def refresh_swr_entry(namespace: str, args: list, kwargs: dict) -> None:
+    """Background refresh for a stale-while-revalidate cache entry."""
+    import core.clients  # noqa: F401  registers the SWR namespaces in this worker
+    from core.utils.swr import refresh
+    refresh(namespace, tuple(args), kwargs)
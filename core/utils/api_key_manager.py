@@ -1,48 +1,251 @@
 from django.conf import settings
-from django.core.cache import cache
+from core.utils.cache_keys import make_key
+from core.utils.redis_client import get_redis
+import hashlib
+import logging
+import threading
 import time
 
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the rolling error-rate / latency averages
+EWMA_ALPHA = 0.2
+# Idle pools are dropped after a day
+POOL_TTL = 86400
+
+
+def _decode(raw: dict) -> dict:
+    return {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in raw.items()
+    }
+
+
+class _LocalPoolStore:
+    """Pool state for a single process, used when the cache is not Redis."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def read(self, key: str) -> dict:
+        with self._lock:
+            return dict(self._pools.get(key, {}))
+
+    def update(self, key: str, fn):
+        with self._lock:
+            state = self._pools.setdefault(key, {})
+            changes, result = fn(dict(state))
+            state.update({k: str(v) for k, v in changes.items()})
+            return result
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pools.pop(key, None)
+
+
+class _RedisPoolStore:
+    """Pool state in one Redis hash per service, updated in WATCH/MULTI transactions."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def read(self, key: str) -> dict:
+        return _decode(self.client.hgetall(key))
+
+    def update(self, key: str, fn):
+        from redis.exceptions import WatchError
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    changes, result = fn(_decode(pipe.hgetall(key)))
+                    pipe.multi()
+                    if changes:
+                        pipe.hset(key, mapping=changes)
+                        pipe.expire(key, POOL_TTL)
+                    pipe.execute()
+                    return result
+                except WatchError:
+                    continue  # another worker changed the pool; re-read and retry
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+
 class APIKeyManager:
+    """
+    Key pools for Gemini, Replicate and YouTube, shared by every worker.
+
+    Pool state lives in Redis (in-process for locmem): the active key, and per
+    key a cooldown deadline, last-throttle time, consecutive throttle count and
+    rolling error-rate / latency averages. All workers use the same active key;
+    when it is throttled it cools down (exponentially longer on repeats) and the
+    healthiest available key takes over, ties going to the least recently
+    throttled. Keys are identified by fingerprint, never stored in Redis.
+    """
+
     def __init__(self):
         self.keys = {
             'gemini': settings.GEMINI_API_KEYS,
             'replicate': [settings.REPLICATE_API_TOKEN] if settings.REPLICATE_API_TOKEN else [],
             'youtube': [settings.YOUTUBE_API_KEY] if settings.YOUTUBE_API_KEY else [],
         }
-        self.current_index = {}
-    
+        self._local_store = _LocalPoolStore()
+
+    def _store(self):
+        client = get_redis()
+        return _RedisPoolStore(client) if client is not None else self._local_store
+
+    def _pool_key(self, service: str) -> str:
+        return make_key(f'keys.{service}', 'pool')
+
+    def _fingerprint(self, api_key: str) -> str:
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+    def _by_fingerprint(self, service: str) -> dict:
+        return {self._fingerprint(key): key for key in self.keys.get(service, [])}
+
+    def _field(self, state: dict, fp: str, name: str) -> float:
+        return float(state.get(f'{fp}:{name}', 0))
+
+    def _is_cooling(self, state: dict, fp: str, now: float) -> bool:
+        return self._field(state, fp, 'cooldown_until') > now
+
+    def _health(self, state: dict, fp: str) -> float:
+        return (1 - self._field(state, fp, 'errors')) / (1 + self._field(state, fp, 'latency_ms') / 1000)
+
+    def _select(self, fingerprints, state: dict, now: float) -> str:
+        available = [fp for fp in fingerprints if not self._is_cooling(state, fp, now)]
+        if not available:
+            # Everything is cooling down: use the key that recovers first
+            return min(fingerprints, key=lambda fp: self._field(state, fp, 'cooldown_until'))
+        return max(available, key=lambda fp: (self._health(state, fp), -self._field(state, fp, 'throttled_at')))
+
     def get_active_key(self, service: str) -> str:
-        keys = self.keys.get(service, [])
-        if not keys:
+        by_fp = self._by_fingerprint(service)
+        if not by_fp:
             return ''
-        idx = self.current_index.get(service, 0)
-        return keys[idx % len(keys)]
-    
+        store, pool = self._store(), self._pool_key(service)
+        now = time.time()
+
+        state = store.read(pool)
+        active = state.get('active')
+        if active in by_fp and not self._is_cooling(state, active, now):
+            return by_fp[active]
+
+        def activate(state):
+            active = state.get('active')
+            if active in by_fp and not self._is_cooling(state, active, now):
+                return {}, active  # another worker already picked one
+            chosen = self._select(list(by_fp), state, now)
+            return {'active': chosen}, chosen
+
+        return by_fp[store.update(pool, activate)]
+
+    def candidates(self, service: str) -> list:
+        """Keys worth trying right now: the active key first, then the others that are not cooling down, healthiest first."""
+        active = self.get_active_key(service)
+        if not active:
+            return []
+        by_fp = self._by_fingerprint(service)
+        state = self._store().read(self._pool_key(service))
+        now = time.time()
+        others = [
+            fp for fp in by_fp
+            if by_fp[fp] != active and not self._is_cooling(state, fp, now)
+        ]
+        others.sort(key=lambda fp: self._health(state, fp), reverse=True)
+        return [active] + [by_fp[fp] for fp in others]
+
     def rotate_key(self, service: str) -> str:
-        keys = self.keys.get(service, [])
-        if not keys:
+        """Throttle the active key and return the one that replaces it."""
+        current = self.get_active_key(service)
+        if not current:
             return ''
-        current = self.current_index.get(service, 0)
-        self.current_index[service] = (current + 1) % len(keys)
-        cache.set(f'rate_limited_{service}_{current}', True, timeout=60)
+        self.mark_rate_limited(service, current)
         return self.get_active_key(service)
-    
-    def mark_rate_limited(self, service: str, key: str) -> None:
-        cache.set(f'rate_limited_{service}_{key}', True, timeout=60)
-    
+
+    def mark_rate_limited(self, service: str, key: str, retry_after: float = None) -> None:
+        """Cool a key down; if it was the active key, switch every worker to the healthiest other key."""
+        by_fp = self._by_fingerprint(service)
+        fp = self._fingerprint(key)
+        if fp not in by_fp:
+            return
+        now = time.time()
+
+        def throttle(state):
+            throttles = int(self._field(state, fp, 'throttles')) + 1
+            cooldown = retry_after or min(
+                settings.API_KEY_COOLDOWN_SECONDS * 2 ** (throttles - 1),
+                settings.API_KEY_MAX_COOLDOWN_SECONDS,
+            )
+            changes = {
+                f'{fp}:cooldown_until': now + cooldown,
+                f'{fp}:throttled_at': now,
+                f'{fp}:throttles': throttles,
+            }
+            if state.get('active', fp) == fp:
+                changes['active'] = self._select(list(by_fp), {**state, **changes}, now)
+            return changes, cooldown
+
+        cooldown = self._store().update(self._pool_key(service), throttle)
+        logger.warning(f"[APIKeys] {service} key {fp} throttled, cooling down for {cooldown:.0f}s")
+
+    def report(self, service: str, key: str, success: bool, latency: float = None) -> None:
+        """Feed one call's outcome (and latency in seconds) into the key's rolling health."""
+        fp = self._fingerprint(key)
+        if fp not in self._by_fingerprint(service):
+            return
+
+        def record(state):
+            calls = int(self._field(state, fp, 'calls'))
+            errors = self._field(state, fp, 'errors')
+            changes = {
+                f'{fp}:calls': calls + 1,
+                f'{fp}:errors': errors + EWMA_ALPHA * ((0.0 if success else 1.0) - errors),
+            }
+            if latency is not None:
+                latency_ms = latency * 1000
+                previous = self._field(state, fp, 'latency_ms')
+                changes[f'{fp}:latency_ms'] = latency_ms if not calls else previous + EWMA_ALPHA * (latency_ms - previous)
+            if success:
+                changes[f'{fp}:throttles'] = 0
+            return changes, None
+
+        self._store().update(self._pool_key(service), record)
+
     def is_exhausted(self, service: str) -> bool:
-        keys = self.keys.get(service, [])
-        if not keys:
+        by_fp = self._by_fingerprint(service)
+        if not by_fp:
             return True
-        # Check if all keys are rate limited
-        rate_limited_count = sum(1 for i in range(len(keys)) if cache.get(f'rate_limited_{service}_{i}'))
-        return rate_limited_count >= len(keys)
-    
+        # Every key cooling down, from a single read of the pool
+        state = self._store().read(self._pool_key(service))
+        now = time.time()
+        return all(self._is_cooling(state, fp, now) for fp in by_fp)
+
     def reset_rate_limits(self, service: str) -> None:
         """Reset rate limits for a service (for testing/debugging)"""
-        keys = self.keys.get(service, [])
-        for i in range(len(keys)):
-            cache.delete(f'rate_limited_{service}_{i}')
-        self.current_index[service] = 0
+        self._store().delete(self._pool_key(service))
+
+    def snapshot(self, service: str) -> dict:
+        state = self._store().read(self._pool_key(service))
+        now = time.time()
+        return {
+            'active': state.get('active'),
+            'keys': [
+                {
+                    'key': fp,
+                    'cooldown_remaining': max(0, round(self._field(state, fp, 'cooldown_until') - now, 1)),
+                    'throttles': int(self._field(state, fp, 'throttles')),
+                    'calls': int(self._field(state, fp, 'calls')),
+                    'error_rate': round(self._field(state, fp, 'errors'), 3),
+                    'latency_ms': round(self._field(state, fp, 'latency_ms'), 1),
+                    'health': round(self._health(state, fp), 3),
+                }
+                for fp in self._by_fingerprint(service)
+            ],
+        }
 
 api_key_manager = APIKeyManager()
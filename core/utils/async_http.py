@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager
+import httpx
+from django.conf import settings
+from core.utils.http import USER_AGENT, get_timeout
+from core.utils.metrics import MetricCounters
+
+# Per-host requests / queued counts (queued: had to wait for the host's semaphore)
+async_http_stats = MetricCounters()
+
+
+class _LoopState:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.semaphores = {}
+
+
+class AsyncHTTPManager:
+    """
+    One keep-alive httpx.AsyncClient per event loop, with per-host
+    concurrency limits.
+
+    The async counterpart of SessionManager. Clients and semaphores belong to
+    the loop that created them, so the ASGI server's loop (or a short-lived
+    one under async_to_sync) each get their own; state is dropped after a
+    fork. At most ASYNC_HTTP_HOST_LIMITS[host] (default
+    ASYNC_HTTP_PER_HOST_LIMIT) requests are in flight to any one host, so a
+    burst of coroutines queues here instead of overrunning an upstream.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loops = weakref.WeakKeyDictionary()
+        self._pid = os.getpid()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_POOL_MAXSIZE,
+            ),
+            headers={
+                'Accept-Encoding': 'gzip, deflate',
+                'User-Agent': USER_AGENT,
+            },
+        )
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._loops = weakref.WeakKeyDictionary()
+                self._pid = os.getpid()
+            state = self._loops.get(loop)
+            if state is None:
+                state = self._loops[loop] = _LoopState(self._build_client())
+            return state
+
+    def _semaphore(self, state: _LoopState, host: str) -> asyncio.Semaphore:
+        semaphore = state.semaphores.get(host)
+        if semaphore is None:
+            limit = settings.ASYNC_HTTP_HOST_LIMITS.get(host, settings.ASYNC_HTTP_PER_HOST_LIMIT)
+            semaphore = state.semaphores[host] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        state = self._state()
+        host = httpx.URL(url).host
+        semaphore = self._semaphore(state, host)
+        if semaphore.locked():
+            async_http_stats.incr(host, 'queued')
+        async with semaphore:
+            async_http_stats.incr(host, 'requests')
+            return await state.client.request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        """request() with the body left unread, for responses too large to hold at once."""
+        state = self._state()
+        host = httpx.URL(url).host
+        semaphore = self._semaphore(state, host)
+        if semaphore.locked():
+            async_http_stats.incr(host, 'queued')
+        async with semaphore:
+            async_http_stats.incr(host, 'requests')
+            async with state.client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def aclose(self) -> None:
+        """Close the current loop's client (ASGI lifespan shutdown)."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.pop(loop, None)
+        if state is not None:
+            await state.client.aclose()
+
+
+async_http = AsyncHTTPManager()
+
+
+def get_async_timeout(read_timeout: float = None) -> httpx.Timeout:
+    """get_timeout() as an httpx.Timeout: shortened to the request deadline, raising once it has passed."""
+    connect, read = get_timeout(read_timeout)
+    return httpx.Timeout(read, connect=connect)
@@ -0,0 +1,76 @@
+import hashlib
+import threading
+import time
+import unicodedata
+from django.conf import settings
+from django.core.cache import cache
+
+# Bump CACHE_SCHEMA_VERSION in settings when the shape of cached values changes;
+# every key then moves to a fresh keyspace and old entries simply expire.
+PREFIX = 'is'
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def normalize(value, fold_case: bool = True) -> str:
+    """
+    Canonical text form of a key part.
+
+    Strings are NFKC-normalized, whitespace-collapsed and (by default)
+    case-folded, so 'Python  Tips' and 'python tips' share an entry. Pass
+    fold_case=False for case-sensitive identifiers such as channel IDs.
+    """
+    if isinstance(value, str):
+        text = ' '.join(unicodedata.normalize('NFKC', value).split())
+        return text.casefold() if fold_case else text
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(normalize(v, fold_case) for v in value) + ']'
+    if isinstance(value, dict):
+        return '{' + ','.join(f'{k}={normalize(v, fold_case)}' for k, v in sorted(value.items())) + '}'
+    return repr(value)
+
+
+def _version_key(namespace: str) -> str:
+    return f'{PREFIX}:v{settings.CACHE_SCHEMA_VERSION}:nsver:{namespace}'
+
+
+def namespace_version(namespace: str) -> int:
+    """
+    Current generation of a namespace.
+
+    Memoized per worker for CACHE_NAMESPACE_VERSION_TTL seconds, so an
+    invalidation reaches other workers within that window without adding a
+    cache round-trip to every key lookup.
+    """
+    now = time.monotonic()
+    with _versions_lock:
+        memo = _versions.get(namespace)
+        if memo and memo[1] > now:
+            return memo[0]
+
+    version = cache.get(_version_key(namespace), 1)
+    with _versions_lock:
+        _versions[namespace] = (version, now + settings.CACHE_NAMESPACE_VERSION_TTL)
+    return version
+
+
+def invalidate_namespace(namespace: str) -> int:
+    """Orphan every key in a namespace by bumping its generation. Returns the new generation."""
+    key = _version_key(namespace)
+    cache.add(key, 1, None)
+    version = cache.incr(key)
+    with _versions_lock:
+        _versions[namespace] = (version, time.monotonic() + settings.CACHE_NAMESPACE_VERSION_TTL)
+    return version
+
+
+def make_key(namespace: str, *parts, fold_case: bool = True) -> str:
+    """
+    Build a bounded, versioned cache key: is:v<schema>:<namespace>:<generation>:<sha1>.
+
+    Parts may contain arbitrary user text; they are normalized and hashed, so
+    keys never contain spaces or unicode and never exceed a fixed length.
+    """
+    digest = hashlib.sha1(normalize(list(parts), fold_case).encode('utf-8')).hexdigest()
+    return f'{PREFIX}:v{settings.CACHE_SCHEMA_VERSION}:{namespace}:{namespace_version(namespace)}:{digest}'
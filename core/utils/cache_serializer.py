@@ -0,0 +1,112 @@
+import pickle
+import time
+import zlib
+from django.conf import settings
+from core.utils.metrics import MetricCounters
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is in requirements.txt
+    msgpack = None
+
+# Per-format entries / raw_bytes / stored_bytes / encode_us / decode_us counts
+cache_serializer_stats = MetricCounters()
+
+# One header byte per payload. None of these can start a raw integer, and
+# pickle protocol 2+ starts with 0x80, so values written by Django's default
+# RedisSerializer stay readable during a rollout.
+MSGPACK = b'\x01'
+MSGPACK_ZLIB = b'\x02'
+PICKLE = b'\x03'
+PICKLE_ZLIB = b'\x04'
+
+_FORMATS = {
+    MSGPACK[0]: ('msgpack', False),
+    MSGPACK_ZLIB[0]: ('msgpack', True),
+    PICKLE[0]: ('pickle', False),
+    PICKLE_ZLIB[0]: ('pickle', True),
+}
+
+
+def _reject(obj):
+    # With strict_types, tuples, subclasses and arbitrary objects land here;
+    # they go to pickle so cached values round-trip with their exact types.
+    raise TypeError(f'{type(obj).__name__} is not msgpack-native')
+
+
+class CompactSerializer:
+    """
+    Redis cache serializer: msgpack for plain JSON-like values, pickle for
+    everything else, zlib above CACHE_COMPRESS_MIN_BYTES.
+
+    Configured through CACHES['default']['OPTIONS']['serializer']. Integers are
+    stored raw, as in Django's RedisSerializer, so incr()/decr() stay atomic.
+    """
+
+    def __init__(self, protocol=None):
+        self.protocol = pickle.HIGHEST_PROTOCOL if protocol is None else protocol
+
+    def dumps(self, obj):
+        if type(obj) is int:
+            return obj
+
+        started = time.perf_counter()
+        header, payload = self._encode(obj)
+        label = 'msgpack' if header == MSGPACK else 'pickle'
+        raw_size = len(payload)
+
+        if raw_size >= settings.CACHE_COMPRESS_MIN_BYTES:
+            compressed = zlib.compress(payload, settings.CACHE_COMPRESS_LEVEL)
+            if len(compressed) < raw_size:
+                header = MSGPACK_ZLIB if header == MSGPACK else PICKLE_ZLIB
+                payload = compressed
+                cache_serializer_stats.incr(label, 'compressed')
+
+        data = header + payload
+        cache_serializer_stats.incr(label, 'entries')
+        cache_serializer_stats.incr(label, 'raw_bytes', raw_size)
+        cache_serializer_stats.incr(label, 'stored_bytes', len(data))
+        cache_serializer_stats.incr(label, 'encode_us', int((time.perf_counter() - started) * 1_000_000))
+        return data
+
+    def loads(self, data):
+        fmt = _FORMATS.get(data[0]) if data else None
+        if fmt is None:
+            try:
+                return int(data)
+            except ValueError:
+                return pickle.loads(data)
+
+        started = time.perf_counter()
+        label, compressed = fmt
+        payload = zlib.decompress(data[1:]) if compressed else data[1:]
+        if label == 'msgpack':
+            value = msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        else:
+            value = pickle.loads(payload)
+        cache_serializer_stats.incr(label, 'decoded')
+        cache_serializer_stats.incr(label, 'decode_us', int((time.perf_counter() - started) * 1_000_000))
+        return value
+
+    def _encode(self, obj) -> tuple:
+        if msgpack is not None:
+            try:
+                return MSGPACK, msgpack.packb(obj, use_bin_type=True, strict_types=True, default=_reject)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return PICKLE, pickle.dumps(obj, self.protocol)
+
+
+def serializer_snapshot() -> dict:
+    """Counters plus derived per-entry averages, for the admin upstream stats."""
+    stats = cache_serializer_stats.snapshot()
+    for counts in stats.values():
+        entries = counts.get('entries', 0)
+        decoded = counts.get('decoded', 0)
+        if entries:
+            counts['avg_stored_bytes'] = round(counts.get('stored_bytes', 0) / entries)
+            counts['avg_encode_us'] = round(counts.get('encode_us', 0) / entries)
+            counts['compression_ratio'] = round(counts.get('stored_bytes', 0) / max(1, counts.get('raw_bytes', 0)), 3)
+        if decoded:
+            counts['avg_decode_us'] = round(counts.get('decode_us', 0) / decoded)
+    return stats
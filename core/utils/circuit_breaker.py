@@ -0,0 +1,170 @@
+import asyncio
+import inspect
+import logging
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from core.utils.cache_keys import make_key
+from core.utils.metrics import MetricCounters
+from core.utils.retry import classify, RETRYABLE
+
+logger = logging.getLogger(__name__)
+
+# Per-provider opened / half_opened / closed / rejected / failures counts
+breaker_stats = MetricCounters()
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one upstream provider, shared by
+    every worker through the cache.
+
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD transient failures (as classified by
+    core.utils.retry) within CIRCUIT_BREAKER_WINDOW seconds open the circuit.
+    After CIRCUIT_BREAKER_RECOVERY_TIMEOUT one worker at a time may send a
+    probe: success closes the circuit, failure re-opens it. Throttling and
+    permanent errors say nothing about the provider's health and are ignored.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def _key(self, part: str) -> str:
+        return make_key('breaker', self.name, part)
+
+    def state(self) -> str:
+        entry = cache.get(self._key('state'))
+        if entry is None:
+            return CLOSED
+        return OPEN if time.time() < entry['until'] else HALF_OPEN
+
+    def is_open(self) -> bool:
+        """True while calls are being refused outright (half-open still lets a probe through)."""
+        return self.state() == OPEN
+
+    def allow(self) -> bool:
+        state = self.state()
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and cache.add(self._key('probe'), True, settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT):
+            breaker_stats.incr(self.name, 'half_opened')
+            logger.info(f"[CircuitBreaker] {self.name} half-open, sending a probe")
+            return True
+        breaker_stats.incr(self.name, 'rejected')
+        return False
+
+    def record_success(self) -> None:
+        if cache.get(self._key('state')) is not None:
+            cache.delete_many([self._key('state'), self._key('probe'), self._key('failures')])
+            breaker_stats.incr(self.name, 'closed')
+            logger.info(f"[CircuitBreaker] {self.name} closed, provider recovered")
+
+    def record_failure(self) -> None:
+        breaker_stats.incr(self.name, 'failures')
+        if self.state() != CLOSED:
+            self._open()  # the probe failed
+            return
+        key = self._key('failures')
+        cache.add(key, 0, settings.CIRCUIT_BREAKER_WINDOW)
+        try:
+            failures = cache.incr(key)
+        except ValueError:
+            failures = 1  # window expired between add() and incr()
+            cache.add(key, failures, settings.CIRCUIT_BREAKER_WINDOW)
+        if failures >= settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD:
+            self._open()
+
+    def release(self) -> None:
+        """The call said nothing about provider health; let another worker probe."""
+        cache.delete(self._key('probe'))
+
+    def _open(self) -> None:
+        recovery = settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT
+        now = time.time()
+        cache.set(self._key('state'), {'opened_at': now, 'until': now + recovery}, recovery * 10)
+        cache.delete_many([self._key('probe'), self._key('failures')])
+        breaker_stats.incr(self.name, 'opened')
+        logger.warning(f"[CircuitBreaker] {self.name} opened for {recovery}s after repeated failures")
+
+    def snapshot(self) -> dict:
+        entry = cache.get(self._key('state'))
+        return {
+            'state': self.state(),
+            'open_for': max(0, round(entry['until'] - time.time(), 1)) if entry else 0,
+            'recent_failures': cache.get(self._key('failures'), 0),
+        }
+
+
+_breakers = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def breaker_snapshot() -> dict:
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
+
+
+def circuit_breaker(name: str, error):
+    """
+    Decorator: guard a client method with the named breaker.
+
+    While the circuit is open the method is not called; `error` (the
+    client's usual exception type) is raised at once, flagged circuit_open
+    so retries and fallbacks treat it as final. Coroutine methods are
+    supported; the breaker's cache round-trips then run off the event loop.
+    """
+    breaker = get_breaker(name)
+
+    def rejected():
+        exc = error(f'{name} is temporarily disabled after repeated failures')
+        exc.circuit_open = True
+        return exc
+
+    def record_error(exc):
+        if not getattr(exc, 'circuit_open', False) and classify(exc) == RETRYABLE:
+            breaker.record_failure()
+        else:
+            breaker.release()
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not await asyncio.to_thread(breaker.allow):
+                    raise rejected()
+                try:
+                    result = await func(*args, **kwargs)
+                except asyncio.CancelledError:
+                    # Cancelled by the caller (a lost race): no outcome, but free
+                    # a half-open probe slot. Inline, so a second cancel cannot skip it
+                    breaker.release()
+                    raise
+                except Exception as e:
+                    await asyncio.to_thread(record_error, e)
+                    raise
+                await asyncio.to_thread(breaker.record_success)
+                return result
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not breaker.allow():
+                raise rejected()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                record_error(e)
+                raise
+            breaker.record_success()
+            return result
+        return wrapper
+    return decorator
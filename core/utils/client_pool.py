@@ -0,0 +1,48 @@
+import logging
+import threading
+from core.utils.metrics import MetricCounters
+
+logger = logging.getLogger(__name__)
+
+# Per-pool built / reused counts
+client_pool_stats = MetricCounters()
+
+
+class KeyedClientPool:
+    """
+    One long-lived SDK client per API key, built on first use.
+
+    Clients hold their own connection pools (gRPC channels, httpx clients),
+    so reusing them keeps those transports warm; rotating keys just selects
+    another entry. Lookups after the first are lock-free.
+    """
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def get(self, api_key: str):
+        client = self._clients.get(api_key)
+        if client is not None:
+            client_pool_stats.incr(self.name, 'reused')
+            return client
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                client = self._factory(api_key)
+                self._clients[api_key] = client
+                client_pool_stats.incr(self.name, 'built')
+                logger.info(f"[ClientPool] Built {self.name} client ({len(self._clients)} in pool)")
+            else:
+                client_pool_stats.incr(self.name, 'reused')
+            return client
+
+    def discard(self, api_key: str) -> None:
+        """Drop a client (e.g. its key was revoked); the next get() builds a fresh one."""
+        with self._lock:
+            self._clients.pop(api_key, None)
+
+    def __len__(self) -> int:
+        return len(self._clients)
@@ -0,0 +1,331 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+from django.conf import settings
+from core.exceptions import DeadlineExceeded
+from core.utils import deadline
+from core.utils.metrics import MetricCounters, LatencySamples
+
+logger = logging.getLogger(__name__)
+
+# Per-fan-out calls / saved_ms (sum of branch times minus wall time), and
+# per-branch ok / failed / timed_out counts
+fan_out_stats = MetricCounters()
+
+# Per-race calls / all_failed / timed_out, and per-branch started / won / lost /
+# failed / skipped counts
+race_stats = MetricCounters()
+# Per-race time to the winning answer, and per-branch time to a successful
+# answer (losers that still finish included), for tuning start delays
+race_latencies = LatencySamples(settings.RACE_SAMPLE_SIZE)
+
+# Shared by every fan-out; branches run here so the caller can stop waiting on a slow one
+_executor = ThreadPoolExecutor(max_workers=settings.FANOUT_MAX_WORKERS, thread_name_prefix='fanout')
+
+# Set in pool threads: a fan-out from inside a branch runs inline, so nested
+# fan-outs cannot starve the pool they are waiting on
+_in_branch = threading.local()
+
+
+class FanOutResult:
+    """
+    Outcome of a fan-out: branch name -> value for branches that answered,
+    branch name -> exception for those that failed or timed out.
+
+    result[name] returns the value or re-raises that branch's error, so a
+    required branch reads like a direct call; optional branches use get().
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.errors = {}
+
+    def ok(self, name: str) -> bool:
+        return name in self.values
+
+    def get(self, name: str, default=None):
+        return self.values.get(name, default)
+
+    def __getitem__(self, name: str):
+        if name in self.errors:
+            raise self.errors[name]
+        return self.values[name]
+
+
+def _branch_budget(seconds):
+    """(seconds the branch may take, whether the request deadline is what limits it)."""
+    left = deadline.remaining()
+    if left is None:
+        return seconds, False
+    if seconds is None or left < seconds:
+        return max(0.0, left), True
+    return seconds, False
+
+
+def _timeout_error(label: str, name: str, seconds: float, by_deadline: bool) -> Exception:
+    if by_deadline:
+        return DeadlineExceeded(f'Deadline exceeded waiting for {label}.{name}')
+    return TimeoutError(f'{label}.{name} did not answer within {seconds:.1f}s')
+
+
+def _record(label: str, result: FanOutResult, durations: list, started: float) -> None:
+    fan_out_stats.incr(label, 'calls')
+    saved = sum(durations) - (time.monotonic() - started)
+    if saved > 0:
+        fan_out_stats.incr(label, 'saved_ms', int(saved * 1000))
+    for name, error in result.errors.items():
+        outcome = 'timed_out' if isinstance(error, (TimeoutError, DeadlineExceeded)) else 'failed'
+        fan_out_stats.incr(f'{label}.{name}', outcome)
+        logger.warning(f"[FanOut] {label}.{name} {outcome}: {error}")
+    for name in result.values:
+        fan_out_stats.incr(f'{label}.{name}', 'ok')
+
+
+def fan_out(label: str, branches: dict, timeout: float = None, timeouts: dict = None) -> FanOutResult:
+    """
+    Run independent zero-argument callables concurrently and wait for all of them.
+
+    Each branch gets timeouts[name] (else `timeout`, else no limit) seconds
+    from the start, never more than the request deadline allows. A branch
+    that raises or runs out of time is recorded in the result rather than
+    failing the others; a timed-out branch keeps running in the background
+    (threads cannot be interrupted) bounded by its own client timeouts.
+    Branches run under a copy of the caller's context, so the request
+    deadline follows them into the pool.
+    """
+    timeouts = timeouts or {}
+    result = FanOutResult()
+    durations = []
+    started = time.monotonic()
+
+    def timed(call):
+        def run():
+            outer = getattr(_in_branch, 'active', False)
+            _in_branch.active = True
+            branch_started = time.monotonic()
+            try:
+                return call()
+            finally:
+                durations.append(time.monotonic() - branch_started)
+                _in_branch.active = outer
+        return run
+
+    if getattr(_in_branch, 'active', False):
+        for name, call in branches.items():
+            try:
+                result.values[name] = timed(call)()
+            except Exception as e:
+                result.errors[name] = e
+        _record(label, result, durations, started)
+        return result
+
+    futures = {
+        name: _executor.submit(contextvars.copy_context().run, timed(call))
+        for name, call in branches.items()
+    }
+    for name, future in futures.items():
+        seconds, by_deadline = _branch_budget(timeouts.get(name, timeout))
+        wait_for = None if seconds is None else max(0.0, started + seconds - time.monotonic())
+        try:
+            result.values[name] = future.result(timeout=wait_for)
+        except FutureTimeout:
+            future.cancel()
+            result.errors[name] = _timeout_error(label, name, seconds, by_deadline)
+        except Exception as e:
+            result.errors[name] = e
+
+    _record(label, result, durations, started)
+    return result
+
+
+async def afan_out(label: str, branches: dict, timeout: float = None, timeouts: dict = None) -> FanOutResult:
+    """
+    fan_out() for coroutines: `branches` maps names to zero-argument callables
+    returning awaitables. A branch that runs out of time is cancelled.
+    """
+    timeouts = timeouts or {}
+    result = FanOutResult()
+    durations = []
+    started = time.monotonic()
+
+    async def run(name, make):
+        seconds, by_deadline = _branch_budget(timeouts.get(name, timeout))
+        branch_started = time.monotonic()
+        try:
+            result.values[name] = await asyncio.wait_for(make(), seconds)
+        except asyncio.TimeoutError:
+            result.errors[name] = _timeout_error(label, name, seconds, by_deadline)
+        except Exception as e:
+            result.errors[name] = e
+        finally:
+            durations.append(time.monotonic() - branch_started)
+
+    # Tasks copy the current context, so the request deadline applies inside each branch
+    await asyncio.gather(*(run(name, make) for name, make in branches.items()))
+    _record(label, result, durations, started)
+    return result
+
+
+def _race_won(label: str, started: float, name: str, value, losers, never_started) -> tuple:
+    race_stats.incr(f'{label}.{name}', 'won')
+    for loser in losers:
+        race_stats.incr(f'{label}.{loser}', 'lost')
+    for skipped in never_started:
+        race_stats.incr(f'{label}.{skipped}', 'skipped')
+    race_latencies.observe(label, time.monotonic() - started)
+    logger.info(f"[Race] {label}.{name} won after {time.monotonic() - started:.2f}s")
+    return name, value
+
+
+def _race_failed(label: str, name: str, e: Exception) -> None:
+    race_stats.incr(f'{label}.{name}', 'failed')
+    logger.warning(f"[Race] {label}.{name} failed: {e}")
+
+
+def _race_wait(started: float, next_delay) -> tuple:
+    """(seconds to wait for a branch before starting the next one or giving up, time left on the deadline)."""
+    wait_for = None
+    if next_delay is not None:
+        wait_for = max(0.0, started + next_delay - time.monotonic())
+    left = deadline.remaining()
+    if left is not None:
+        wait_for = max(0.0, left) if wait_for is None else min(wait_for, max(0.0, left))
+    return wait_for, left
+
+
+def race(label: str, branches: dict, delays: dict = None) -> tuple:
+    """
+    Run interchangeable zero-argument callables and return (name, value) of
+    the first to succeed.
+
+    Branches start in order: each delays[name] (default 0) seconds after the
+    race began, or at once when every branch started so far has failed. When
+    one succeeds the rest are cancelled: branches not yet started never
+    start, and running ones find their deadline spent (deadline.cancelled())
+    at their next check; a result that still arrives is discarded. If every
+    branch fails, the last error is raised. Inside a fan-out branch the
+    branches run inline, one after another.
+    """
+    delays = delays or {}
+    names = list(branches)
+    race_stats.incr(label, 'calls')
+    started = time.monotonic()
+    cancel = threading.Event()
+    error = None
+
+    def timed(name):
+        def run():
+            outer = getattr(_in_branch, 'active', False)
+            _in_branch.active = True
+            branch_started = time.monotonic()
+            try:
+                with deadline.cancellable(cancel):
+                    value = branches[name]()
+                race_latencies.observe(f'{label}.{name}', time.monotonic() - branch_started)
+                return value
+            finally:
+                _in_branch.active = outer
+        return run
+
+    def won(name, value, losers, never_started):
+        cancel.set()
+        return _race_won(label, started, name, value, losers, never_started)
+
+    def failed(name, e):
+        _race_failed(label, name, e)
+
+    if getattr(_in_branch, 'active', False):
+        for index, name in enumerate(names):
+            race_stats.incr(f'{label}.{name}', 'started')
+            try:
+                value = timed(name)()
+            except Exception as e:
+                failed(name, e)
+                error = e
+                continue
+            return won(name, value, [], names[index + 1:])
+        race_stats.incr(label, 'all_failed')
+        raise error
+
+    running = {}
+    next_up = 0
+    while True:
+        while next_up < len(names) and (not running or time.monotonic() - started >= delays.get(names[next_up], 0)):
+            name = names[next_up]
+            next_up += 1
+            race_stats.incr(f'{label}.{name}', 'started')
+            running[_executor.submit(contextvars.copy_context().run, timed(name))] = name
+        if not running:
+            break
+
+        wait_for, left = _race_wait(started, delays.get(names[next_up], 0) if next_up < len(names) else None)
+        done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            if future.exception() is None:
+                return won(name, future.result(), list(running.values()), names[next_up:])
+            failed(name, future.exception())
+            error = future.exception()
+
+        if not done and left is not None and deadline.remaining() <= 0:
+            cancel.set()
+            race_stats.incr(label, 'timed_out')
+            raise DeadlineExceeded(f'Deadline exceeded waiting for {label}')
+
+    race_stats.incr(label, 'all_failed')
+    raise error
+
+
+async def arace(label: str, branches: dict, delays: dict = None) -> tuple:
+    """
+    race() for coroutines: `branches` maps names to zero-argument callables
+    returning awaitables. When one succeeds the others are cancelled
+    outright (asyncio.CancelledError inside them); the race is bounded by
+    the request deadline the same way.
+    """
+    delays = delays or {}
+    names = list(branches)
+    race_stats.incr(label, 'calls')
+    started = time.monotonic()
+    error = None
+
+    async def timed(name):
+        branch_started = time.monotonic()
+        value = await branches[name]()
+        race_latencies.observe(f'{label}.{name}', time.monotonic() - branch_started)
+        return value
+
+    # Tasks copy the current context, so the request deadline applies inside each branch
+    running = {}
+    next_up = 0
+    try:
+        while True:
+            while next_up < len(names) and (not running or time.monotonic() - started >= delays.get(names[next_up], 0)):
+                name = names[next_up]
+                next_up += 1
+                race_stats.incr(f'{label}.{name}', 'started')
+                running[asyncio.ensure_future(timed(name))] = name
+            if not running:
+                break
+
+            wait_for, left = _race_wait(started, delays.get(names[next_up], 0) if next_up < len(names) else None)
+            done, _ = await asyncio.wait(running, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                if task.exception() is None:
+                    return _race_won(label, started, name, task.result(), list(running.values()), names[next_up:])
+                _race_failed(label, name, task.exception())
+                error = task.exception()
+
+            if not done and left is not None and deadline.remaining() <= 0:
+                race_stats.incr(label, 'timed_out')
+                raise DeadlineExceeded(f'Deadline exceeded waiting for {label}')
+    finally:
+        for task in running:
+            task.cancel()
+
+    race_stats.incr(label, 'all_failed')
+    raise error
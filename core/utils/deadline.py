@@ -0,0 +1,75 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from core.exceptions import DeadlineExceeded
+
+# Absolute time.monotonic() by which the current request must be answered
+_deadline = ContextVar('request_deadline', default=None)
+# threading.Event set once the work is no longer wanted (another branch of a
+# race won); the budget then reads as spent, so it stops at its next check
+_cancelled = ContextVar('request_cancelled', default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Run a block with at most `seconds` of budget.
+
+    Nested deadlines can only shorten the budget, never extend it.
+    """
+    target = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        target = min(target, current)
+    token = _deadline.set(target)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def cancellable(event):
+    """Run a block whose budget counts as spent once `event` is set."""
+    token = _cancelled.set(event)
+    try:
+        yield
+    finally:
+        _cancelled.reset(token)
+
+
+def cancelled() -> bool:
+    event = _cancelled.get()
+    return event is not None and event.is_set()
+
+
+def remaining():
+    """Seconds left in the current deadline, or None when there is none (shell, Celery)."""
+    if cancelled():
+        return 0.0
+    target = _deadline.get()
+    if target is None:
+        return None
+    return target - time.monotonic()
+
+
+def check(operation: str = 'request') -> None:
+    """Raise DeadlineExceeded if the budget is already spent."""
+    if cancelled():
+        raise DeadlineExceeded(f'Cancelled before {operation}')
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f'Deadline exceeded before {operation}')
+
+
+def can_afford(seconds: float) -> bool:
+    """True if `seconds` more work still fits in the budget."""
+    left = remaining()
+    return left is None or left >= seconds
+
+
+def timeout(default: float, operation: str = 'request') -> float:
+    """A timeout for the next upstream call: `default`, shortened to the budget left."""
+    check(operation)
+    left = remaining()
+    return default if left is None else min(default, left)
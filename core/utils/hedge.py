@@ -0,0 +1,133 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from core.utils.metrics import MetricCounters
+
+logger = logging.getLogger(__name__)
+
+# Per-upstream calls / hedged / hedge_won / primary_won / budget_exhausted / no_backup counts
+hedge_stats = MetricCounters()
+
+# Shared by every hedger; attempts run here so the caller can stop waiting on a slow one
+_executor = ThreadPoolExecutor(max_workers=settings.HEDGE_MAX_WORKERS, thread_name_prefix='hedge')
+
+
+class Hedger:
+    """
+    Tail-latency hedging for one upstream.
+
+    The primary attempt gets HEDGE_PERCENTILE of recently observed latencies
+    to answer; if it has not by then, a backup attempt (typically on another
+    API key) is started and whichever succeeds first wins. Hedges are capped
+    at HEDGE_BUDGET_RATIO of the calls in the last HEDGE_BUDGET_WINDOW
+    seconds, so a slow upstream sees at most that much extra load. The losing
+    attempt cannot be cancelled mid-request; its result is discarded.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=settings.HEDGE_SAMPLE_SIZE)
+        self._calls = deque()
+        self._hedges = deque()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def delay(self):
+        """Seconds to wait before hedging, or None until enough latencies have been seen."""
+        with self._lock:
+            if len(self._latencies) < settings.HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * settings.HEDGE_PERCENTILE / 100))
+        return max(settings.HEDGE_MIN_DELAY, ordered[index])
+
+    def _prune(self, now: float) -> None:
+        horizon = now - settings.HEDGE_BUDGET_WINDOW
+        for events in (self._calls, self._hedges):
+            while events and events[0] < horizon:
+                events.popleft()
+
+    def _record_call(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            self._calls.append(now)
+
+    def _try_spend(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            if len(self._hedges) >= settings.HEDGE_BUDGET_RATIO * len(self._calls):
+                return False
+            self._hedges.append(now)
+            return True
+
+    def _submit(self, attempt):
+        def timed():
+            started = time.monotonic()
+            result = attempt()
+            self.observe(time.monotonic() - started)
+            return result
+        # Copy the context so the request deadline follows the attempt into the pool
+        return _executor.submit(contextvars.copy_context().run, timed)
+
+    def run(self, primary, make_backup):
+        """
+        Call primary(); hedge with the callable make_backup() returns (None
+        when there is nothing to hedge with) if primary is slow.
+        """
+        hedge_stats.incr(self.name, 'calls')
+        self._record_call()
+        delay = self.delay()
+        if delay is None:
+            # Still learning what normal looks like
+            started = time.monotonic()
+            result = primary()
+            self.observe(time.monotonic() - started)
+            return result
+
+        first = self._submit(primary)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        if not self._try_spend():
+            hedge_stats.incr(self.name, 'budget_exhausted')
+            return first.result()
+        backup = make_backup()
+        if backup is None:
+            hedge_stats.incr(self.name, 'no_backup')
+            return first.result()
+
+        hedge_stats.incr(self.name, 'hedged')
+        logger.info(f"[Hedge] {self.name} primary slower than {delay:.2f}s, sending a hedge")
+        second = self._submit(backup)
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    hedge_stats.incr(self.name, 'primary_won' if future is first else 'hedge_won')
+                    return future.result()
+        # Both failed: the primary's error is the one callers expect
+        return first.result()
+
+
+_hedgers = {}
+
+
+def get_hedger(name: str) -> Hedger:
+    if name not in _hedgers:
+        _hedgers[name] = Hedger(name)
+    return _hedgers[name]
+
+
+def hedge_snapshot() -> dict:
+    return {name: {'delay': hedger.delay()} for name, hedger in _hedgers.items()}
@@ -0,0 +1,138 @@
+import os
+import threading
+from collections import defaultdict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from django.conf import settings
+from core.utils import deadline
+
+USER_AGENT = 'InsightStream/1.0 (gzip)'
+
+
+class ConnectionStats:
+    """Per-worker counters of requests vs. freshly opened connections, keyed by host."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = defaultdict(lambda: {'requests': 0, 'connections': 0})
+
+    def record_request(self, host: str) -> None:
+        with self._lock:
+            self._hosts[host]['requests'] += 1
+
+    def record_connection(self, host: str) -> None:
+        with self._lock:
+            self._hosts[host]['connections'] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                host: {
+                    'requests': counts['requests'],
+                    'connections': counts['connections'],
+                    'reused': max(0, counts['requests'] - counts['connections']),
+                }
+                for host, counts in self._hosts.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+connection_stats = ConnectionStats()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        connection_stats.record_connection(self.host)
+        return super()._new_conn()
+
+    def _make_request(self, conn, method, url, *args, **kwargs):
+        connection_stats.record_request(self.host)
+        return super()._make_request(conn, method, url, *args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        connection_stats.record_connection(self.host)
+        return super()._new_conn()
+
+    def _make_request(self, conn, method, url, *args, **kwargs):
+        connection_stats.record_request(self.host)
+        return super()._make_request(conn, method, url, *args, **kwargs)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report reuse counts to connection_stats."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+
+class SessionManager:
+    """
+    Keep-alive requests.Session objects shared by every client in a worker.
+
+    Sessions are rebuilt after a fork so gunicorn/Celery children never share
+    sockets with their parent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._pid = os.getpid()
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = PooledHTTPAdapter(
+            pool_connections=settings.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+            max_retries=0,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': USER_AGENT,
+        })
+        return session
+
+    def get(self, name: str = 'default') -> requests.Session:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._sessions = {}
+                self._pid = os.getpid()
+                connection_stats.reset()
+            session = self._sessions.get(name)
+            if session is None:
+                session = self._build_session()
+                self._sessions[name] = session
+            return session
+
+    def close_all(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+session_manager = SessionManager()
+
+
+def get_session(name: str = 'default') -> requests.Session:
+    return session_manager.get(name)
+
+
+def get_timeout(read_timeout: float = None) -> tuple:
+    """
+    Return a (connect, read) timeout tuple for requests, shortened to the
+    current request deadline. Raises DeadlineExceeded once it has passed.
+    """
+    read = read_timeout if read_timeout is not None else settings.HTTP_READ_TIMEOUT
+    return (deadline.timeout(settings.HTTP_CONNECT_TIMEOUT), deadline.timeout(read))
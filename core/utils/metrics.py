@@ -0,0 +1,53 @@
+import threading
+from collections import defaultdict, deque
+
+
+class MetricCounters:
+    """Thread-safe per-worker counters, grouped by label (endpoint, provider, ...)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: defaultdict(int))
+
+    def incr(self, label: str, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[label][name] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {label: dict(counts) for label, counts in self._counts.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+
+class LatencySamples:
+    """Thread-safe per-worker window of recent latencies (seconds), grouped by label."""
+
+    def __init__(self, size: int):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+
+    def observe(self, label: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[label].append(seconds)
+
+    def snapshot(self) -> dict:
+        """label -> sample count and p50 / p95 / max in milliseconds."""
+        with self._lock:
+            windows = {label: sorted(samples) for label, samples in self._samples.items()}
+        return {
+            label: {
+                'samples': len(ordered),
+                'p50_ms': int(ordered[int(len(ordered) * 0.5)] * 1000),
+                'p95_ms': int(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000),
+                'max_ms': int(ordered[-1] * 1000),
+            }
+            for label, ordered in windows.items() if ordered
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
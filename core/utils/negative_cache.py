@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.cache import cache
+from core.utils.metrics import MetricCounters
+from core.utils.cache_keys import make_key
+
+# Sentinel for cache.get() defaults, so falsy values ([] / None / 0) count as hits
+MISSING = object()
+
+# Per-namespace negative hits, by failure kind
+negative_cache_stats = MetricCounters()
+
+
+class NegativeEntry:
+    """A cached upstream failure ('not_found', 'forbidden', ...) replayed until it expires."""
+
+    def __init__(self, kind: str, message: str):
+        self.kind = kind
+        self.message = message
+
+
+def negative_key(namespace: str, identity: str) -> str:
+    return make_key(f'neg.{namespace}', identity, fold_case=False)
+
+
+def get_negative(namespace: str, identity: str):
+    """Return the cached NegativeEntry for this lookup, or None."""
+    entry = cache.get(negative_key(namespace, identity))
+    if entry is not None:
+        negative_cache_stats.incr(namespace, entry.kind)
+    return entry
+
+
+def set_negative(namespace: str, identity: str, kind: str, message: str) -> None:
+    """Remember a failure for its kind's TTL (NEGATIVE_CACHE_TTLS)."""
+    ttl = settings.NEGATIVE_CACHE_TTLS.get(kind)
+    if ttl:
+        cache.set(negative_key(namespace, identity), NegativeEntry(kind, message), ttl)
@@ -0,0 +1,111 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.core.cache import cache
+from core.utils.cache_keys import make_key
+
+logger = logging.getLogger(__name__)
+
+# YouTube resets daily quota at midnight Pacific time
+PACIFIC = ZoneInfo('America/Los_Angeles')
+
+# Units charged per call, from the YouTube Data API v3 quota calculator
+ENDPOINT_COSTS = {
+    'search': 100,
+    'videos': 1,
+    'channels': 1,
+    'playlistItems': 1,
+}
+DEFAULT_COST = 1
+
+
+class YouTubeQuotaLedger:
+    """
+    Shared per-key, per-Pacific-day YouTube quota ledger.
+
+    Usage counters live in the Django cache (Redis in production) so every
+    gunicorn and Celery worker charges the same budget. Calls are charged
+    before they are sent; once the remaining budget drops to the reserve,
+    expensive calls (search) are refused so cheap analytics calls keep working.
+    """
+
+    def _fingerprint(self, api_key: str) -> str:
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+    def _today(self) -> str:
+        return datetime.now(PACIFIC).date().isoformat()
+
+    def _seconds_until_reset(self) -> int:
+        now = datetime.now(PACIFIC)
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=PACIFIC)
+        return max(1, int((midnight - now).total_seconds()))
+
+    def _key(self, api_key: str) -> str:
+        return make_key('quota.youtube', self._fingerprint(api_key), self._today())
+
+    def cost(self, endpoint: str) -> int:
+        return ENDPOINT_COSTS.get(endpoint, DEFAULT_COST)
+
+    def used(self, api_key: str) -> int:
+        return cache.get(self._key(api_key), 0)
+
+    def remaining(self, api_key: str) -> int:
+        return max(0, settings.YOUTUBE_DAILY_QUOTA - self.used(api_key))
+
+    def is_low(self, api_key: str) -> bool:
+        """True once a search would eat into the reserve kept for cheap calls."""
+        return self.remaining(api_key) < settings.YOUTUBE_QUOTA_RESERVE + ENDPOINT_COSTS['search']
+
+    def try_charge(self, api_key: str, endpoint: str) -> bool:
+        """Reserve quota for one call. Returns False if the call must not be sent."""
+        cost = self.cost(endpoint)
+        budget = settings.YOUTUBE_DAILY_QUOTA
+        # Expensive calls may not eat into the reserve
+        limit = budget - settings.YOUTUBE_QUOTA_RESERVE if cost >= ENDPOINT_COSTS['search'] else budget
+        key = self._key(api_key)
+
+        cache.add(key, 0, timeout=self._seconds_until_reset())
+        try:
+            used = cache.incr(key, cost)
+        except ValueError:
+            # Key expired between add() and incr() at the day boundary
+            cache.add(key, cost, timeout=self._seconds_until_reset())
+            used = cost
+
+        if used > limit:
+            cache.decr(key, cost)
+            logger.warning(f"[Quota] Refused {endpoint} ({cost} units): {used - cost}/{budget} used")
+            return False
+        return True
+
+    def mark_exhausted(self, api_key: str) -> None:
+        """Record that YouTube itself reported quotaExceeded for this key."""
+        cache.set(self._key(api_key), settings.YOUTUBE_DAILY_QUOTA, timeout=self._seconds_until_reset())
+
+    def snapshot(self, api_keys: list) -> dict:
+        budget = settings.YOUTUBE_DAILY_QUOTA
+        cache_keys = {api_key: self._key(api_key) for api_key in api_keys}
+        usage = cache.get_many(list(cache_keys.values()))
+        low_at = settings.YOUTUBE_QUOTA_RESERVE + ENDPOINT_COSTS['search']
+        keys = []
+        for api_key in api_keys:
+            used = usage.get(cache_keys[api_key], 0)
+            keys.append({
+                'key': self._fingerprint(api_key),
+                'used': used,
+                'remaining': max(0, budget - used),
+                'low': max(0, budget - used) < low_at,
+            })
+        return {
+            'day': self._today(),
+            'resets_in_seconds': self._seconds_until_reset(),
+            'daily_budget': budget,
+            'reserve': settings.YOUTUBE_QUOTA_RESERVE,
+            'costs': ENDPOINT_COSTS,
+            'keys': keys,
+        }
+
+
+youtube_quota = YouTubeQuotaLedger()
@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from core.exceptions import RateLimitExceeded
+from core.utils.api_key_manager import api_key_manager
+from core.utils.cache_keys import make_key
+from core.utils.metrics import MetricCounters
+from core.utils.redis_client import get_redis
+from core.utils import deadline
+
+logger = logging.getLogger(__name__)
+
+# Per-service acquired / waited / switched_key / rejected counts
+rate_limit_stats = MetricCounters()
+
+# Buckets hold one minute of budget and refill continuously. Returns "0" and
+# takes the tokens when both buckets have room, otherwise the seconds until
+# they will (as a string: Lua numbers are truncated to integers on return).
+TAKE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'r', 't', 'ts')
+local r = tonumber(state[1]) or rpm
+local t = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local wait = 0
+if rpm > 0 then
+    r = math.min(rpm, r + elapsed * rpm / 60)
+    if r < 1 then wait = (1 - r) * 60 / rpm end
+end
+if tpm > 0 then
+    t = math.min(tpm, t + elapsed * tpm / 60)
+    if t < cost then wait = math.max(wait, (cost - t) * 60 / tpm) end
+end
+if wait == 0 then
+    r = r - 1
+    t = t - cost
+end
+redis.call('HSET', KEYS[1], 'r', r, 't', t, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 120)
+return tostring(wait)
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Proactive per-key request (RPM) and token (TPM) budgets, from RATE_LIMITS.
+
+    Buckets live in Redis and are checked-and-taken in one script, so every
+    worker draws from the same budget; with a locmem cache they are kept in
+    process. acquire_key() prefers the pool's active key, falls back to any
+    other key with capacity, and otherwise waits up to RATE_LIMIT_MAX_WAIT for
+    the soonest refill, so calls stay under provider limits instead of
+    discovering them through 429s.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}
+        self._script = None
+        self._script_client = None
+
+    def _limits(self, service: str) -> tuple:
+        limits = settings.RATE_LIMITS.get(service, {})
+        return limits.get('rpm', 0), limits.get('tpm', 0)
+
+    def _bucket_key(self, service: str, api_key: str) -> str:
+        return make_key(f'ratelimit.{service}', api_key_manager._fingerprint(api_key))
+
+    def _take_redis(self, client, key: str, rpm: int, tpm: int, cost: int) -> float:
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(TAKE_SCRIPT)
+            self._script_client = client
+        return float(self._script(keys=[key], args=[rpm, tpm, cost]))
+
+    def _take_local(self, key: str, rpm: int, tpm: int, cost: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            r, t, ts = self._local.get(key, (rpm, tpm, now))
+            elapsed = max(0.0, now - ts)
+            wait = 0.0
+            if rpm:
+                r = min(rpm, r + elapsed * rpm / 60)
+                if r < 1:
+                    wait = (1 - r) * 60 / rpm
+            if tpm:
+                t = min(tpm, t + elapsed * tpm / 60)
+                if t < cost:
+                    wait = max(wait, (cost - t) * 60 / tpm)
+            if not wait:
+                r, t = r - 1, t - cost
+            self._local[key] = (r, t, now)
+            return wait
+
+    def try_acquire(self, service: str, api_key: str, tokens: int = 0) -> float:
+        """Take one request (and `tokens`) from the key's buckets. Returns 0, or seconds until there is room."""
+        rpm, tpm = self._limits(service)
+        if not rpm and not tpm:
+            return 0.0
+        # A single call larger than the whole minute's budget could never fit
+        cost = min(tokens, tpm) if tpm else 0
+        key = self._bucket_key(service, api_key)
+        client = get_redis()
+        if client is not None:
+            return self._take_redis(client, key, rpm, tpm, cost)
+        return self._take_local(key, rpm, tpm, cost)
+
+    def acquire_key(self, service: str, tokens: int = 0, max_wait: float = None, exclude=()) -> str:
+        """Return a key (other than those in `exclude`) with capacity for one call, waiting briefly if none has any."""
+        max_wait = settings.RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        left = deadline.remaining()
+        if left is not None:
+            max_wait = max(0.0, min(max_wait, left))
+        give_up_at = time.monotonic() + max_wait
+
+        while True:
+            candidates = [key for key in api_key_manager.candidates(service) if key not in exclude]
+            if not candidates:
+                return ''
+            waits = []
+            for position, api_key in enumerate(candidates):
+                wait = self.try_acquire(service, api_key, tokens)
+                if not wait:
+                    rate_limit_stats.incr(service, 'acquired')
+                    if position:
+                        rate_limit_stats.incr(service, 'switched_key')
+                    return api_key
+                waits.append(wait)
+
+            wait = min(waits)
+            if time.monotonic() + wait > give_up_at:
+                rate_limit_stats.incr(service, 'rejected')
+                logger.warning(f"[RateLimit] {service}: no key has capacity within {max_wait}s")
+                raise RateLimitExceeded(f'{service} rate limit budget exhausted, retry in {wait:.1f}s', retry_after=wait)
+            rate_limit_stats.incr(service, 'waited')
+            time.sleep(wait)
+
+
+rate_limiter = TokenBucketLimiter()
@@ -0,0 +1,16 @@
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+
+def get_redis():
+    """
+    Raw redis-py client behind the default cache, or None when the cache is
+    not Redis (locmem in development).
+
+    Used for state that needs hashes, transactions or scripts. Values written
+    through it bypass the cache serializer and are stored as plain strings.
+    """
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        return backend._cache.get_client(write=True)
+    return None
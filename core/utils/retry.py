@@ -1,20 +1,227 @@
+import asyncio
+import inspect
+import logging
+import random
+import threading
 import time
+from collections import deque
+from email.utils import parsedate_to_datetime
 from functools import wraps
-from core.exceptions import RateLimitExceeded
+import requests
+from django.conf import settings
+from core.exceptions import InsightStreamException, RateLimitExceeded, YouTubeAPIError
+from core.utils.metrics import MetricCounters
+from core.utils import deadline
 
-def retry_with_backoff(max_retries: int = 3, base_delay: float = 1.0):
+logger = logging.getLogger(__name__)
+
+# Per-function calls / retries / permanent / throttled / deadline / budget_exhausted / gave_up counts
+retry_stats = MetricCounters()
+
+RETRYABLE = 'retryable'
+THROTTLED = 'throttled'
+PERMANENT = 'permanent'
+
+# Error codes that no amount of retrying will fix
+PERMANENT_CODES = {'CONFIG_ERROR', 'INVALID_IMAGE', 'VALIDATION_ERROR', 'DEADLINE_EXCEEDED'}
+
+
+def _status_of(exc):
+    response = getattr(exc, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        # requests / Replicate / google-api-core spell it differently
+        status = getattr(exc, 'status_code', None) or getattr(exc, 'status', None) or getattr(exc, 'code', None)
+    return status if isinstance(status, int) else None
+
+
+def _classify_one(exc):
+    if getattr(exc, 'circuit_open', False):
+        return PERMANENT  # fail fast; the breaker decides when to try again
+    if isinstance(exc, RateLimitExceeded):
+        return THROTTLED
+    if isinstance(exc, YouTubeAPIError) and exc.reason:
+        return PERMANENT  # negative-cached not_found / forbidden
+    if isinstance(exc, InsightStreamException) and exc.code in PERMANENT_CODES:
+        return PERMANENT
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return RETRYABLE
+
+    status = _status_of(exc)
+    if status == 429:
+        return THROTTLED
+    if status == 408 or (status is not None and status >= 500):
+        return RETRYABLE
+    if status is not None and 400 <= status < 500:
+        return PERMANENT
+    return None
+
+
+def classify(exc: BaseException) -> str:
+    """
+    RETRYABLE, THROTTLED or PERMANENT.
+
+    Clients wrap library errors in our own exceptions, so the cause/context
+    chain is walked until some link is decisive; unknown errors are retryable.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        verdict = _classify_one(exc)
+        if verdict is not None:
+            return verdict
+        exc = exc.__cause__ or exc.__context__
+    return RETRYABLE
+
+
+def retry_after(exc: BaseException):
+    """Seconds the upstream asked us to wait (Retry-After), if anywhere in the chain."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        hint = getattr(exc, 'retry_after', None)
+        if hint is None:
+            headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+            hint = headers.get('Retry-After')
+        if hint is not None:
+            try:
+                return max(0.0, float(hint))
+            except (TypeError, ValueError):
+                try:
+                    return max(0.0, parsedate_to_datetime(hint).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+class RetryBudget:
+    """
+    Process-wide cap on retries: at most RETRY_BUDGET_RATIO of the calls made
+    in the last RETRY_BUDGET_WINDOW seconds (with a small floor), so an
+    upstream outage is not amplified into a retry storm.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = deque()
+        self._retries = deque()
+
+    def _prune(self, now: float) -> None:
+        horizon = now - settings.RETRY_BUDGET_WINDOW
+        for events in (self._calls, self._retries):
+            while events and events[0] < horizon:
+                events.popleft()
+
+    def record_call(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            self._calls.append(now)
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            allowed = max(settings.RETRY_BUDGET_MIN_RETRIES, settings.RETRY_BUDGET_RATIO * len(self._calls))
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._prune(time.monotonic())
+            return {'calls': len(self._calls), 'retries': len(self._retries)}
+
+
+retry_budget = RetryBudget()
+
+
+def _next_attempt(label, exc, attempt, max_retries, base_delay, delay, cap):
+    """Whether to retry `exc`: (seconds to wait, new backoff delay), or None to give up."""
+    verdict = classify(exc)
+    if verdict == PERMANENT:
+        retry_stats.incr(label, 'permanent')
+        return None
+    if attempt == max_retries - 1:
+        retry_stats.incr(label, 'gave_up')
+        return None
+
+    if verdict == THROTTLED:
+        retry_stats.incr(label, 'throttled')
+        wait = retry_after(exc)
+        if wait is None or wait > cap:
+            return None
+    else:
+        # Decorrelated jitter: spread retries out, growing roughly 3x per attempt
+        delay = min(cap, random.uniform(base_delay, delay * 3))
+        wait = delay
+
+    if not deadline.can_afford(wait + base_delay):
+        retry_stats.incr(label, 'deadline')
+        return None
+    if not retry_budget.try_spend():
+        retry_stats.incr(label, 'budget_exhausted')
+        logger.warning(f"[Retry] Budget exhausted, not retrying {label}: {str(exc)}")
+        return None
+    retry_stats.incr(label, 'retries')
+    logger.info(f"[Retry] {label} attempt {attempt + 1} failed ({verdict}), retrying in {wait:.2f}s")
+    return wait, delay
+
+
+def _start_attempt(label) -> None:
+    deadline.check(label)
+    retry_budget.record_call()
+    retry_stats.incr(label, 'calls')
+
+
+def retry_with_backoff(max_retries: int = 3, base_delay: float = 1.0, max_delay: float = None):
+    """
+    Retry transient failures with decorrelated jitter.
+
+    - permanent errors (4xx, not-found, configuration) are raised at once
+    - throttled errors are retried only when the upstream says when
+      (Retry-After) and that is within max_delay; otherwise key rotation
+      below us has already done what can be done
+    - every retry spends from the process-wide retry budget
+    - no retry is started that the request deadline cannot wait for
+
+    Works on coroutine functions too, sleeping with asyncio.
+    """
     def decorator(func):
+        label = func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cap = settings.RETRY_MAX_DELAY if max_delay is None else max_delay
+                delay = base_delay
+                for attempt in range(max_retries):
+                    _start_attempt(label)
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        step = _next_attempt(label, e, attempt, max_retries, base_delay, delay, cap)
+                        if step is None:
+                            raise
+                        wait, delay = step
+                    await asyncio.sleep(wait)
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
+            cap = settings.RETRY_MAX_DELAY if max_delay is None else max_delay
+            delay = base_delay
             for attempt in range(max_retries):
+                _start_attempt(label)
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-                    last_exception = e
-                    if attempt < max_retries - 1:
-                        delay = base_delay * (2 ** attempt)
-                        time.sleep(delay)
-            raise last_exception
+                    step = _next_attempt(label, e, attempt, max_retries, base_delay, delay, cap)
+                    if step is None:
+                        raise
+                    wait, delay = step
+                time.sleep(wait)
         return wrapper
     return decorator
@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import inspect
+import logging
+import threading
+import time
+import uuid
+from functools import wraps
+from django.core.cache import cache
+from core.utils.metrics import MetricCounters
+from core.utils.cache_keys import make_key
+from core.utils import deadline
+
+logger = logging.getLogger(__name__)
+
+# Per-namespace leader / follower / fallback counts
+single_flight_stats = MetricCounters()
+
+_OK = 'ok'
+_ERROR = 'error'
+
+
+class _LocalFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.outcome = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical upstream calls across threads and processes.
+
+    The first caller for a key takes a cache lock (SET NX on Redis) and runs the
+    call; everyone else waits for its outcome, which is handed off through the
+    cache under the leader's flight token. Threads in the same worker wait on an
+    in-process event instead of polling. If the leader disappears or the wait
+    exceeds wait_timeout, followers fall back to making the call themselves.
+    """
+    POLL_INTERVAL = 0.05
+    RESULT_TTL = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}
+        self._async_local = {}
+
+    def _keys(self, namespace: str, key: str) -> tuple:
+        # Hashed before make_key, which would otherwise fold whitespace and
+        # unicode forms: only byte-identical calls are coalesced
+        exact = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        base = make_key(f'sf.{namespace}', exact, fold_case=False)
+        return base, f'{base}:lock'
+
+    def do(self, namespace: str, key: str, fn, lock_timeout: int = 60, wait_timeout: float = None):
+        wait_timeout = lock_timeout if wait_timeout is None else wait_timeout
+        left = deadline.remaining()
+        if left is not None:
+            wait_timeout = max(0.0, min(wait_timeout, left))
+        base, lock_key = self._keys(namespace, key)
+
+        with self._lock:
+            local = self._local.get(base)
+            is_local_leader = local is None
+            if is_local_leader:
+                local = self._local[base] = _LocalFlight()
+
+        if not is_local_leader:
+            single_flight_stats.incr(namespace, 'follower')
+            if local.done.wait(wait_timeout) and local.outcome is not None:
+                return self._unwrap(local.outcome)
+            single_flight_stats.incr(namespace, 'fallback')
+            return fn()
+
+        try:
+            local.outcome = self._run_distributed(namespace, base, lock_key, fn, lock_timeout, wait_timeout)
+            return self._unwrap(local.outcome)
+        finally:
+            local.done.set()
+            with self._lock:
+                self._local.pop(base, None)
+
+    def _run_distributed(self, namespace, base, lock_key, fn, lock_timeout, wait_timeout) -> tuple:
+        wait_until = time.monotonic() + wait_timeout
+        while True:
+            token = uuid.uuid4().hex
+            if cache.add(lock_key, token, lock_timeout):
+                single_flight_stats.incr(namespace, 'leader')
+                return self._lead(base, lock_key, token, fn)
+
+            leader_token = cache.get(lock_key)
+            if leader_token is None:
+                continue  # lock released between add() and get(); try again
+
+            single_flight_stats.incr(namespace, 'follower')
+            result_key = f'{base}:result:{leader_token}'
+            while time.monotonic() < wait_until:
+                found = cache.get_many([result_key, lock_key])
+                if result_key in found:
+                    return found[result_key]
+                if found.get(lock_key) != leader_token:
+                    break  # leader finished without handing off, or a new flight started
+                time.sleep(self.POLL_INTERVAL)
+            else:
+                single_flight_stats.incr(namespace, 'fallback')
+                logger.warning(f"[SingleFlight] Timed out waiting on {namespace}, calling upstream directly")
+                return self._capture(fn)
+
+            if time.monotonic() >= wait_until:
+                single_flight_stats.incr(namespace, 'fallback')
+                return self._capture(fn)
+
+    def _lead(self, base, lock_key, token, fn) -> tuple:
+        outcome = self._capture(fn)
+        self._hand_off(base, lock_key, token, outcome)
+        return outcome
+
+    def _capture(self, fn) -> tuple:
+        try:
+            return (_OK, fn())
+        except Exception as e:
+            return (_ERROR, e)
+
+    def _unwrap(self, outcome: tuple):
+        status, value = outcome
+        if status == _ERROR:
+            raise value
+        return value
+
+    async def ado(self, namespace: str, key: str, fn, lock_timeout: int = 60, wait_timeout: float = None):
+        """
+        do() for coroutines: tasks on the same event loop await the leader's
+        future; other workers are coordinated through the same cache lock.
+        """
+        wait_timeout = lock_timeout if wait_timeout is None else wait_timeout
+        left = deadline.remaining()
+        if left is not None:
+            wait_timeout = max(0.0, min(wait_timeout, left))
+        base, lock_key = self._keys(namespace, key)
+        loop = asyncio.get_running_loop()
+        local_key = (id(loop), base)
+
+        with self._lock:
+            future = self._async_local.get(local_key)
+            is_local_leader = future is None
+            if is_local_leader:
+                future = self._async_local[local_key] = loop.create_future()
+
+        if not is_local_leader:
+            single_flight_stats.incr(namespace, 'follower')
+            await asyncio.wait({future}, timeout=wait_timeout)
+            if future.done() and not future.cancelled():
+                return self._unwrap(future.result())
+            single_flight_stats.incr(namespace, 'fallback')
+            return await fn()
+
+        try:
+            outcome = await self._arun_distributed(namespace, base, lock_key, fn, lock_timeout, wait_timeout)
+            future.set_result(outcome)
+            return self._unwrap(outcome)
+        finally:
+            if not future.done():
+                future.cancel()  # leader was cancelled; followers call upstream themselves
+            with self._lock:
+                self._async_local.pop(local_key, None)
+
+    async def _arun_distributed(self, namespace, base, lock_key, fn, lock_timeout, wait_timeout) -> tuple:
+        give_up_at = time.monotonic() + wait_timeout
+        while True:
+            token = uuid.uuid4().hex
+            if await asyncio.to_thread(cache.add, lock_key, token, lock_timeout):
+                single_flight_stats.incr(namespace, 'leader')
+                outcome = await self._acapture(fn)
+                await asyncio.to_thread(self._hand_off, base, lock_key, token, outcome)
+                return outcome
+
+            leader_token = await asyncio.to_thread(cache.get, lock_key)
+            if leader_token is None:
+                continue
+
+            single_flight_stats.incr(namespace, 'follower')
+            result_key = f'{base}:result:{leader_token}'
+            while time.monotonic() < give_up_at:
+                found = await asyncio.to_thread(cache.get_many, [result_key, lock_key])
+                if result_key in found:
+                    return found[result_key]
+                if found.get(lock_key) != leader_token:
+                    break
+                await asyncio.sleep(self.POLL_INTERVAL)
+
+            if time.monotonic() >= give_up_at:
+                single_flight_stats.incr(namespace, 'fallback')
+                logger.warning(f"[SingleFlight] Timed out waiting on {namespace}, calling upstream directly")
+                return await self._acapture(fn)
+
+    def _hand_off(self, base, lock_key, token, outcome) -> None:
+        try:
+            cache.set(f'{base}:result:{token}', outcome, self.RESULT_TTL)
+        except Exception as e:
+            # Unpicklable result or exception: followers will call upstream themselves
+            logger.warning(f"[SingleFlight] Could not hand off result: {str(e)}")
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    async def _acapture(self, fn) -> tuple:
+        try:
+            return (_OK, await fn())
+        except Exception as e:
+            return (_ERROR, e)
+
+
+single_flight = SingleFlight()
+
+
+def coalesce(namespace: str, lock_timeout: int = 60, wait_timeout: float = None):
+    """
+    Decorator: coalesce concurrent calls with identical arguments.
+
+    Intended for methods on the module-level client singletons; `self` is
+    not part of the key. Coroutine methods are coalesced with ado(). Only
+    for idempotent reads: every caller gets the same result, so generators
+    whose output should differ per call (images) must not use it.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                key = repr((args, sorted(kwargs.items())))
+                return await single_flight.ado(
+                    namespace, key, lambda: func(self, *args, **kwargs),
+                    lock_timeout=lock_timeout, wait_timeout=wait_timeout
+                )
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = repr((args, sorted(kwargs.items())))
+            return single_flight.do(
+                namespace, key, lambda: func(self, *args, **kwargs),
+                lock_timeout=lock_timeout, wait_timeout=wait_timeout
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import inspect
+import logging
+import threading
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from core.exceptions import RateLimitExceeded, YouTubeAPIError, AIServiceUnavailable, DeadlineExceeded
+from core.utils.metrics import MetricCounters
+from core.utils.cache_keys import make_key
+
+logger = logging.getLogger(__name__)
+
+# Per-namespace hit / stale / miss / stale_if_error / refreshed counts
+swr_stats = MetricCounters()
+
+# Upstream failures that should be papered over with a stale copy
+STALE_IF_ERROR = (RateLimitExceeded, YouTubeAPIError, AIServiceUnavailable, DeadlineExceeded)
+
+_registry = {}
+# namespace -> the client instance (module singleton) background refreshes call
+_owners = {}
+
+
+def _cache_key(namespace: str, args: tuple, kwargs: dict, normalize_args: bool = True) -> str:
+    if normalize_args:
+        # Case/whitespace-insensitive, so 'Python tips' and 'python  tips' share an entry
+        return make_key(f'swr.{namespace}', list(args), kwargs)
+    # Exact arguments: a digest passes through make_key's normalization unchanged
+    exact = hashlib.sha1(repr((args, sorted(kwargs.items()))).encode('utf-8')).hexdigest()
+    return make_key(f'swr.{namespace}', exact)
+
+
+def _store(key: str, value, soft_ttl: int, max_stale: int, stale_if_error: int) -> None:
+    now = time.time()
+    entry = {
+        'value': value,
+        'fresh_until': now + soft_ttl,
+        'stale_until': now + soft_ttl + max_stale,
+    }
+    cache.set(key, entry, soft_ttl + max(max_stale, stale_if_error))
+
+
+def _schedule_refresh(namespace: str, key: str, args: tuple, kwargs: dict) -> None:
+    # Only one refresh per entry at a time, across all workers
+    if not cache.add(f'{key}:refreshing', True, settings.SWR_REFRESH_LOCK_TIMEOUT):
+        return
+
+    if settings.SWR_REFRESH_WITH_CELERY:
+        try:
+            from core.tasks import refresh_swr_entry
+            refresh_swr_entry.delay(namespace, list(args), kwargs)
+            return
+        except Exception as e:
+            logger.warning(f"[SWR] Could not enqueue refresh for {namespace}, refreshing in-process: {str(e)}")
+
+    threading.Thread(target=refresh, args=(namespace, args, kwargs), daemon=True).start()
+
+
+def refresh(namespace: str, args: tuple, kwargs: dict) -> None:
+    """Recompute one entry and store it. Keeps the stale copy if upstream fails."""
+    func, soft_ttl, max_stale, stale_if_error, normalize_args = _registry[namespace]
+    key = _cache_key(namespace, tuple(args), kwargs, normalize_args)
+    try:
+        if namespace not in _owners:
+            raise LookupError(f'no client registered with swr_owner() for {func.__qualname__}')
+        value = func(_owners[namespace], *args, **kwargs)
+        _store(key, value, soft_ttl, max_stale, stale_if_error)
+        swr_stats.incr(namespace, 'refreshed')
+    except Exception as e:
+        swr_stats.incr(namespace, 'refresh_failed')
+        logger.warning(f"[SWR] Background refresh of {namespace} failed, keeping stale copy: {str(e)}")
+    finally:
+        cache.delete(f'{key}:refreshing')
+
+
+def swr_owner(instance):
+    """
+    Register a client's module-level singleton as the instance background
+    refreshes of its class's namespaces run on, so they reuse its pooled
+    connections. Returns the instance.
+    """
+    cls = type(instance)
+    for namespace, (func, *_) in _registry.items():
+        if func.__module__ == cls.__module__ and func.__qualname__.split('.')[0] == cls.__name__:
+            _owners[namespace] = instance
+    return instance
+
+
+def _lookup(namespace: str, key: str, args: tuple, kwargs: dict, cache_only: bool) -> tuple:
+    """Return (entry, served): served is True when the cached value should be returned as is."""
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is not None:
+        if now < entry['fresh_until']:
+            swr_stats.incr(namespace, 'hit')
+            return entry, True
+        if cache_only or now < entry['stale_until']:
+            swr_stats.incr(namespace, 'stale')
+            if not cache_only:
+                _schedule_refresh(namespace, key, args, kwargs)
+            return entry, True
+    elif cache_only:
+        raise RateLimitExceeded(f'{namespace}: no cached result and upstream calls are restricted')
+    return entry, False
+
+
+def stale_while_revalidate(namespace: str, soft_ttl: int, max_stale: int, stale_if_error: int, normalize_args: bool = True):
+    """
+    Cache a client method's result in a soft/hard TTL envelope.
+
+    - fresh (< soft_ttl): served from cache
+    - stale (< soft_ttl + max_stale): served immediately, refreshed in the
+      background through Celery (or a thread when Celery is not configured)
+    - expired but within stale_if_error: refreshed inline; if upstream raises
+      RateLimitExceeded / YouTubeAPIError / AIServiceUnavailable /
+      DeadlineExceeded the old value is served instead
+
+    Callers may pass cache_only=True to get whatever copy exists without ever
+    calling upstream; RateLimitExceeded is raised when there is none.
+
+    Arguments are normalized into the key (case, whitespace) unless
+    normalize_args=False, for methods whose output depends on the exact text.
+
+    Coroutine methods are supported and share the sync method's entries.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            # Shares entries with the sync method registered under the same
+            # namespace, which also performs the background refreshes
+            @wraps(func)
+            async def async_wrapper(self, *args, cache_only: bool = False, **kwargs):
+                key = _cache_key(namespace, args, kwargs, normalize_args)
+                entry, served = await asyncio.to_thread(_lookup, namespace, key, args, kwargs, cache_only)
+                if served:
+                    return entry['value']
+
+                try:
+                    value = await func(self, *args, **kwargs)
+                except STALE_IF_ERROR as e:
+                    if entry is None:
+                        raise
+                    swr_stats.incr(namespace, 'stale_if_error')
+                    logger.warning(f"[SWR] {namespace} upstream failed, serving stale copy: {str(e)}")
+                    return entry['value']
+
+                swr_stats.incr(namespace, 'miss')
+                await asyncio.to_thread(_store, key, value, soft_ttl, max_stale, stale_if_error)
+                return value
+            return async_wrapper
+
+        _registry[namespace] = (func, soft_ttl, max_stale, stale_if_error, normalize_args)
+
+        @wraps(func)
+        def wrapper(self, *args, cache_only: bool = False, **kwargs):
+            key = _cache_key(namespace, args, kwargs, normalize_args)
+            entry, served = _lookup(namespace, key, args, kwargs, cache_only)
+            if served:
+                return entry['value']
+
+            try:
+                value = func(self, *args, **kwargs)
+            except STALE_IF_ERROR as e:
+                if entry is None:
+                    raise
+                swr_stats.incr(namespace, 'stale_if_error')
+                logger.warning(f"[SWR] {namespace} upstream failed, serving stale copy: {str(e)}")
+                return entry['value']
+
+            swr_stats.incr(namespace, 'miss')
+            _store(key, value, soft_ttl, max_stale, stale_if_error)
+            return value
+        return wrapper
+    return decorator
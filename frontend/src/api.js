@@ -59,7 +59,8 @@ export const authAPI = {
 };
 
 export const thumbnailAPI = {
-  generate: (data) => api.post('/thumbnails/generate/', data),
+  generate: (data) => api.post('/thumbnails/generate/', data, { headers: { Prefer: 'respond-async' } }),
+  getJob: (jobId) => api.get(`/thumbnails/jobs/${jobId}/`),
   getHistory: () => api.get('/thumbnails/history/'),
 };
 
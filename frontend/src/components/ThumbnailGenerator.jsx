@@ -26,6 +26,24 @@ function ThumbnailGenerator() {
     }
   }
 
+  // Generation can run as a background job: poll it until it finishes,
+  // giving up after a little longer than the server-side job deadline
+  const JOB_PROGRESS = { queued: 10, generating: 40, uploading: 80 }
+  const JOB_POLL_INTERVAL = 2000
+  const JOB_MAX_POLLS = 180
+
+  const waitForJob = async (jobId) => {
+    for (let attempt = 0; attempt < JOB_MAX_POLLS; attempt++) {
+      await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL))
+      const { data: job } = await thumbnailAPI.getJob(jobId)
+      if (job.status === 'done' || job.status === 'failed') {
+        return job
+      }
+      setProgress(JOB_PROGRESS[job.status] ?? 10)
+    }
+    return null
+  }
+
   const handleGenerate = async (e) => {
     e.preventDefault()
     setError('')
@@ -46,7 +64,21 @@ function ThumbnailGenerator() {
     try {
       const response = await thumbnailAPI.generate({ prompt })
       console.log('Thumbnail response:', response.data)
-      const thumbnailUrl = response.data.thumbnail_url
+      let result = response.data
+      if (response.status === 202) {
+        clearInterval(progressInterval)
+        const job = await waitForJob(response.data.job_id)
+        if (!job) {
+          setError('Thumbnail generation is taking too long. Check your history again in a few minutes.')
+          return
+        }
+        if (job.status === 'failed') {
+          setError(job.error?.message || 'Failed to generate thumbnail')
+          return
+        }
+        result = job.result
+      }
+      const thumbnailUrl = result.thumbnail_url
       if (thumbnailUrl) {
         setProgress(100)
         setTimeout(() => {
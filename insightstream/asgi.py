@@ -0,0 +1,6 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'insightstream.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'true')
+application = get_asgi_application()
@@ -46,7 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.StaticFilesMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.DeadlineMiddleware',
 ]
 
 ROOT_URLCONF = 'insightstream.urls'
@@ -76,6 +77,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'insightstream.wsgi.application'
 
+# Route the I/O-bound endpoints to their async views. insightstream/asgi.py turns
+# this on; under WSGI each async view would need its own event loop per request.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'false').lower() == 'true'
+
 # Database
 DATABASE_URL = os.getenv('DATABASE_URL', os.getenv('NEXT_PUBLIC_NEON_DB_CONNECTION_STRING', ''))
 if DATABASE_URL:
@@ -188,6 +193,7 @@ CORS_ALLOW_HEADERS = [
     'content-type',
     'dnt',
     'origin',
+    'prefer',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
@@ -202,11 +208,23 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
         'LOCATION': os.getenv('REDIS_URL', 'redis://localhost:6379/1'),
+        'OPTIONS': {
+            'serializer': 'core.utils.cache_serializer.CompactSerializer',
+        },
     } if os.getenv('REDIS_URL') else {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Versioned cache keys (core.utils.cache_keys): bump the schema version when the
+# shape of cached values changes; namespace generations are re-read this often
+CACHE_SCHEMA_VERSION = int(os.getenv('CACHE_SCHEMA_VERSION', '1'))
+CACHE_NAMESPACE_VERSION_TTL = int(os.getenv('CACHE_NAMESPACE_VERSION_TTL', '5'))
+
+# Cached payloads at least this large are zlib-compressed (Redis only)
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv('CACHE_COMPRESS_MIN_BYTES', '1024'))
+CACHE_COMPRESS_LEVEL = int(os.getenv('CACHE_COMPRESS_LEVEL', '3'))
+
 # External API Keys
 GEMINI_API_KEYS = [os.getenv(f'GEMINI_API_KEY_{i}') for i in range(1, 6) if os.getenv(f'GEMINI_API_KEY_{i}')]
 REPLICATE_API_TOKEN = os.getenv('REPLICATE_API_TOKEN', '')
@@ -215,6 +233,161 @@ IMAGEKIT_PUBLIC_KEY = os.getenv('IMAGEKIT_PUBLIC_KEY', '')
 IMAGEKIT_PRIVATE_KEY = os.getenv('IMAGEKIT_PRIVATE_KEY', '')
 IMAGEKIT_URL_ENDPOINT = os.getenv('IMAGEKIT_URL_ENDPOINT', '')
 
+# Shared API key pools: a throttled key cools down for this long, doubling on
+# repeated throttles up to the maximum
+API_KEY_COOLDOWN_SECONDS = int(os.getenv('API_KEY_COOLDOWN_SECONDS', '60'))
+API_KEY_MAX_COOLDOWN_SECONDS = int(os.getenv('API_KEY_MAX_COOLDOWN_SECONDS', '900'))
+
+# Proactive per-key budgets (requests / tokens per minute, 0 = unlimited),
+# enforced across workers before calls are sent
+RATE_LIMITS = {
+    'gemini': {
+        'rpm': int(os.getenv('GEMINI_RPM_PER_KEY', '15')),
+        'tpm': int(os.getenv('GEMINI_TPM_PER_KEY', '1000000')),
+    },
+    'replicate': {
+        'rpm': int(os.getenv('REPLICATE_RPM_PER_KEY', '600')),
+    },
+    'youtube': {
+        'rpm': int(os.getenv('YOUTUBE_RPM_PER_KEY', '0')),
+    },
+}
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '2'))
+
+# Retries: no single backoff sleep exceeds RETRY_MAX_DELAY, and retries are
+# capped at RETRY_BUDGET_RATIO of the calls in the last RETRY_BUDGET_WINDOW
+# seconds (but always at least RETRY_BUDGET_MIN_RETRIES)
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '2'))
+RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', '0.1'))
+RETRY_BUDGET_WINDOW = int(os.getenv('RETRY_BUDGET_WINDOW', '10'))
+RETRY_BUDGET_MIN_RETRIES = int(os.getenv('RETRY_BUDGET_MIN_RETRIES', '5'))
+
+# Circuit breakers per upstream provider: this many transient failures within
+# the window open the circuit; after the recovery timeout one probe is let through
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_FAILURE_THRESHOLD', '5'))
+CIRCUIT_BREAKER_WINDOW = int(os.getenv('CIRCUIT_BREAKER_WINDOW', '60'))
+CIRCUIT_BREAKER_RECOVERY_TIMEOUT = int(os.getenv('CIRCUIT_BREAKER_RECOVERY_TIMEOUT', '30'))
+
+# Hedged requests: if a call has not answered within HEDGE_PERCENTILE of the
+# last HEDGE_SAMPLE_SIZE latencies, a duplicate is sent (Gemini: on another
+# key) and the first answer wins. Hedges are capped at HEDGE_BUDGET_RATIO of
+# the calls in the last HEDGE_BUDGET_WINDOW seconds.
+GEMINI_HEDGE_ENABLED = os.getenv('GEMINI_HEDGE_ENABLED', 'false').lower() == 'true'
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '90'))
+HEDGE_SAMPLE_SIZE = int(os.getenv('HEDGE_SAMPLE_SIZE', '200'))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '0.5'))
+HEDGE_BUDGET_RATIO = float(os.getenv('HEDGE_BUDGET_RATIO', '0.1'))
+HEDGE_BUDGET_WINDOW = int(os.getenv('HEDGE_BUDGET_WINDOW', '60'))
+HEDGE_MAX_WORKERS = int(os.getenv('HEDGE_MAX_WORKERS', '16'))
+
+# Fan-out (core.utils.concurrency): independent upstream calls run concurrently on
+# a shared pool. Optional enrichment branches get their own timeout so a slow one
+# cannot hold the response; required branches are bounded by the request deadline.
+FANOUT_MAX_WORKERS = int(os.getenv('FANOUT_MAX_WORKERS', '32'))
+KEYWORDS_TRENDING_TIMEOUT = float(os.getenv('KEYWORDS_TRENDING_TIMEOUT', '8'))
+HASHTAGS_TRENDING_TIMEOUT = float(os.getenv('HASHTAGS_TRENDING_TIMEOUT', '8'))
+ANALYTICS_SUGGESTIONS_TIMEOUT = float(os.getenv('ANALYTICS_SUGGESTIONS_TIMEOUT', '15'))
+# Recent latencies kept per race and per branch for the admin percentiles
+RACE_SAMPLE_SIZE = int(os.getenv('RACE_SAMPLE_SIZE', '200'))
+
+# End-to-end request deadlines (seconds), by longest matching path prefix.
+# Clients may ask for less (never more than the max) with X-Request-Timeout.
+REQUEST_DEADLINE_DEFAULT = float(os.getenv('REQUEST_DEADLINE_DEFAULT', '30'))
+REQUEST_DEADLINE_MAX = float(os.getenv('REQUEST_DEADLINE_MAX', '120'))
+REQUEST_DEADLINES = {
+    '/api/thumbnails/generate/': float(os.getenv('THUMBNAIL_DEADLINE', '90')),
+    '/api/analytics/': float(os.getenv('ANALYTICS_DEADLINE', '45')),
+    '/api/content/': float(os.getenv('CONTENT_DEADLINE', '30')),
+    '/api/keywords/': float(os.getenv('KEYWORDS_DEADLINE', '20')),
+    '/api/hashtags/': float(os.getenv('HASHTAGS_DEADLINE', '20')),
+}
+# Per-call ceilings for SDK-based clients; the request deadline can only shorten them
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', '30'))
+REPLICATE_TIMEOUT = float(os.getenv('REPLICATE_TIMEOUT', '120'))
+# Thumbnail budget split: time kept back from Replicate for the Pollinations
+# fallback, and the least time worth starting a CDN upload with
+THUMBNAIL_FALLBACK_RESERVE = float(os.getenv('THUMBNAIL_FALLBACK_RESERVE', '40'))
+THUMBNAIL_UPLOAD_MIN_BUDGET = float(os.getenv('THUMBNAIL_UPLOAD_MIN_BUDGET', '5'))
+# How thumbnail providers are combined, in routed order: 'fallback' calls the next
+# one only after the previous has failed; 'race' starts all at once; 'hedge' starts
+# the next one each THUMBNAIL_HEDGE_DELAY seconds (or as soon as the previous fails).
+# In 'race' and 'hedge' the first image wins and the other calls are cancelled.
+THUMBNAIL_PROVIDER_STRATEGY = os.getenv('THUMBNAIL_PROVIDER_STRATEGY', 'fallback').lower()
+THUMBNAIL_HEDGE_DELAY = float(os.getenv('THUMBNAIL_HEDGE_DELAY', '10'))
+# Thumbnail provider routing (core.clients.image_provider). Each request goes first to
+# the provider with the best expected time to an image over its last
+# THUMBNAIL_ROUTING_WINDOW attempts (shared by all workers), then down the ranking.
+# Providers with fewer than THUMBNAIL_ROUTING_MIN_SAMPLES attempts go first until they
+# have them; THUMBNAIL_EXPLORE_RATE of requests start on another provider, weighted
+# by speed. Cost counts as THUMBNAIL_COST_WEIGHT seconds per dollar per image.
+THUMBNAIL_PROVIDERS = [p.strip() for p in os.getenv('THUMBNAIL_PROVIDERS', 'replicate,pollinations').split(',') if p.strip()]
+THUMBNAIL_ROUTING_WINDOW = int(os.getenv('THUMBNAIL_ROUTING_WINDOW', '100'))
+THUMBNAIL_ROUTING_MIN_SAMPLES = int(os.getenv('THUMBNAIL_ROUTING_MIN_SAMPLES', '10'))
+THUMBNAIL_EXPLORE_RATE = float(os.getenv('THUMBNAIL_EXPLORE_RATE', '0.05'))
+THUMBNAIL_COST_WEIGHT = float(os.getenv('THUMBNAIL_COST_WEIGHT', '1000'))
+REPLICATE_COST_PER_IMAGE = float(os.getenv('REPLICATE_COST_PER_IMAGE', '0.003'))
+POLLINATIONS_COST_PER_IMAGE = float(os.getenv('POLLINATIONS_COST_PER_IMAGE', '0'))
+# Images downloaded for a CDN upload are buffered in memory up to this size, then on disk
+IMAGEKIT_SPOOL_MAX_BYTES = int(os.getenv('IMAGEKIT_SPOOL_MAX_BYTES', str(2 * 1024 * 1024)))
+# Thumbnail jobs: with "Prefer: respond-async", POST /api/thumbnails/generate/ enqueues
+# the generation on Celery and answers 202 with a job to poll. Needs Redis and a running
+# Celery worker (render.yaml deploys none), so it is off unless enabled explicitly;
+# otherwise requests are served inline.
+THUMBNAIL_JOBS_ENABLED = os.getenv('THUMBNAIL_JOBS_ENABLED', 'false').lower() == 'true'
+THUMBNAIL_JOB_DEADLINE = float(os.getenv('THUMBNAIL_JOB_DEADLINE', '300'))
+THUMBNAIL_JOB_TTL = int(os.getenv('THUMBNAIL_JOB_TTL', '86400'))
+# Output tokens charged against the Gemini TPM budget up front, per call
+GEMINI_OUTPUT_TOKENS_ESTIMATE = int(os.getenv('GEMINI_OUTPUT_TOKENS_ESTIMATE', '1024'))
+
+# Analytics: how much channel history to scan (0 = everything)
+ANALYTICS_MAX_VIDEOS = int(os.getenv('ANALYTICS_MAX_VIDEOS', '0'))
+ANALYTICS_LOOKBACK_DAYS = int(os.getenv('ANALYTICS_LOOKBACK_DAYS', '0'))
+
+# YouTube Data API quota (units per key per Pacific-time day)
+YOUTUBE_DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', '10000'))
+YOUTUBE_QUOTA_RESERVE = int(os.getenv('YOUTUBE_QUOTA_RESERVE', '1000'))
+
+# Cached video descriptions are only scanned for hashtags and topic mentions:
+# keep this many leading characters plus any hashtags found after them
+YOUTUBE_DESCRIPTION_MAX_CHARS = int(os.getenv('YOUTUBE_DESCRIPTION_MAX_CHARS', '500'))
+
+# Stale-while-revalidate caching (seconds): fresh for SOFT_TTL, served stale while
+# refreshing for MAX_STALE more, and kept for STALE_IF_ERROR to cover upstream outages
+YOUTUBE_SWR_SOFT_TTL = int(os.getenv('YOUTUBE_SWR_SOFT_TTL', '300'))
+YOUTUBE_SWR_MAX_STALE = int(os.getenv('YOUTUBE_SWR_MAX_STALE', '3600'))
+YOUTUBE_SWR_STALE_IF_ERROR = int(os.getenv('YOUTUBE_SWR_STALE_IF_ERROR', '86400'))
+GEMINI_SWR_SOFT_TTL = int(os.getenv('GEMINI_SWR_SOFT_TTL', '3600'))
+GEMINI_SWR_MAX_STALE = int(os.getenv('GEMINI_SWR_MAX_STALE', '21600'))
+GEMINI_SWR_STALE_IF_ERROR = int(os.getenv('GEMINI_SWR_STALE_IF_ERROR', '86400'))
+SWR_REFRESH_WITH_CELERY = os.getenv('SWR_REFRESH_WITH_CELERY', 'true' if os.getenv('REDIS_URL') else 'false').lower() == 'true'
+SWR_REFRESH_LOCK_TIMEOUT = int(os.getenv('SWR_REFRESH_LOCK_TIMEOUT', '60'))
+
+# Negative caching of upstream failures (seconds per failure kind)
+NEGATIVE_CACHE_TTLS = {
+    'not_found': int(os.getenv('NEGATIVE_CACHE_NOT_FOUND_TTL', '600')),
+    'forbidden': int(os.getenv('NEGATIVE_CACHE_FORBIDDEN_TTL', '120')),
+}
+
+# Channel handle -> UC id -> uploads playlist mapping
+CHANNEL_IDENTITY_TTL_DAYS = int(os.getenv('CHANNEL_IDENTITY_TTL_DAYS', '30'))
+CHANNEL_IDENTITY_CACHE_TTL = int(os.getenv('CHANNEL_IDENTITY_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Outbound HTTP (shared keep-alive sessions in core.utils.http)
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '10'))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '20'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+# Async clients (core.utils.async_http): connection cap per event loop, and
+# how many requests may be in flight to one host at a time
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', '100'))
+ASYNC_HTTP_PER_HOST_LIMIT = int(os.getenv('ASYNC_HTTP_PER_HOST_LIMIT', '20'))
+ASYNC_HTTP_HOST_LIMITS = {
+    'generativelanguage.googleapis.com': int(os.getenv('GEMINI_MAX_CONCURRENCY', '10')),
+    'image.pollinations.ai': int(os.getenv('POLLINATIONS_MAX_CONCURRENCY', '4')),
+    'upload.imagekit.io': int(os.getenv('IMAGEKIT_MAX_CONCURRENCY', '8')),
+}
+
 # Admin credentials
 ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'admin')